@@ -1,4 +1,6 @@
 # Просто экспортируем celery из campaigns
 from app.tasks.campaigns import celery
+# Регистрация задач, объявленных в других модулях
+import app.tasks.imports  # noqa: F401
 
 __all__ = ['celery']
\ No newline at end of file
@@ -23,6 +23,20 @@ class Settings(BaseSettings):
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SMTP_USE_TLS: bool = True
+    SMTP_POOL_SIZE: int = 5
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_TIMEOUT: float = 30
+    # Пул SMTP-сессий отправителя живет в воркере между кампаниями
+    SMTP_POOL_IDLE_TIMEOUT: int = 1800
+    # Одинаковое письмо многим получателям за одну SMTP-транзакцию (RCPT TO)
+    EMAIL_FANOUT_ENABLED: bool = False
+    EMAIL_FANOUT_SIZE: int = 50
+    # Проверка MX-записей доменов при импорте email (кэш по домену, сек)
+    EMAIL_MX_CHECK_ENABLED: bool = False
+    EMAIL_MX_CACHE_TTL: int = 86400
+    EMAIL_MX_NEGATIVE_TTL: int = 3600
+    EMAIL_MX_CONCURRENCY: int = 20
+    EMAIL_MX_TIMEOUT: float = 5.0
     
     # WhatsApp
     TWILIO_ACCOUNT_SID: Optional[str] = None
@@ -37,6 +51,13 @@ class Settings(BaseSettings):
     VIBER_API_KEY: Optional[str] = None
     VIBER_API_URL: str = "https://chatapi.viber.com/pa/send_message"
     
+    # Общий HTTP-клиент (SMS, Viber, CryptoPay)
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_LIMIT_PER_HOST: int = 20
+    HTTP_DNS_CACHE_TTL: int = 300
+    HTTP_KEEPALIVE_TIMEOUT: float = 60
+    HTTP_TIMEOUT: float = 30
+    
     # AI
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-3.5-turbo"
@@ -44,6 +65,11 @@ class Settings(BaseSettings):
     DEEPSEEK_API_KEY: Optional[str] = None
     DEEPSEEK_BASE_URL: str = "https://api.deepseek.com"
     DEEPSEEK_MODEL: str = "deepseek-chat"
+    AI_REQUEST_TIMEOUT: float = 60
+    AI_MAX_RETRIES: int = 2
+    AI_MAX_CONCURRENCY: int = 5
+    AI_CACHE_TTL: int = 3600
+    AI_CACHE_SIZE: int = 1000
     
     # App
     DEBUG: bool = False
@@ -51,7 +77,66 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     WEBHOOK_HOST: Optional[str] = None
     WEBHOOK_PATH: str = "/webhook"
-    
+    # Импорт контактов в фоне: размер пачки записи и частота обновления прогресса (сек)
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_PROGRESS_INTERVAL: float = 3.0
+
+    # Рассылки: максимум одновременных отправок на одного отправителя
+    TELEGRAM_SEND_CONCURRENCY: int = 1
+    EMAIL_SEND_CONCURRENCY: int = 50
+    WHATSAPP_SEND_CONCURRENCY: int = 10
+    SMS_SEND_CONCURRENCY: int = 10
+    VIBER_SEND_CONCURRENCY: int = 10
+    # SMS.ru принимает до 100 номеров в одном запросе
+    SMS_BATCH_SIZE: int = 100
+    # Viber broadcast_message - до 300 получателей в запросе
+    VIBER_BROADCAST_SIZE: int = 300
+    # Общий для всех воркеров лимит (сообщений в секунду): на отправителя и на
+    # учетную запись провайдера (одни и те же реквизиты у разных отправителей)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BURST: int = 5
+    TELEGRAM_RATE_LIMIT: float = 1
+    TELEGRAM_PROVIDER_RATE_LIMIT: float = 1
+    EMAIL_RATE_LIMIT: float = 20
+    EMAIL_PROVIDER_RATE_LIMIT: float = 20
+    WHATSAPP_RATE_LIMIT: float = 10
+    WHATSAPP_PROVIDER_RATE_LIMIT: float = 30
+    SMS_RATE_LIMIT: float = 10
+    SMS_PROVIDER_RATE_LIMIT: float = 30
+    VIBER_RATE_LIMIT: float = 20
+    VIBER_PROVIDER_RATE_LIMIT: float = 50
+    # Пул отправителей кампании: после N ошибок подряд отправитель отдыхает (сек)
+    SENDER_POOL_FAILURE_THRESHOLD: int = 5
+    SENDER_POOL_COOLDOWN: float = 60
+    # Сколько контактов выбирать из БД за один запрос при рассылке
+    CAMPAIGN_CONTACTS_PAGE_SIZE: int = 1000
+    # Логи кампаний пишутся пачками: по размеру буфера или по времени (сек)
+    CAMPAIGN_LOG_FLUSH_SIZE: int = 500
+    CAMPAIGN_LOG_FLUSH_INTERVAL: float = 2.0
+    CAMPAIGN_LOG_ASYNC_WRITER: bool = True
+    # Прогресс рассылки: не чаще раза в N секунд или каждые K сообщений
+    CAMPAIGN_PROGRESS_INTERVAL: float = 1.0
+    CAMPAIGN_PROGRESS_EVERY: int = 500
+    # Кэш разрешенных Telegram-получателей (сек); ненайденные username - меньше
+    TELEGRAM_PEER_CACHE_TTL: int = 2592000  # 30 дней
+    TELEGRAM_PEER_NEGATIVE_TTL: int = 86400
+    # Адаптивный темп Telegram (AIMD, сообщений в секунду на аккаунт)
+    TELEGRAM_ADAPTIVE_RATE: bool = True
+    TELEGRAM_RATE_INITIAL: float = 0.5
+    TELEGRAM_RATE_MIN: float = 0.02
+    TELEGRAM_RATE_MAX: float = 1.0
+    TELEGRAM_RATE_INCREASE_STEP: float = 0.05
+    TELEGRAM_RATE_INCREASE_EVERY: int = 20
+    TELEGRAM_RATE_DECREASE_FACTOR: float = 0.5
+    # FloodWait дольше этого (сек) не ждем - сообщение считается неотправленным
+    TELEGRAM_FLOOD_MAX_WAIT: int = 300
+    TELEGRAM_FLOOD_MAX_RETRIES: int = 3
+    # Минимальный интервал между вступлениями в группы по приглашениям (сек)
+    TELEGRAM_JOIN_INTERVAL: float = 10
+    # Пул Telegram-клиентов воркера: отключение после простоя и период проверки (сек)
+    TELEGRAM_CLIENT_IDLE_TIMEOUT: int = 1800
+    TELEGRAM_CLIENT_PING_INTERVAL: int = 300
+
     # Subscription prices (USD cents)
     BASIC_PLAN_PRICE: int = 999    # $9.99
     PRO_PLAN_PRICE: int = 2999     # $29.99
@@ -0,0 +1,23 @@
+"""Index for keyset paging of campaign contacts
+
+Revision ID: 005
+Revises: 004_merge_002_003
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, None] = "004_merge_002_003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_contacts_user_type_id", "contacts", ["user_id", "type", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_type_id", table_name="contacts")
@@ -0,0 +1,31 @@
+"""Campaign delivery checkpoint
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 11:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("campaigns", sa.Column("last_contact_id", sa.Integer(), nullable=True, server_default="0"))
+    op.add_column("campaigns", sa.Column("checkpoint_at", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_campaign_logs_campaign_contact",
+        "campaign_logs",
+        ["campaign_id", "contact_identifier"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_campaign_logs_campaign_contact", table_name="campaign_logs")
+    op.drop_column("campaigns", "checkpoint_at")
+    op.drop_column("campaigns", "last_contact_id")
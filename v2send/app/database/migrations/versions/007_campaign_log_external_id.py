@@ -0,0 +1,23 @@
+"""Campaign log external message id
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 12:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("campaign_logs", sa.Column("external_id", sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("campaign_logs", "external_id")
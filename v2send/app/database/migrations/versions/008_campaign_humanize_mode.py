@@ -0,0 +1,26 @@
+"""Campaign humanize mode
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 13:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "campaigns",
+        sa.Column("humanize_mode", sa.String(length=20), nullable=True, server_default="overlapped"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("campaigns", "humanize_mode")
@@ -0,0 +1,23 @@
+"""Campaign sender pool
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 14:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("campaigns", sa.Column("sender_ids", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("campaigns", "sender_ids")
@@ -0,0 +1,38 @@
+"""Unique contact per user, type and identifier
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 15:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Оставляем самый ранний из дубликатов
+    op.execute(
+        """
+        DELETE FROM contacts c
+        USING contacts d
+        WHERE c.user_id = d.user_id
+          AND c.type = d.type
+          AND c.identifier = d.identifier
+          AND c.id > d.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_contacts_user_type_identifier",
+        "contacts",
+        ["user_id", "type", "identifier"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_contacts_user_type_identifier", "contacts", type_="unique")
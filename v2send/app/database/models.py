@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float, Enum, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float, Enum, BigInteger, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -27,6 +27,11 @@ class SenderType(enum.Enum):
     SMS = "sms"
     VIBER = "viber"
 
+class HumanizeMode(enum.Enum):
+    OFF = "off"                # без имитации печатания
+    OVERLAPPED = "overlapped"  # печатание совмещено с ожиданием темпа
+    STRICT = "strict"          # печатание и пауза перед каждым сообщением
+
 class User(Base):
     __tablename__ = "users"
     
@@ -110,6 +115,13 @@ class Contact(Base):
     
     # Relationships
     user = relationship("User", back_populates="contacts")
+    
+    __table_args__ = (
+        # Постраничная выборка аудитории кампании по ключу (id > last_id)
+        Index("ix_contacts_user_type_id", "user_id", "type", "id"),
+        # Один контакт на пользователя и тип; на нем держится массовый импорт
+        UniqueConstraint("user_id", "type", "identifier", name="uq_contacts_user_type_identifier"),
+    )
 
 class Campaign(Base):
     __tablename__ = "campaigns"
@@ -119,6 +131,7 @@ class Campaign(Base):
     name = Column(String(255), nullable=False)
     type = Column(Enum(SenderType), nullable=False)
     sender_id = Column(Integer, ForeignKey("senders.id"))
+    sender_ids = Column(JSON)  # Пул отправителей (если выбраны "все отправители")
     subject = Column(String(500))
     message = Column(Text, nullable=False)
     status = Column(Enum(CampaignStatus), default=CampaignStatus.DRAFT)
@@ -130,14 +143,19 @@ class Campaign(Base):
     
     # Settings
     batch_size = Column(Integer, default=10)
-    delay_seconds = Column(Integer, default=1)
+    delay_seconds = Column(Integer, default=0)  # 0 - темп задает ограничитель отправителя (RATE_LIMIT_*)
     retry_failed = Column(Boolean, default=True)
+    humanize_mode = Column(String(20), default=HumanizeMode.OVERLAPPED.value)  # см. HumanizeMode
     
     # Stats
     total_contacts = Column(Integer, default=0)
     sent_count = Column(Integer, default=0)
     failed_count = Column(Integer, default=0)
     
+    # Checkpoint: id последнего контакта, до которого рассылка завершена
+    last_contact_id = Column(Integer, default=0)
+    checkpoint_at = Column(DateTime)
+    
     created_at = Column(DateTime, default=func.now())
     
     # Relationships
@@ -152,6 +170,7 @@ class CampaignLog(Base):
     contact_identifier = Column(String(255), nullable=False)
     status = Column(String(50))  # sent, failed, delivered, opened, clicked
     error_message = Column(Text)
+    external_id = Column(String(255))  # ID сообщения у провайдера (Twilio SID и т.п.)
     sent_at = Column(DateTime, default=func.now())
     
     # Analytics
@@ -160,6 +179,11 @@ class CampaignLog(Base):
     
     # Relationships
     campaign = relationship("Campaign", back_populates="logs")
+    
+    __table_args__ = (
+        # Пропуск уже обработанных контактов при возобновлении кампании
+        Index("ix_campaign_logs_campaign_contact", "campaign_id", "contact_identifier"),
+    )
 
 class FileUpload(Base):
     __tablename__ = "file_uploads"
@@ -1,7 +1,7 @@
 from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from app.services.ai_assistant import AIAssistant
+from app.services.ai_assistant import get_ai_assistant
 from app.database.models import SubscriptionStatus
 from app.utils.keyboards import ai_assistant_keyboard, back_keyboard
 from app.utils.decorators import handle_errors, log_user_action, subscription_required
@@ -23,7 +23,7 @@ class AIStates(StatesGroup):
 async def ai_assistant_menu(message: types.Message, **kwargs):
     """Главное меню AI-ассистента"""
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     
     if not ai.is_available():
         await message.answer(
@@ -59,7 +59,7 @@ async def back_to_ai_menu_callback(callback: types.CallbackQuery, state: FSMCont
     """Callback для возврата в меню AI-ассистента"""
     await state.clear()
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     
     if not ai.is_available():
         await callback.message.edit_text(
@@ -126,7 +126,7 @@ async def ai_generate_process(message: types.Message, state: FSMContext):
     # Показываем индикатор загрузки
     loading_msg = await message.answer("🤖 Генерирую текст...")
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     
     # Генерируем текст
     result = await ai.generate_message(
@@ -210,7 +210,7 @@ async def ai_spam_check_process(message: types.Message, state: FSMContext):
     
     loading_msg = await message.answer("🛡 Анализирую на спам...")
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     result = await ai.check_spam_score(text, "email")
     
     await loading_msg.delete()
@@ -303,7 +303,7 @@ async def ai_improve_cta_process(message: types.Message, state: FSMContext):
     
     loading_msg = await message.answer("🎯 Улучшаю призыв к действию...")
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     result = await ai.improve_cta(cta, "маркетинговая рассылка")
     
     await loading_msg.delete()
@@ -381,7 +381,7 @@ async def ai_ab_test_process(message: types.Message, state: FSMContext):
     
     loading_msg = await message.answer("🔄 Создаю варианты для A/B тестирования...")
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     result = await ai.generate_ab_variants(text, 3)
     
     await loading_msg.delete()
@@ -439,7 +439,7 @@ async def check_generated_spam(callback: types.CallbackQuery, state: FSMContext)
     
     loading_msg = await callback.message.edit_text("🛡 Проверяю сгенерированный текст на спам...")
     
-    ai = AIAssistant()
+    ai = get_ai_assistant()
     result = await ai.check_spam_score(text, "telegram")
     
     if result["success"]:
@@ -3,17 +3,19 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.database.database import get_db
-from app.database.models import User, Campaign, Sender, Contact, CampaignStatus, SenderType, CampaignLog
+from app.database.database import get_db, redis_client
+from app.database.models import User, Campaign, Sender, Contact, CampaignStatus, SenderType, CampaignLog, HumanizeMode
 from app.utils.keyboards import (
     campaign_type_keyboard, campaign_actions_keyboard,
-    back_keyboard, confirm_keyboard
+    back_keyboard, confirm_keyboard, HUMANIZE_LABELS
 )
 from app.utils.decorators import handle_errors, log_user_action, subscription_required
 from app.utils.validators import validate_campaign_name, validate_message_content
 from datetime import datetime
 import logging
 from app.tasks.campaigns import start_campaign_task
+from app.services.campaign_progress import get_campaign_progress
+from app.services.telegram_rate_controller import get_account_rate
 from aiogram.exceptions import TelegramBadRequest
 
 router = Router()
@@ -146,11 +148,24 @@ async def process_campaign_message(message: types.Message, state: FSMContext):
             await message.answer("Пользователь не найден")
             return
 
+        sender_ids = None
+        if data.get("send_from_all"):
+            # Рассылка распределяется между всеми активными отправителями этого типа
+            res = await db.execute(
+                select(Sender.id).where(
+                    Sender.user_id == user.id,
+                    Sender.type == SenderType(data["campaign_type"]),
+                    Sender.is_active == True
+                ).order_by(Sender.id)
+            )
+            sender_ids = list(res.scalars().all())
+
         campaign = Campaign(
             user_id=user.id,
             name=data["campaign_name"],
             type=SenderType(data["campaign_type"]),
             sender_id=data.get("sender_id"),
+            sender_ids=sender_ids,
             subject=data.get("subject"),
             message=data["message"],
             status=CampaignStatus.DRAFT
@@ -162,11 +177,135 @@ async def process_campaign_message(message: types.Message, state: FSMContext):
     await message.answer(
         f"✅ <b>Кампания '{campaign.name}' создана!</b>",
         parse_mode="HTML",
-        reply_markup=campaign_actions_keyboard(campaign.id, campaign.status.value)
+        reply_markup=campaign_actions_keyboard(campaign.id, campaign.status.value, humanize_mode_of(campaign))
     )
     await state.clear()
 
 
+# ------------------ прогресс кампании ------------------
+
+@router.callback_query(F.data.startswith("campaign_stats_"))
+@handle_errors
+async def campaign_stats(callback: types.CallbackQuery):
+    """Статистика кампании: живой прогресс из Redis, иначе счетчики из БД"""
+    campaign_id = int(callback.data.split("_")[2])
+
+    async for db in get_db():
+        res = await db.execute(
+            select(Campaign).join(User, Campaign.user_id == User.id).where(
+                Campaign.id == campaign_id,
+                User.telegram_id == callback.from_user.id
+            )
+        )
+        campaign = res.scalar_one_or_none()
+        rate_lines = await telegram_rate_lines(db, campaign) if campaign else []
+    if not campaign:
+        await callback.answer("Кампания не найдена", show_alert=True)
+        return
+
+    progress = await get_campaign_progress(redis_client, campaign_id)
+    if progress:
+        total, current = progress["total"], progress["current"]
+        sent, failed = progress["sent"], progress["failed"]
+    else:
+        total, sent, failed = campaign.total_contacts or 0, campaign.sent_count or 0, campaign.failed_count or 0
+        current = sent + failed
+
+    percent = current * 100 // total if total else 0
+    text = (
+        f"📊 <b>{campaign.name}</b>\n\n"
+        f"📌 Статус: {campaign.status.value}\n"
+        f"📨 Обработано: {current}/{total} ({percent}%)\n"
+        f"✅ Отправлено: {sent}\n"
+        f"❌ Ошибок: {failed}\n"
+    )
+    if progress and campaign.status == CampaignStatus.RUNNING:
+        text += f"⚡ Скорость: {progress['throughput']:.1f} сообщ./сек\n"
+        if progress["eta_seconds"] is not None:
+            minutes, seconds = divmod(progress["eta_seconds"], 60)
+            text += f"⏳ Осталось: ~{minutes} мин {seconds} сек\n"
+    if rate_lines:
+        text += "\n🐢 <b>Безопасный темп аккаунтов:</b>\n" + "\n".join(rate_lines) + "\n"
+
+    await safe_edit(
+        callback,
+        text,
+        parse_mode="HTML",
+        reply_markup=campaign_actions_keyboard(campaign.id, campaign.status.value, humanize_mode_of(campaign))
+    )
+    await callback.answer()
+
+
+async def telegram_rate_lines(db: AsyncSession, campaign: Campaign) -> list:
+    """Темп Telegram-аккаунтов кампании, подобранный по FloodWait (FloodWaitRateController)"""
+    sender_ids = campaign.sender_ids or ([campaign.sender_id] if campaign.sender_id else [])
+    if campaign.type != SenderType.TELEGRAM or not sender_ids:
+        return []
+
+    res = await db.execute(select(Sender).where(Sender.id.in_(sender_ids)).order_by(Sender.id))
+    lines = []
+    for sender in res.scalars().all():
+        phone = (sender.config or {}).get("phone")
+        if not phone:
+            continue
+        try:
+            state = await get_account_rate(redis_client, str(phone))
+        except Exception as e:
+            logger.warning(f"Failed to load rate state for sender {sender.id}: {e}")
+            continue
+        if not state:
+            continue
+        line = f"• {sender.name}: {state['rate']:.2f} сообщ./сек"
+        if state["blocked_for"]:
+            line += f", FloodWait еще {state['blocked_for']} сек"
+        lines.append(line)
+    return lines
+
+
+# ------------------ имитация печатания (Telegram) ------------------
+
+HUMANIZE_ORDER = [HumanizeMode.OVERLAPPED.value, HumanizeMode.STRICT.value, HumanizeMode.OFF.value]
+
+
+def humanize_mode_of(campaign: Campaign):
+    """Режим имитации для клавиатуры (None - настройка не применима)"""
+    if campaign.type != SenderType.TELEGRAM:
+        return None
+    return campaign.humanize_mode or HumanizeMode.OVERLAPPED.value
+
+
+@router.callback_query(F.data.startswith("campaign_humanize_"))
+@handle_errors
+async def campaign_humanize(callback: types.CallbackQuery):
+    """Переключение режима имитации печатания: совмещенная -> строгая -> выкл"""
+    campaign_id = int(callback.data.split("_")[2])
+
+    async for db in get_db():
+        res = await db.execute(
+            select(Campaign).join(User, Campaign.user_id == User.id).where(
+                Campaign.id == campaign_id,
+                User.telegram_id == callback.from_user.id
+            )
+        )
+        campaign = res.scalar_one_or_none()
+        if not campaign or campaign.type != SenderType.TELEGRAM:
+            await callback.answer("Кампания не найдена", show_alert=True)
+            return
+        if campaign.status not in (CampaignStatus.DRAFT, CampaignStatus.PAUSED):
+            await callback.answer("Режим можно менять только до запуска или на паузе", show_alert=True)
+            return
+
+        current = humanize_mode_of(campaign)
+        index = HUMANIZE_ORDER.index(current) if current in HUMANIZE_ORDER else -1
+        campaign.humanize_mode = HUMANIZE_ORDER[(index + 1) % len(HUMANIZE_ORDER)]
+        await db.commit()
+
+    await callback.message.edit_reply_markup(
+        reply_markup=campaign_actions_keyboard(campaign.id, campaign.status.value, campaign.humanize_mode)
+    )
+    await callback.answer(f"Имитация печатания: {HUMANIZE_LABELS[campaign.humanize_mode]}")
+
+
 # ------------------ пример подавления ошибки edit_text ------------------
 
 async def safe_edit(callback: types.CallbackQuery, text: str, **kwargs):
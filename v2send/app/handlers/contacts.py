@@ -4,12 +4,11 @@ from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from app.database.database import get_db
-from app.database.models import SubscriptionStatus, User, Contact, FileUpload, SenderType
+from app.database.models import SubscriptionStatus, User, Contact, SenderType
 from app.utils.keyboards import contacts_keyboard, file_type_keyboard, back_keyboard
 from app.utils.decorators import handle_errors, log_user_action, subscription_required
-from app.utils.validators import parse_contacts_file
+from app.tasks.imports import import_contacts_task
 from app.config import settings, SUBSCRIPTION_PLANS
-import aiofiles
 import os
 import uuid
 from datetime import datetime
@@ -211,6 +210,7 @@ async def select_file_type(callback: types.CallbackQuery, state: FSMContext):
         f"📋 <b>Поддерживаемые форматы:</b>\n"
         f"• .txt файлы (один контакт на строку)\n"
         f"• .csv файлы (с колонками)\n"
+        f"• .xlsx файлы (все листы, колонки по заголовкам)\n"
         f"• Максимальный размер: {settings.MAX_FILE_SIZE // 1024 // 1024}MB\n\n"
         f"💡 <b>Примеры содержимого:</b>\n"
         f"<code>{format_examples[file_type]}</code>\n\n"
@@ -240,7 +240,7 @@ async def process_file_upload(message: types.Message, state: FSMContext):
         return
     
     # Проверка типа файла
-    allowed_extensions = ['.txt', '.csv']
+    allowed_extensions = ['.txt', '.csv', '.xlsx']
     file_ext = None
     for ext in allowed_extensions:
         if document.file_name.lower().endswith(ext):
@@ -248,7 +248,7 @@ async def process_file_upload(message: types.Message, state: FSMContext):
             break
     
     if not file_ext:
-        await message.answer("❌ Поддерживаются только .txt и .csv файлы")
+        await message.answer("❌ Поддерживаются только .txt, .csv и .xlsx файлы")
         return
     
     data = await state.get_data()
@@ -265,185 +265,50 @@ async def process_file_upload(message: types.Message, state: FSMContext):
         
         await message.bot.download_file(file_info.file_path, file_path)
         
-        await progress_msg.edit_text("🔍 Анализируем файл...")
-        
-        # Читаем и парсим файл
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-            content = await f.read()
-        
-        valid_contacts, invalid_contacts = parse_contacts_file(content, file_type)
-        
-        await progress_msg.edit_text("💾 Сохраняем контакты...")
-        
-        if not valid_contacts:
-            await progress_msg.delete()
-            await message.answer("❌ В файле не найдено валидных контактов")
-            try:
-                os.remove(file_path)
-            except:
-                pass
-            await state.clear()
-            return
+        file_data = {
+            "file_path": file_path,
+            "file_type": file_type,
+            "original_filename": document.file_name,
+            "file_size": document.file_size
+        }
         
-        # Проверяем лимиты и сохраняем
-        async for db in get_db():
-            result = await db.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = result.scalar_one_or_none()
-            
-            result = await db.execute(
-                select(func.count(Contact.id)).where(
-                    Contact.user_id == user.id,
-                    Contact.is_active == True
-                )
-            )
-            current_contacts = result.scalar()
-            
-            plan = SUBSCRIPTION_PLANS.get(user.subscription_plan, SUBSCRIPTION_PLANS["basic"])
-            available_slots = plan["contacts_limit"] - current_contacts
-            
-            if len(valid_contacts) > available_slots:
-                await progress_msg.edit_text(
-                    f"⚠️ Можно загрузить только {available_slots} контактов из {len(valid_contacts)}\n"
-                    f"Достигнут лимит плана {user.subscription_plan.capitalize()}"
-                )
-                valid_contacts = valid_contacts[:available_slots]
-            
-            # Определяем тип контакта
-            contact_type_map = {
-                "telegram": SenderType.TELEGRAM,
-                "email": SenderType.EMAIL,
-                "phone": SenderType.SMS
-            }
-            
-            if file_type == "phone":
-                keyboard = types.InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [
-                            types.InlineKeyboardButton(text="💬 WhatsApp", callback_data=f"set_phone_type_whatsapp"),
-                            types.InlineKeyboardButton(text="📞 SMS", callback_data=f"set_phone_type_sms")
-                        ],
-                        [types.InlineKeyboardButton(text="🟣 Viber", callback_data=f"set_phone_type_viber")]
-                    ]
-                )
-                
-                await state.update_data(
-                    valid_contacts=valid_contacts,
-                    invalid_contacts=invalid_contacts,
-                    file_path=file_path
-                )
-                
-                await progress_msg.edit_text(
-                    f"📞 <b>Найдено {len(valid_contacts)} номеров</b>\n\n"
-                    f"Для какой платформы сохранить эти номера?",
-                    parse_mode="HTML",
-                    reply_markup=keyboard
-                )
-                return
-            
-            contact_type = contact_type_map[file_type]
-            
-            # Сохраняем информацию о файле
-            file_upload = FileUpload(
-                user_id=user.id,
-                filename=os.path.basename(file_path),
-                original_filename=document.file_name,
-                file_size=document.file_size,
-                file_type=file_type,
-                upload_path=file_path,
-                contacts_count=len(valid_contacts)
-            )
-            
-            db.add(file_upload)
-            await db.commit()
-            
-            # Добавляем контакты
-            new_contacts = 0
-            duplicate_contacts = 0
-            
-            for contact_data in valid_contacts:
-                if isinstance(contact_data, dict):
-                    contact_id = contact_data['identifier']
-                    first_name = contact_data.get('first_name', '')
-                    last_name = contact_data.get('last_name', '')
-                    metadata = contact_data.get('metadata', {})
-                else:
-                    contact_id = contact_data
-                    first_name = ''
-                    last_name = ''
-                    metadata = {}
-                
-                # Проверяем на дубликаты
-                result = await db.execute(
-                    select(Contact).where(
-                        and_(
-                            Contact.user_id == user.id,
-                            Contact.identifier == contact_id,
-                            Contact.type == contact_type
-                        )
-                    )
-                )
-                existing_contact = result.scalar_one_or_none()
-                
-                if existing_contact:
-                    duplicate_contacts += 1
-                    continue
-                
-                contact = Contact(
-                    user_id=user.id,
-                    identifier=contact_id,
-                    type=contact_type,
-                    first_name=first_name,
-                    last_name=last_name,
-                    contact_metadata=metadata,
-                    is_active=True
-                )
-                
-                db.add(contact)
-                new_contacts += 1
-            
-            await db.commit()
-            
-            # Отчет о загрузке
-            result_text = (
-                f"✅ <b>Файл успешно обработан!</b>\n\n"
-                f"📊 <b>Результаты:</b>\n"
-                f"• Новых контактов: {new_contacts:,}\n"
-                f"• Дубликатов пропущено: {duplicate_contacts:,}\n"
-                f"• Тип: {contact_type.value.capitalize()}\n"
-            )
-            
-            if invalid_contacts:
-                result_text += f"• Некорректных записей: {len(invalid_contacts):,}\n"
-                
-                if len(invalid_contacts) <= 5:
-                    result_text += f"\n❌ <b>Некорректные записи:</b>\n"
-                    for invalid in invalid_contacts:
-                        result_text += f"• {invalid}\n"
-            
+        if file_type == "phone":
+            # Платформу для номеров выбираем до импорта
             keyboard = types.InlineKeyboardMarkup(
                 inline_keyboard=[
-                    [types.InlineKeyboardButton(text="📋 Посмотреть списки", callback_data="contacts_lists")],
-                    [types.InlineKeyboardButton(text="◀️ К контактам", callback_data="contacts_menu")]
+                    [
+                        types.InlineKeyboardButton(text="💬 WhatsApp", callback_data=f"set_phone_type_whatsapp"),
+                        types.InlineKeyboardButton(text="📞 SMS", callback_data=f"set_phone_type_sms")
+                    ],
+                    [types.InlineKeyboardButton(text="🟣 Viber", callback_data=f"set_phone_type_viber")]
                 ]
             )
             
-            await progress_msg.delete()
-            await message.answer(
-                result_text,
+            await state.update_data(**file_data)
+            
+            await progress_msg.edit_text(
+                f"📞 <b>Файл с номерами получен</b>\n\n"
+                f"Для какой платформы сохранить эти номера?",
                 parse_mode="HTML",
                 reply_markup=keyboard
             )
-            
-            # Удаляем временный файл
-            try:
-                os.remove(file_path)
-            except:
-                pass
-            
-            await state.clear()
-            logger.info(f"Contacts uploaded: {new_contacts} new contacts for user {user.telegram_id}")
+            return
+        
+        contact_type_map = {
+            "telegram": SenderType.TELEGRAM,
+            "email": SenderType.EMAIL
+        }
+        
+        # Разбор и сохранение - в фоновой задаче, бот не блокируется
+        await progress_msg.edit_text("🔍 Анализируем файл...")
+        import_contacts_task.delay(
+            telegram_id=message.from_user.id,
+            contact_type=contact_type_map[file_type].value,
+            chat_id=progress_msg.chat.id,
+            message_id=progress_msg.message_id,
+            **file_data
+        )
+        await state.clear()
     
     except Exception as e:
         logger.error(f"Error processing file upload: {e}")
@@ -475,72 +340,23 @@ async def set_phone_type(callback: types.CallbackQuery, state: FSMContext):
     contact_type = type_mapping[phone_type]
     data = await state.get_data()
     
-    # Сохраняем контакты с выбранным типом
-    async for db in get_db():
-        result = await db.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        
-        valid_contacts = data["valid_contacts"]
-        new_contacts = 0
-        duplicate_contacts = 0
-        
-        for contact_id in valid_contacts:
-            # Проверяем на дубликаты
-            result = await db.execute(
-                select(Contact).where(
-                    and_(
-                        Contact.user_id == user.id,
-                        Contact.identifier == contact_id,
-                        Contact.type == contact_type
-                    )
-                )
-            )
-            existing_contact = result.scalar_one_or_none()
-            
-            if existing_contact:
-                duplicate_contacts += 1
-                continue
-            
-            contact = Contact(
-                user_id=user.id,
-                identifier=contact_id,
-                type=contact_type,
-                is_active=True
-            )
-            
-            db.add(contact)
-            new_contacts += 1
-        
-        await db.commit()
-        
-        result_text = (
-            f"✅ <b>Номера сохранены для {phone_type.upper()}!</b>\n\n"
-            f"📊 <b>Результаты:</b>\n"
-            f"• Новых контактов: {new_contacts:,}\n"
-            f"• Дубликатов пропущено: {duplicate_contacts:,}\n"
-        )
-        
-        keyboard = types.InlineKeyboardMarkup(
-            inline_keyboard=[
-                [types.InlineKeyboardButton(text="◀️ К контактам", callback_data="contacts_menu")]
-            ]
-        )
-        
-        await callback.message.edit_text(
-            result_text,
-            parse_mode="HTML",
-            reply_markup=keyboard
-        )
+    if not data.get("file_path"):
+        await callback.answer("⚠️ Файл не найден, загрузите его снова", show_alert=True)
+        await state.clear()
+        return
     
-    # Удаляем временный файл
-    try:
-        file_path = data.get("file_path")
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-    except:
-        pass
+    # Разбор и сохранение номеров - в фоновой задаче
+    await callback.message.edit_text(f"🔍 Анализируем номера для {phone_type.upper()}...")
+    import_contacts_task.delay(
+        telegram_id=callback.from_user.id,
+        file_path=data["file_path"],
+        file_type=data["file_type"],
+        contact_type=contact_type.value,
+        original_filename=data["original_filename"],
+        file_size=data["file_size"],
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.message_id
+    )
     
     await state.clear()
     await callback.answer()
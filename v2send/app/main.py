@@ -15,6 +15,8 @@ from app.config import settings
 from app.database.database import init_db, close_db, redis_client
 from app.handlers import start, subscription, senders, campaigns, contacts, analytics, admin, ai_assistant
 from app.services.crypto_pay import setup_crypto_webhooks
+from app.services.http_client import http_clients
+from app.services.ai_assistant import get_ai_assistant
 
 # Настройка логирования
 logging.basicConfig(
@@ -66,6 +68,8 @@ async def on_shutdown():
     try:
         # Закрытие соединений
         await close_db()
+        await http_clients.close()
+        await get_ai_assistant().close()
         await bot.session.close()
         logger.info("Bot stopped gracefully")
     except Exception as e:
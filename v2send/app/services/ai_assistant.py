@@ -1,22 +1,134 @@
-from openai import OpenAI
-from typing import Dict, List, Optional, Any
+from openai import AsyncOpenAI
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 from app.config import settings
+import asyncio
+import hashlib
 import logging
 import json
+import time
 
 logger = logging.getLogger(__name__)
 
+class ResponseCache:
+    """Кэш ответов модели с TTL и вытеснением давно не использованных (LRU)"""
+    
+    def __init__(self, max_size: int = 1000, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(**params) -> str:
+        """Ключ по промпту и параметрам запроса"""
+        raw = json.dumps(params, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: str):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
 class AIAssistant:
     """AI-ассистент для генерации контента и анализа"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.DEEPSEEK_API_KEY, base_url=getattr(settings, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com')) if settings.DEEPSEEK_API_KEY else None
-        self.model = getattr(settings, 'DEEPSEEK_MODEL', 'deepseek-chat')
+        self.client = AsyncOpenAI(
+            api_key=settings.DEEPSEEK_API_KEY,
+            base_url=settings.DEEPSEEK_BASE_URL,
+            timeout=settings.AI_REQUEST_TIMEOUT,
+            max_retries=settings.AI_MAX_RETRIES
+        ) if settings.DEEPSEEK_API_KEY else None
+        self.model = settings.DEEPSEEK_MODEL
+        self.cache = ResponseCache(settings.AI_CACHE_SIZE, settings.AI_CACHE_TTL)
+        self._semaphore = asyncio.Semaphore(max(1, settings.AI_MAX_CONCURRENCY))
+        # Одинаковые запросы, пришедшие одновременно, ждут один ответ
+        self._inflight: Dict[str, asyncio.Future] = {}
         
     def is_available(self) -> bool:
         """Проверка доступности AI"""
         return self.client is not None
     
+    async def close(self):
+        """Закрытие HTTP-клиента"""
+        if self.client:
+            await self.client.close()
+    
+    async def _request(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+        """Один запрос к модели с ограничением числа одновременных запросов"""
+        async with self._semaphore:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        return response.choices[0].message.content
+    
+    async def _complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool = True
+    ) -> str:
+        """Запрос к модели с кэшем
+        
+        use_cache=False - для творческих запросов ("Генерировать еще" должен
+        давать новый вариант): ответ не берется из кэша и не сохраняется в нем.
+        """
+        if not use_cache:
+            return await self._request(system_prompt, user_prompt, temperature, max_tokens)
+        
+        key = self.cache.make_key(
+            model=self.model,
+            system=system_prompt,
+            user=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            content = await self._request(system_prompt, user_prompt, temperature, max_tokens)
+            self.cache.set(key, content)
+            future.set_result(content)
+            return content
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку получат ожидающие; без них future не должен считаться забытым
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._inflight[key]
+    
     async def generate_message(
         self,
         topic: str,
@@ -71,19 +183,15 @@ class AIAssistant:
             
             user_prompt = f"Создай {message_type} сообщение на тему: {topic}"
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            content = await self._complete(
+                system_prompt,
+                user_prompt,
                 temperature=0.7,
-                max_tokens=1500
+                max_tokens=1500,
+                use_cache=False
             )
-            
+
             # Парсим ответ
-            content = response.choices[0].message.content
-            
             try:
                 result = json.loads(content)
             except json.JSONDecodeError:
@@ -140,18 +248,13 @@ class AIAssistant:
             }}
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Проанализируй этот текст:\n\n{text}"}
-                ],
+            content = await self._complete(
+                system_prompt,
+                f"Проанализируй этот текст:\n\n{text}",
                 temperature=0.3,
                 max_tokens=1000
             )
             
-            content = response.choices[0].message.content
-            
             try:
                 result = json.loads(content)
             except json.JSONDecodeError:
@@ -224,18 +327,14 @@ class AIAssistant:
             Контекст: {context}
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            content = await self._complete(
+                system_prompt,
+                user_prompt,
                 temperature=0.8,
-                max_tokens=800
+                max_tokens=800,
+                use_cache=False
             )
             
-            content = response.choices[0].message.content
-            
             try:
                 result = json.loads(content)
             except json.JSONDecodeError:
@@ -296,18 +395,14 @@ class AIAssistant:
             }}
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Создай варианты для A/B тестирования на основе этого текста:\n\n{original_text}"}
-                ],
+            content = await self._complete(
+                system_prompt,
+                f"Создай варианты для A/B тестирования на основе этого текста:\n\n{original_text}",
                 temperature=0.9,
-                max_tokens=1500
+                max_tokens=1500,
+                use_cache=False
             )
             
-            content = response.choices[0].message.content
-            
             try:
                 result = json.loads(content)
             except json.JSONDecodeError:
@@ -373,18 +468,13 @@ class AIAssistant:
             }
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Проанализируй тональность этого текста:\n\n{text}"}
-                ],
+            content = await self._complete(
+                system_prompt,
+                f"Проанализируй тональность этого текста:\n\n{text}",
                 temperature=0.3,
                 max_tokens=500
             )
             
-            content = response.choices[0].message.content
-            
             try:
                 result = json.loads(content)
             except json.JSONDecodeError:
@@ -443,18 +533,13 @@ class AIAssistant:
             }}
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Создай заголовки для письма с таким содержанием:\n\n{message_content[:500]}..."}
-                ],
+            content = await self._complete(
+                system_prompt,
+                f"Создай заголовки для письма с таким содержанием:\n\n{message_content[:500]}...",
                 temperature=0.8,
                 max_tokens=800
             )
             
-            content = response.choices[0].message.content
-            
             try:
                 result = json.loads(content)
             except json.JSONDecodeError:
@@ -484,4 +569,13 @@ class AIAssistant:
             return {
                 "success": False,
                 "error": f"Ошибка генерации заголовков: {str(e)}"
-            }
\ No newline at end of file
+            }
+
+_assistant: Optional[AIAssistant] = None
+
+def get_ai_assistant() -> AIAssistant:
+    """Общий экземпляр AI-ассистента (один HTTP-клиент и кэш на процесс)"""
+    global _assistant
+    if _assistant is None:
+        _assistant = AIAssistant()
+    return _assistant
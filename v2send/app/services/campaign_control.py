@@ -0,0 +1,103 @@
+"""Управление запущенной рассылкой через Redis (пауза / остановка)"""
+import asyncio
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTROL_KEY = "campaign:{campaign_id}:control"
+CONTROL_TTL = 7 * 24 * 60 * 60
+
+COMMAND_PAUSE = "pause"
+COMMAND_RESUME = "resume"
+COMMAND_STOP = "stop"
+
+
+def control_key(campaign_id: int) -> str:
+    """Ключ (и канал pub/sub) команд управления кампанией"""
+    return CONTROL_KEY.format(campaign_id=campaign_id)
+
+
+async def send_campaign_command(redis, campaign_id: int, command: str):
+    """Отправка команды воркеру кампании
+
+    Команда сохраняется в ключе (на случай, если воркер еще не подписался)
+    и публикуется в канал, чтобы запущенная рассылка отреагировала сразу.
+    """
+    key = control_key(campaign_id)
+    await redis.set(key, command, ex=CONTROL_TTL)
+    await redis.publish(key, command)
+
+
+class CampaignControl:
+    """Подписка воркера на команды управления своей кампанией
+
+    Последняя команда хранится локально, поэтому цикл отправки проверяет ее
+    без обращений к Postgres или Redis; on_command вызывается сразу при
+    получении команды.
+    """
+
+    def __init__(self, redis, campaign_id: int, on_command: Optional[Callable[[str], None]] = None):
+        self.redis = redis
+        self.campaign_id = campaign_id
+        self.on_command = on_command
+        self.command: Optional[str] = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def should_stop(self) -> bool:
+        """Получена команда паузы или остановки"""
+        return self.command in (COMMAND_PAUSE, COMMAND_STOP)
+
+    async def start(self):
+        """Подписка на канал и чтение последней сохраненной команды"""
+        key = control_key(self.campaign_id)
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(key)
+
+        stored = await self.redis.get(key)
+        if stored:
+            self._apply(stored)
+
+        self._task = asyncio.create_task(self._listen())
+
+    async def reset(self):
+        """Сброс сохраненной команды (новый запуск кампании)"""
+        self.command = None
+        await self.redis.delete(control_key(self.campaign_id))
+
+    async def close(self):
+        """Отписка от канала"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe()
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing control channel for campaign {self.campaign_id}: {e}")
+            self._pubsub = None
+
+    async def _listen(self):
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") == "message":
+                    self._apply(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Control channel for campaign {self.campaign_id} failed: {e}")
+
+    def _apply(self, command):
+        if isinstance(command, bytes):
+            command = command.decode()
+        self.command = command
+        logger.info(f"Campaign {self.campaign_id} received command: {command}")
+        if self.on_command:
+            self.on_command(command)
@@ -0,0 +1,189 @@
+"""Пакетная запись логов кампании (campaign_logs)"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert, update
+from app.database.models import Campaign, CampaignLog
+
+logger = logging.getLogger(__name__)
+
+# asyncpg ограничивает число параметров в запросе (32767), 1000 строк - с запасом
+MAX_ROWS_PER_INSERT = 1000
+# Повторы записи при ошибках БД: пауза растет вдвое от RETRY_DELAY до MAX_RETRY_DELAY
+WRITE_RETRIES = 5
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+
+class CampaignLogWriter:
+    """Буфер логов кампании со сбросом одним multi-row INSERT
+
+    Строки копятся в памяти и записываются по размеру (flush_size) или по
+    времени (flush_interval). Вместе с логами в той же транзакции сохраняется
+    контрольная точка кампании, поэтому счетчики и курсор никогда не
+    опережают записанные логи. В фоновом режиме запись идет отдельной задачей
+    в своей сессии, и задержки БД не тормозят цикл отправки. Ошибка записи
+    не теряет строки: они возвращаются в буфер и пишутся повторно с
+    нарастающей паузой.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        campaign_id: int,
+        flush_size: int = 500,
+        flush_interval: float = 2.0,
+        background: bool = False
+    ):
+        self.session_factory = session_factory
+        self.campaign_id = campaign_id
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.background = background
+
+        self._rows: List[Dict[str, Any]] = []
+        self._checkpoint: Optional[Dict[str, Any]] = None
+        self._last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self):
+        """Запуск фоновой записи (если включена)"""
+        if self.background and not self._task:
+            self._task = asyncio.create_task(self._writer_loop())
+
+    def add(
+        self,
+        contact_identifier: str,
+        status: str,
+        error_message: Optional[str] = None,
+        sent_at: Optional[datetime] = None,
+        external_id: Optional[str] = None
+    ):
+        """Добавление строки лога в буфер"""
+        self._rows.append({
+            "campaign_id": self.campaign_id,
+            "contact_identifier": contact_identifier,
+            "status": status,
+            "error_message": error_message,
+            "external_id": external_id,
+            "sent_at": sent_at or datetime.utcnow()
+        })
+
+    def set_checkpoint(self, **values):
+        """Значения колонок кампании, которые запишутся вместе со следующим сбросом"""
+        self._checkpoint = values
+
+    def _is_due(self) -> bool:
+        if len(self._rows) >= self.flush_size:
+            return True
+        return bool(self._rows or self._checkpoint) and \
+            time.monotonic() - self._last_flush >= self.flush_interval
+
+    async def maybe_flush(self):
+        """Сброс буфера, если пора по размеру или времени"""
+        self._raise_writer_error()
+        if not self._is_due():
+            return
+
+        if self._task:
+            self._wakeup.set()
+            # Если БД не успевает, притормаживаем отправку, а не копим память
+            if len(self._rows) < self.flush_size * 10:
+                return
+
+        await self._write_with_retry()
+
+    async def flush(self):
+        """Принудительный сброс буфера"""
+        self._raise_writer_error()
+        await self._write_with_retry()
+
+    async def close(self):
+        """Остановка фоновой записи и запись остатка буфера"""
+        self._closed = True
+        if self._task:
+            self._stop.set()
+            self._wakeup.set()
+            try:
+                await self._task
+            except Exception as e:
+                logger.error(f"Campaign {self.campaign_id}: log writer failed: {e}")
+            finally:
+                self._task = None
+        # Остаток буфера (и строки, возвращенные после ошибки) пишем всегда
+        await self._write_with_retry()
+
+    def _raise_writer_error(self):
+        if self._task and self._task.done() and self._task.exception():
+            raise self._task.exception()
+
+    async def _writer_loop(self):
+        """Фоновая запись по сигналу или по таймеру, после ошибки - с паузой"""
+        failures = 0
+        while not self._closed:
+            # После ошибки ждем паузу целиком: сигналы maybe_flush ее не прерывают
+            event = self._stop if failures else self._wakeup
+            timeout = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (failures - 1)) if failures else self.flush_interval
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closed:
+                break
+            try:
+                await self._write_pending()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Campaign {self.campaign_id}: failed to write logs (attempt {failures}): {e}")
+
+    async def _write_with_retry(self):
+        """Запись буфера с повторами; после WRITE_RETRIES ошибок подряд - исключение"""
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                await self._write_pending()
+                return
+            except Exception as e:
+                if attempt == WRITE_RETRIES:
+                    raise
+                delay = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (attempt - 1))
+                logger.warning(
+                    f"Campaign {self.campaign_id}: failed to write logs (attempt {attempt}), "
+                    f"retrying in {delay:.0f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    async def _write_pending(self):
+        """Запись накопленных строк и контрольной точки одной транзакцией"""
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            checkpoint, self._checkpoint = self._checkpoint, None
+            self._last_flush = time.monotonic()
+
+            if not rows and not checkpoint:
+                return
+
+            try:
+                async with self.session_factory() as db:
+                    for i in range(0, len(rows), MAX_ROWS_PER_INSERT):
+                        await db.execute(insert(CampaignLog).values(rows[i:i + MAX_ROWS_PER_INSERT]))
+                    if checkpoint:
+                        await db.execute(
+                            update(Campaign).where(Campaign.id == self.campaign_id).values(**checkpoint)
+                        )
+                    await db.commit()
+            except Exception:
+                # Возвращаем строки в буфер, чтобы не потерять их при повторной попытке
+                self._rows = rows + self._rows
+                if checkpoint and self._checkpoint is None:
+                    self._checkpoint = checkpoint
+                raise
+
+            logger.debug(f"Campaign {self.campaign_id}: flushed {len(rows)} log rows")
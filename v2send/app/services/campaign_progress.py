@@ -0,0 +1,114 @@
+"""Прогресс рассылки: троттлинг обновлений и публикация в Redis"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = "campaign:{campaign_id}:progress"
+PROGRESS_TTL = 7 * 24 * 60 * 60
+
+
+def progress_key(campaign_id: int) -> str:
+    """Ключ Redis-хеша с прогрессом кампании"""
+    return PROGRESS_KEY.format(campaign_id=campaign_id)
+
+
+class ProgressReporter:
+    """Объединяет обновления прогресса и публикует их не чаще заданного
+
+    Обновление уходит, когда с прошлого прошло min_interval секунд или
+    набралось every сообщений. Прогресс пишется в компактный Redis-хеш,
+    который бот читает одним HGETALL, и (по желанию) в состояние Celery-задачи.
+    """
+
+    def __init__(
+        self,
+        redis,
+        campaign_id: int,
+        total: int,
+        task=None,
+        min_interval: float = 1.0,
+        every: int = 500
+    ):
+        self.redis = redis
+        self.campaign_id = campaign_id
+        self.total = total
+        self.task = task
+        self.min_interval = min_interval
+        self.every = max(1, every)
+
+        self.rate = 0.0
+        self._last_emit = time.monotonic()
+        self._last_count: Optional[int] = None
+
+    async def report(self, sent: int, failed: int, status: str = "running", force: bool = False):
+        """Учесть текущие счетчики; публикация только если пора"""
+        current = sent + failed
+        now = time.monotonic()
+
+        if self._last_count is None:
+            self._last_count = current
+            self._last_emit = now
+        delta = current - self._last_count
+        elapsed = now - self._last_emit
+
+        if not force and delta < self.every and elapsed < self.min_interval:
+            return
+
+        # Текущая скорость - сглаженная скорость между публикациями
+        if elapsed > 0 and delta > 0:
+            instant = delta / elapsed
+            self.rate = instant if self.rate == 0 else 0.7 * self.rate + 0.3 * instant
+
+        self._last_count = current
+        self._last_emit = now
+        await self._publish(sent, failed, status)
+
+    async def _publish(self, sent: int, failed: int, status: str):
+        current = sent + failed
+        remaining = max(0, self.total - current)
+        eta = int(remaining / self.rate) if self.rate > 0 else None
+
+        data = {
+            "status": status,
+            "total": self.total,
+            "current": current,
+            "sent": sent,
+            "failed": failed,
+            "throughput": round(self.rate, 2),
+            "eta_seconds": eta if eta is not None else -1,
+            "updated_at": int(time.time())
+        }
+
+        if self.task:
+            self.task.update_state(state="PROGRESS", meta=data)
+
+        if self.redis:
+            try:
+                key = progress_key(self.campaign_id)
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hset(key, mapping=data)
+                pipe.expire(key, PROGRESS_TTL)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Failed to publish progress for campaign {self.campaign_id}: {e}")
+
+
+async def get_campaign_progress(redis, campaign_id: int) -> Optional[Dict[str, Any]]:
+    """Чтение прогресса кампании из Redis (None, если кампания еще не публиковала)"""
+    raw = await redis.hgetall(progress_key(campaign_id))
+    if not raw:
+        return None
+
+    data = {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in raw.items()
+    }
+    progress: Dict[str, Any] = {"status": data.get("status", "")}
+    for field in ("total", "current", "sent", "failed", "eta_seconds", "updated_at"):
+        progress[field] = int(data.get(field, 0))
+    progress["throughput"] = float(data.get("throughput", 0))
+    if progress["eta_seconds"] < 0:
+        progress["eta_seconds"] = None
+    return progress
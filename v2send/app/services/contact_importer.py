@@ -0,0 +1,75 @@
+"""Массовый импорт контактов (INSERT ... ON CONFLICT DO NOTHING)"""
+import logging
+from typing import Any, Dict, Iterable, List, Union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.models import Contact, SenderType
+
+logger = logging.getLogger(__name__)
+
+# asyncpg ограничивает число параметров в запросе (32767), 1000 строк - с запасом
+MAX_ROWS_PER_INSERT = 1000
+
+
+def contact_row(user_id: int, contact_type: SenderType, contact_data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Строка contacts из результата парсинга файла (строка или dict)"""
+    if isinstance(contact_data, dict):
+        return {
+            "user_id": user_id,
+            "identifier": contact_data["identifier"],
+            "type": contact_type,
+            "first_name": contact_data.get("first_name", ""),
+            "last_name": contact_data.get("last_name", ""),
+            "contact_metadata": contact_data.get("metadata", {}),
+            "is_active": True
+        }
+    return {
+        "user_id": user_id,
+        "identifier": contact_data,
+        "type": contact_type,
+        "first_name": "",
+        "last_name": "",
+        "contact_metadata": {},
+        "is_active": True
+    }
+
+
+async def bulk_import_contacts(
+    db: AsyncSession,
+    user_id: int,
+    contact_type: SenderType,
+    contacts: Iterable[Union[str, Dict[str, Any]]],
+    chunk_size: int = MAX_ROWS_PER_INSERT
+) -> Dict[str, int]:
+    """Добавление контактов пачками; уже существующие пропускаются
+    
+    Дубликаты отсекает уникальный индекс (user_id, type, identifier), а
+    RETURNING возвращает только реально вставленные строки, поэтому счетчики
+    точные даже при параллельной загрузке. Коммит - за вызывающим.
+    """
+    rows: List[Dict[str, Any]] = []
+    seen = set()
+    total = 0
+    for contact_data in contacts:
+        total += 1
+        row = contact_row(user_id, contact_type, contact_data)
+        # Повтор внутри одного файла - тоже дубликат
+        if row["identifier"] in seen:
+            continue
+        seen.add(row["identifier"])
+        rows.append(row)
+    
+    new_contacts = 0
+    chunk_size = max(1, min(chunk_size, MAX_ROWS_PER_INSERT))
+    for start in range(0, len(rows), chunk_size):
+        stmt = (
+            pg_insert(Contact)
+            .values(rows[start:start + chunk_size])
+            .on_conflict_do_nothing(index_elements=["user_id", "type", "identifier"])
+            .returning(Contact.id)
+        )
+        result = await db.execute(stmt)
+        new_contacts += len(result.fetchall())
+    
+    logger.info(f"Imported {new_contacts} of {total} contacts for user {user_id}")
+    return {"new": new_contacts, "duplicates": total - new_contacts}
@@ -1,9 +1,9 @@
 import hashlib
 import hmac
 import json
-import aiohttp
 from typing import Dict, Any, Optional, List
 from app.config import settings
+from app.services.http_client import get_http_session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,20 +24,20 @@ class CryptoPay:
             "Content-Type": "application/json"
         }
         
-        async with aiohttp.ClientSession() as session:
-            if method == "GET":
-                async with session.get(url, headers=headers, params=data) as response:
-                    result = await response.json()
-            else:
-                async with session.post(url, headers=headers, json=data) as response:
-                    result = await response.json()
+        session = get_http_session()
+        if method == "GET":
+            async with session.get(url, headers=headers, params=data) as response:
+                result = await response.json()
+        else:
+            async with session.post(url, headers=headers, json=data) as response:
+                result = await response.json()
             
-            if not result.get("ok"):
-                error_info = result.get("error", {})
-                error_message = error_info.get("name", "Unknown error")
-                raise Exception(f"CryptoPay API error: {error_message}")
+        if not result.get("ok"):
+            error_info = result.get("error", {})
+            error_message = error_info.get("name", "Unknown error")
+            raise Exception(f"CryptoPay API error: {error_message}")
             
-            return result["result"]
+        return result["result"]
     
     async def get_me(self) -> Dict[str, Any]:
         """Получение информации о приложении"""
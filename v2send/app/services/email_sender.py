@@ -3,36 +3,288 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
+from email.utils import make_msgid
+from app.config import settings
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Callable
+import hashlib
 import os
+import re
 import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
+# Ошибки, после которых соединение считается мертвым и открывается заново
+RECONNECT_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+class PooledSMTP(aiosmtplib.SMTP):
+    """SMTP-сессия, которая помнит, дошла ли текущая транзакция до DATA
+    
+    После начала DATA сервер мог уже принять письмо, даже если ответа мы не
+    дождались, поэтому повтор такой отправки может доставить его дважды.
+    """
+    
+    data_started = False
+    
+    async def data(self, message, /, **kwargs):
+        self.data_started = True
+        return await super().data(message, **kwargs)
+
+
+class PooledSMTPConnection:
+    """SMTP-сессия из пула и ее статистика"""
+    
+    def __init__(self, smtp: PooledSMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Пул долгоживущих SMTP-сессий одного отправителя
+    
+    STARTTLS и LOGIN выполняются один раз на соединение, дальше письма идут
+    подряд в той же сессии. Соединение пересоздается после max_messages писем,
+    при 421 / обрыве / таймауте, а после простоя проверяется через NOOP.
+    """
+    
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        use_tls: bool = True,
+        size: int = 5,
+        max_messages: int = 100,
+        timeout: float = 30,
+        idle_check: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = max(1, size)
+        self.max_messages = max(1, max_messages)
+        self.timeout = timeout
+        self.idle_check = idle_check
+        
+        self._idle: List[PooledSMTPConnection] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._closed = False
+        self.in_use = 0
+        self.last_used = time.monotonic()
+    
+    async def _open(self) -> PooledSMTPConnection:
+        """Новое соединение: connect, STARTTLS, LOGIN"""
+        smtp = PooledSMTP(
+            hostname=self.host,
+            port=self.port,
+            timeout=self.timeout,
+            start_tls=False
+        )
+        await smtp.connect()
+        if self.use_tls:
+            await smtp.starttls()
+        await smtp.login(self.username, self.password)
+        return PooledSMTPConnection(smtp)
+    
+    async def _discard(self, conn: PooledSMTPConnection):
+        """Закрытие соединения без ожидания ответа сервера"""
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+    
+    async def acquire(self) -> PooledSMTPConnection:
+        """Взять соединение из пула (или открыть новое)"""
+        await self._slots.acquire()
+        self.in_use += 1
+        self.last_used = time.monotonic()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if not conn.smtp.is_connected:
+                    continue
+                if time.monotonic() - conn.last_used > self.idle_check:
+                    try:
+                        await conn.smtp.noop()
+                    except Exception:
+                        await self._discard(conn)
+                        continue
+                return conn
+            return await self._open()
+        except BaseException:
+            self.in_use -= 1
+            self._slots.release()
+            raise
+    
+    async def release(self, conn: PooledSMTPConnection, discard: bool = False):
+        """Вернуть соединение в пул"""
+        try:
+            if discard or self._closed or conn.messages_sent >= self.max_messages:
+                await self._discard(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+        finally:
+            self.in_use -= 1
+            self.last_used = time.monotonic()
+            self._slots.release()
+    
+    async def send_message(self, msg, recipients: Optional[List[str]] = None):
+        """Отправка письма через соединение из пула
+        
+        При обрыве или 421 письмо повторяется один раз через новое соединение,
+        но только если сбой случился до DATA: иначе сервер мог уже принять
+        письмо, и повтор доставил бы его дважды.
+        """
+        for attempt in range(2):
+            conn = await self.acquire()
+            conn.smtp.data_started = False
+            try:
+                response = await conn.smtp.send_message(msg, recipients=recipients)
+            except RECONNECT_ERRORS as e:
+                await self.release(conn, discard=True)
+                if attempt or conn.smtp.data_started:
+                    raise
+                logger.warning(f"SMTP connection to {self.host} lost ({e}), reconnecting")
+                continue
+            except aiosmtplib.SMTPResponseException as e:
+                # 421 - сервер закрывает сессию: переподключаемся и пробуем еще раз
+                await self.release(conn, discard=e.code == 421)
+                if e.code == 421 and not attempt and not conn.smtp.data_started:
+                    logger.warning(f"SMTP {self.host} returned 421, reconnecting")
+                    continue
+                raise
+            except BaseException:
+                await self.release(conn, discard=True)
+                raise
+            
+            conn.messages_sent += 1
+            await self.release(conn)
+            return response
+    
+    @property
+    def closed(self) -> bool:
+        return self._closed
+    
+    async def close(self):
+        """Закрытие всех свободных соединений"""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+
+
+class SMTPPoolRegistry:
+    """Пулы SMTP-сессий процесса воркера, по одному на отправителя
+    
+    Пул живет между кампаниями, как и клиенты Telegram (см.
+    app.services.telegram_client_pool): повторный запуск не платит за
+    connect, STARTTLS и LOGIN. Пулы без соединений в работе, простаивающие
+    дольше idle_timeout секунд, закрываются при следующем обращении.
+    """
+    
+    def __init__(self, idle_timeout: float = 1800):
+        self.idle_timeout = idle_timeout
+        self._pools: Dict[str, Tuple[SMTPConnectionPool, asyncio.AbstractEventLoop]] = {}
+    
+    @staticmethod
+    def make_key(host: str, port: int, username: str, password: str, use_tls: bool) -> str:
+        """Ключ по реквизитам; смена пароля дает новый пул, секретов в ключе нет"""
+        raw = f"{host}:{port}:{username}:{password}:{use_tls}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+    
+    async def get(self, key: str, factory: Callable[[], SMTPConnectionPool]) -> SMTPConnectionPool:
+        """Пул отправителя из реестра или новый, созданный factory"""
+        await self.evict_idle()
+        loop = asyncio.get_running_loop()
+        entry = self._pools.get(key)
+        # Соединения из другого (закрытого) event loop использовать нельзя
+        if entry and not entry[0].closed and entry[1] is loop:
+            return entry[0]
+        pool = factory()
+        self._pools[key] = (pool, loop)
+        return pool
+    
+    async def evict_idle(self):
+        """Закрытие пулов, простаивающих дольше idle_timeout"""
+        now = time.monotonic()
+        loop = asyncio.get_running_loop()
+        for key, (pool, pool_loop) in list(self._pools.items()):
+            if pool_loop is not loop:
+                del self._pools[key]
+            elif pool.in_use == 0 and now - pool.last_used > self.idle_timeout:
+                logger.info(f"Closing idle SMTP pool {pool.host}")
+                del self._pools[key]
+                await pool.close()
+    
+    async def close(self):
+        """Закрытие всех пулов (остановка воркера)"""
+        pools, self._pools = self._pools, {}
+        loop = asyncio.get_running_loop()
+        for pool, pool_loop in pools.values():
+            if pool_loop is loop:
+                await pool.close()
+
+
+smtp_pools = SMTPPoolRegistry(idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT)
+
+
 class EmailSenderService:
     """Сервис для отправки email сообщений"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], rate_limiter=None):
         self.smtp_host = config["smtp_host"]
         self.smtp_port = config["smtp_port"]
         self.email = config["email"]
         self.password = config["password"]
         self.use_tls = config.get("use_tls", True)
         self.sender_name = config.get("sender_name", "")
+        # Общий лимит темпа (см. app.services.rate_limiter)
+        self.rate_limiter = rate_limiter
         self.is_connected = False
+        # Fan-out: SendEngine передает пакеты только при max_batch_size > 1
+        fanout = config.get("fanout", settings.EMAIL_FANOUT_ENABLED)
+        self.fanout_size = max(2, int(config.get("fanout_size", settings.EMAIL_FANOUT_SIZE)))
+        self.max_batch_size = self.fanout_size if fanout else 1
+        self.pool_size = config.get("pool_size", settings.SMTP_POOL_SIZE)
+        self.max_messages = config.get("max_messages_per_connection", settings.SMTP_MAX_MESSAGES_PER_CONNECTION)
+        self.pool: Optional[SMTPConnectionPool] = None
+    
+    async def _get_pool(self) -> SMTPConnectionPool:
+        """Пул отправителя из реестра процесса (сессии переживают кампанию)"""
+        if self.pool is None or self.pool.closed:
+            key = smtp_pools.make_key(self.smtp_host, self.smtp_port, self.email, self.password, self.use_tls)
+            self.pool = await smtp_pools.get(key, lambda: SMTPConnectionPool(
+                self.smtp_host,
+                self.smtp_port,
+                self.email,
+                self.password,
+                use_tls=self.use_tls,
+                size=self.pool_size,
+                max_messages=self.max_messages,
+                timeout=settings.SMTP_TIMEOUT
+            ))
+        return self.pool
         
     async def connect(self) -> bool:
-        """Тест подключения к SMTP серверу"""
+        """Подключение к SMTP серверу (соединение остается в пуле)"""
         try:
-            smtp = aiosmtplib.SMTP(hostname=self.smtp_host, port=self.smtp_port)
-            await smtp.connect()
-            
-            if self.use_tls:
-                await smtp.starttls()
-            
-            await smtp.login(self.email, self.password)
-            await smtp.quit()
+            pool = await self._get_pool()
+            conn = await pool.acquire()
+            await pool.release(conn)
             
             self.is_connected = True
             logger.info(f"Successfully connected to SMTP {self.smtp_host}:{self.smtp_port}")
@@ -42,46 +294,121 @@ class EmailSenderService:
             logger.error(f"Error connecting to SMTP: {e}")
             return False
     
+    def _build_message(self, message: str, subject: Optional[str], to: str) -> MIMEMultipart:
+        """MIME-письмо с HTML- и текстовой частями"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.sender_name} <{self.email}>" if self.sender_name else self.email
+        msg['To'] = to
+        msg['Subject'] = subject or "Сообщение от TelegramSender"
+        msg['Message-ID'] = make_msgid(domain=self.email.split("@")[-1])
+        
+        if '<' in message and '>' in message:
+            html_part = MIMEText(message, 'html', 'utf-8')
+            msg.attach(html_part)
+            
+            text_message = re.sub(r'<[^>]+>', '', message)
+            text_part = MIMEText(text_message, 'plain', 'utf-8')
+            msg.attach(text_part)
+        else:
+            text_part = MIMEText(message, 'plain', 'utf-8')
+            msg.attach(text_part)
+        return msg
+    
     async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
         """Отправка email сообщения"""
+        result = await self.deliver(recipient, message, subject)
+        return result["success"]
+    
+    async def deliver(self, recipient: str, message: str, subject: str = None) -> Dict[str, Any]:
+        """Отправка одного письма: success, message_id (Message-ID) и error"""
         try:
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.sender_name} <{self.email}>" if self.sender_name else self.email
-            msg['To'] = recipient
-            msg['Subject'] = subject or "Сообщение от TelegramSender"
+            msg = self._build_message(message, subject, recipient)
             
-            if '<' in message and '>' in message:
-                html_part = MIMEText(message, 'html', 'utf-8')
-                msg.attach(html_part)
-                
-                import re
-                text_message = re.sub(r'<[^>]+>', '', message)
-                text_part = MIMEText(text_message, 'plain', 'utf-8')
-                msg.attach(text_part)
-            else:
-                text_part = MIMEText(message, 'plain', 'utf-8')
-                msg.attach(text_part)
-            
-            smtp = aiosmtplib.SMTP(hostname=self.smtp_host, port=self.smtp_port)
-            await smtp.connect()
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
             
-            if self.use_tls:
-                await smtp.starttls()
-            
-            await smtp.login(self.email, self.password)
-            await smtp.send_message(msg)
-            await smtp.quit()
+            pool = await self._get_pool()
+            await pool.send_message(msg)
             
             logger.info(f"Email sent to {recipient}")
-            return True
+            return {"success": True, "message_id": msg['Message-ID'], "error": None}
             
         except Exception as e:
             logger.error(f"Error sending email to {recipient}: {e}")
-            return False
+            return {"success": False, "message_id": None, "error": str(e)}
+    
+    async def deliver_batch(self, messages: List[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Пакет писем: одинаковые письма уходят одной транзакцией на несколько RCPT TO
+        
+        Письмо собирается один раз, получатели передаются только в конверте
+        (в заголовке To - адрес отправителя). Результаты - в порядке messages.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        groups: Dict[Tuple[str, Optional[str]], List[int]] = {}
+        for index, (_, message, subject) in enumerate(messages):
+            groups.setdefault((message, subject), []).append(index)
+        
+        async def fanout(message: str, subject: Optional[str], indexes: List[int]):
+            recipients = [messages[i][0] for i in indexes]
+            for index, result in zip(indexes, await self._fanout(recipients, message, subject)):
+                results[index] = result
+        
+        async def single(index: int):
+            recipient, message, subject = messages[index]
+            results[index] = await self.deliver(recipient, message, subject)
+        
+        tasks = []
+        for (message, subject), indexes in groups.items():
+            if len(indexes) < 2:
+                tasks.append(single(indexes[0]))
+                continue
+            for i in range(0, len(indexes), self.fanout_size):
+                chunk = indexes[i:i + self.fanout_size]
+                tasks.append(fanout(message, subject, chunk) if len(chunk) > 1 else single(chunk[0]))
+        await asyncio.gather(*tasks)
+        return results
+    
+    async def _fanout(self, recipients: List[str], message: str, subject: Optional[str]) -> List[Dict[str, Any]]:
+        """Одна SMTP-транзакция; отказы RCPT TO разбираются по получателям"""
+        try:
+            msg = self._build_message(message, subject, self.email)
+            
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(len(recipients))
+            
+            pool = await self._get_pool()
+            errors, _ = await pool.send_message(msg, recipients=recipients)
+            
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            # Сервер отверг всех получателей
+            refused = {r.recipient: str(r) for r in e.recipients}
+            return [
+                {"success": False, "message_id": None, "error": refused.get(r, str(e))}
+                for r in recipients
+            ]
+        except Exception as e:
+            logger.error(f"Error sending email to {len(recipients)} recipients: {e}")
+            return [{"success": False, "message_id": None, "error": str(e)} for _ in recipients]
+        
+        logger.info(f"Email sent to {len(recipients) - len(errors)}/{len(recipients)} recipients")
+        return [
+            {"success": False, "message_id": None, "error": f"{errors[r].code} {errors[r].message}"}
+            if r in errors else
+            {"success": True, "message_id": msg['Message-ID'], "error": None}
+            for r in recipients
+        ]
+    
+    async def disconnect(self):
+        """Отключение сервиса; сессии остаются в пуле процесса до простоя"""
+        self.pool = None
+        self.is_connected = False
     
     async def test_connection(self) -> bool:
         """Тест соединения"""
-        return await self.connect()
+        try:
+            return await self.connect()
+        finally:
+            await self.disconnect()
     
     def get_info(self) -> Dict[str, Any]:
         """Получение информации об отправителе"""
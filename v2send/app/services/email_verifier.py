@@ -0,0 +1,139 @@
+"""Проверка доменов email по MX-записям (асинхронно, с кэшем по домену)"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from app.config import settings
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+    DNS_AVAILABLE = True
+except ImportError:
+    DNS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class MXVerifier:
+    """Второй уровень проверки email: принимает ли домен почту
+
+    Адреса группируются по домену, каждый уникальный домен резолвится
+    один раз: результат кэшируется на ttl (отрицательный - на negative_ttl),
+    одновременные запросы одного домена ждут общий запрос. Таймауты и сбои
+    DNS не считаются ошибкой адреса - такой домен просто не кэшируется надолго.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 24 * 3600,
+        negative_ttl: float = 3600,
+        concurrency: int = 20,
+        timeout: float = 5.0
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._cache: Dict[str, Tuple[float, bool, Optional[str]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._resolver = None
+
+    def _get_resolver(self):
+        if self._resolver is None:
+            self._resolver = dns.asyncresolver.Resolver()
+            self._resolver.lifetime = self.timeout
+        return self._resolver
+
+    async def check_domain(self, domain: str) -> Tuple[bool, Optional[str]]:
+        """(домен принимает почту, текст ошибки)"""
+        domain = domain.lower().rstrip(".")
+        cached = self._cache.get(domain)
+        if cached and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+
+        future = self._inflight.get(domain)
+        if future:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[domain] = future
+        try:
+            result, ttl = await self._resolve(domain)
+            if ttl > 0:
+                self._cache[domain] = (time.monotonic() + ttl, *result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку получат ожидающие; без них future не должен считаться забытым
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._inflight[domain]
+
+    async def _resolve(self, domain: str) -> Tuple[Tuple[bool, Optional[str]], float]:
+        """Результат проверки и срок его кэширования"""
+        if not DNS_AVAILABLE:
+            return (True, None), 0
+
+        resolver = self._get_resolver()
+        async with self._semaphore:
+            try:
+                answer = await resolver.resolve(domain, "MX")
+                # Null MX (RFC 7505): домен явно не принимает почту
+                if all(str(r.exchange) == "." for r in answer):
+                    return (False, f"Домен {domain} не принимает почту"), self.ttl
+                return (True, None), self.ttl
+            except dns.resolver.NXDOMAIN:
+                return (False, f"Домен {domain} не существует"), self.negative_ttl
+            except dns.resolver.NoAnswer:
+                pass
+            except (dns.exception.Timeout, dns.resolver.NoNameservers) as e:
+                logger.debug(f"MX lookup for {domain} failed: {e}")
+                return (True, None), 0
+
+            # Нет MX - почта доставляется на A/AAAA-запись домена (RFC 5321)
+            for record_type in ("A", "AAAA"):
+                try:
+                    await resolver.resolve(domain, record_type)
+                    return (True, None), self.ttl
+                except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                    continue
+                except (dns.exception.Timeout, dns.resolver.NoNameservers):
+                    return (True, None), 0
+            return (False, f"У домена {domain} нет почтовых серверов"), self.negative_ttl
+
+    async def verify_many(self, emails: Iterable[str]) -> Dict[str, Tuple[bool, Optional[str]]]:
+        """Проверка адресов: каждый уникальный домен резолвится один раз, параллельно"""
+        emails = list(emails)
+        domains = {email.rsplit("@", 1)[-1].lower() for email in emails}
+        results = await asyncio.gather(*[self.check_domain(d) for d in domains], return_exceptions=True)
+
+        by_domain = {}
+        for domain, result in zip(domains, results):
+            if isinstance(result, Exception):
+                logger.warning(f"MX check for {domain} failed: {result}")
+                result = (True, None)
+            by_domain[domain] = result
+        return {email: by_domain[email.rsplit("@", 1)[-1].lower()] for email in emails}
+
+
+_verifier: Optional[MXVerifier] = None
+
+
+def get_mx_verifier() -> MXVerifier:
+    """Общий экземпляр проверки MX (кэш доменов на процесс)"""
+    global _verifier
+    if _verifier is None:
+        if not DNS_AVAILABLE:
+            logger.warning("dnspython is not installed, MX check accepts every domain")
+        _verifier = MXVerifier(
+            ttl=settings.EMAIL_MX_CACHE_TTL,
+            negative_ttl=settings.EMAIL_MX_NEGATIVE_TTL,
+            concurrency=settings.EMAIL_MX_CONCURRENCY,
+            timeout=settings.EMAIL_MX_TIMEOUT
+        )
+    return _verifier
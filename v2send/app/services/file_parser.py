@@ -1,8 +1,10 @@
 import csv
+import itertools
 import json
 import openpyxl
-from typing import List, Dict, Tuple, Optional
-from app.utils.validators import validate_email_address, validate_phone_number, validate_telegram_username
+from typing import Iterator, List, Dict, Tuple, Optional
+from app.utils.batch_validators import validate_contacts
+from app.utils.validators import validate_email_address, validate_phone_number, validate_telegram_contact
 import logging
 
 logger = logging.getLogger(__name__)
@@ -104,61 +106,124 @@ class FileParser:
         
         return valid_contacts, invalid_contacts
     
+    # Названия колонок в заголовке Excel-листа
+    EXCEL_COLUMNS = {
+        'email': ['email', 'e-mail', 'mail', 'почта'],
+        'phone': ['phone', 'telephone', 'tel', 'mobile', 'телефон'],
+        'telegram': ['telegram', 'tg', 'username', 'пользователь']
+    }
+    FIRST_NAME_COLUMNS = ['first_name', 'first name', 'firstname', 'name', 'имя']
+    LAST_NAME_COLUMNS = ['last_name', 'last name', 'lastname', 'surname', 'фамилия']
+    
     @staticmethod
-    def parse_excel_file(file_path: str, contact_type: str) -> Tuple[List[Dict], List[str]]:
-        """Парсинг Excel файла"""
-        valid_contacts = []
-        invalid_contacts = []
-        
+    def _find_column(headers: List[str], names: List[str], exact: bool = False) -> Optional[int]:
+        for i, header in enumerate(headers):
+            if (header in names) if exact else any(name in header for name in names):
+                return i
+        return None
+    
+    @staticmethod
+    def _cell(row: tuple, index: Optional[int]) -> str:
+        if index is None or len(row) <= index or row[index] is None:
+            return ''
+        return str(row[index]).strip()
+    
+    @staticmethod
+    def _iter_excel_rows(file_path: str, contact_type: str) -> Iterator[Tuple[int, str, Dict]]:
+        """Строки всех листов без проверки контакта: (строк прочитано, "лист, строка N", данные)"""
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        rows_read = 0
         try:
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active
-            
-            # Получаем заголовки
-            headers = []
-            for cell in sheet[1]:
-                headers.append(cell.value.lower().strip() if cell.value else '')
-            
-            # Находим индекс колонки с контактами
-            contact_col_index = None
-            contact_columns = {
-                'email': ['email', 'e-mail', 'mail', 'почта'],
-                'phone': ['phone', 'telephone', 'tel', 'mobile', 'телефон'],
-                'telegram': ['telegram', 'tg', 'username', 'пользователь']
-            }
-            
-            for i, header in enumerate(headers):
-                if contact_type in contact_columns:
-                    if any(col in header for col in contact_columns[contact_type]):
-                        contact_col_index = i
-                        break
-            
-            # Если колонка не найдена, используем первую
-            if contact_col_index is None:
-                contact_col_index = 0
-            
-            # Парсим данные
-            for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), 2):
-                if row_num > 10000:  # Ограничение на количество строк
-                    break
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                first_row = next(rows, None)
+                if first_row is None:
+                    continue
+                
+                headers = [str(v).lower().strip() if v is not None else '' for v in first_row]
+                contact_col = FileParser._find_column(headers, FileParser.EXCEL_COLUMNS.get(contact_type, []))
+                first_name_col = FileParser._find_column(headers, FileParser.FIRST_NAME_COLUMNS, exact=True)
+                last_name_col = FileParser._find_column(headers, FileParser.LAST_NAME_COLUMNS, exact=True)
                 
-                if len(row) > contact_col_index and row[contact_col_index]:
-                    contact_value = str(row[contact_col_index]).strip()
+                has_header = contact_col is not None or first_name_col is not None or last_name_col is not None
+                if not has_header:
+                    headers = []
+                    first_name_col, last_name_col = 1, 2
+                    # Первая строка - данные
+                    rows = itertools.chain([first_row], rows)
+                else:
+                    # Строка заголовка
+                    rows_read += 1
+                if contact_col is None:
+                    contact_col = 0
+                
+                for row_num, row in enumerate(rows, 2 if has_header else 1):
+                    rows_read += 1
+                    contact_value = FileParser._cell(row, contact_col)
+                    if not contact_value:
+                        continue
                     
-                    is_valid, result = FileParser._validate_contact(contact_value, contact_type)
+                    metadata = {}
+                    for i, header in enumerate(headers):
+                        value = FileParser._cell(row, i)
+                        if header and value and i not in (contact_col, first_name_col, last_name_col):
+                            metadata[header] = value
                     
-                    if is_valid:
-                        contact_data = {
-                            'identifier': result,
-                            'first_name': str(row[1]).strip() if len(row) > 1 and row[1] else '',
-                            'last_name': str(row[2]).strip() if len(row) > 2 and row[2] else '',
-                            'metadata': {}
-                        }
-                        valid_contacts.append(contact_data)
-                    else:
-                        invalid_contacts.append(f"Строка {row_num}: {contact_value} - {result}")
-            
+                    yield rows_read, f"{sheet.title}, строка {row_num}", {
+                        'identifier': contact_value,
+                        'first_name': FileParser._cell(row, first_name_col),
+                        'last_name': FileParser._cell(row, last_name_col),
+                        'metadata': metadata
+                    }
+        finally:
             workbook.close()
+    
+    @staticmethod
+    def iter_excel_file(
+        file_path: str,
+        contact_type: str,
+        block_size: int = 1000
+    ) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+        """Потоковое чтение всех листов Excel: (строк прочитано, контакт, ошибка)
+        
+        Книга открывается в режиме read_only, строки читаются значениями по
+        одной, поэтому память не зависит от размера файла. Первая строка
+        листа считается заголовком, если в ней есть известные названия
+        колонок; иначе контакт - в первой колонке, имя и фамилия - во второй
+        и третьей. Счетчик строк сквозной по всем листам, в тексте ошибки -
+        лист и номер строки на нем. Колонка контактов проверяется блоками
+        по block_size строк (validate_contacts).
+        """
+        rows = FileParser._iter_excel_rows(file_path, contact_type)
+        try:
+            while True:
+                block = list(itertools.islice(rows, block_size))
+                if not block:
+                    return
+                checks = validate_contacts([data['identifier'] for _, _, data in block], contact_type)
+                for (rows_read, place, data), (is_valid, result) in zip(block, checks):
+                    if not is_valid:
+                        yield rows_read, None, f"{place}: {data['identifier']} - {result}"
+                        continue
+                    data['identifier'] = result
+                    yield rows_read, data, None
+        finally:
+            rows.close()
+    
+    @staticmethod
+    def parse_excel_file(file_path: str, contact_type: str, limit: Optional[int] = None) -> Tuple[List[Dict], List[str]]:
+        """Парсинг Excel файла (limit - максимум валидных контактов, например лимит плана)"""
+        valid_contacts = []
+        invalid_contacts = []
+        
+        try:
+            for _, contact_data, error in FileParser.iter_excel_file(file_path, contact_type):
+                if contact_data:
+                    valid_contacts.append(contact_data)
+                    if limit is not None and len(valid_contacts) >= limit:
+                        break
+                else:
+                    invalid_contacts.append(error)
         
         except Exception as e:
             logger.error(f"Error parsing Excel: {e}")
@@ -168,21 +233,12 @@ class FileParser:
     
     @staticmethod
     def _validate_contact(contact: str, contact_type: str) -> Tuple[bool, str]:
-        """Валидация контакта по типу"""
+        """Валидация контакта по типу (те же правила, что у импорта из текстовых файлов)"""
         if contact_type == "email":
             return validate_email_address(contact)
         elif contact_type == "phone":
             return validate_phone_number(contact)
         elif contact_type == "telegram":
-            # Пробуем как username
-            is_valid, result = validate_telegram_username(contact)
-            if is_valid:
-                return True, result
-            # Если не username, пробуем как ID
-            try:
-                user_id = int(contact)
-                return True, str(user_id)
-            except ValueError:
-                return False, "Неверный формат Telegram контакта"
+            return validate_telegram_contact(contact)
         else:
             return True, contact
\ No newline at end of file
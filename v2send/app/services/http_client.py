@@ -0,0 +1,81 @@
+"""Общие HTTP-клиенты процесса (aiohttp) с пулом соединений"""
+import asyncio
+import logging
+from typing import Dict, Tuple
+import aiohttp
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientRegistry:
+    """Реестр долгоживущих aiohttp.ClientSession
+
+    Одна сессия на имя и event loop: keep-alive соединения, DNS-кэш и
+    TLS-сессии переиспользуются между запросами всех HTTP-отправителей.
+    Число соединений ограничено как в целом, так и на каждый хост.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 60,
+        timeout: float = 30
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+
+    def get_session(self, name: str = "default") -> aiohttp.ClientSession:
+        """Сессия для текущего event loop (создается при первом обращении)"""
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(name)
+        if entry:
+            session_loop, session = entry
+            if session_loop is loop and not session.closed:
+                return session
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._sessions[name] = (loop, session)
+        return session
+
+    async def close(self):
+        """Закрытие всех сессий (вызывается при остановке бота и воркера)"""
+        sessions, self._sessions = self._sessions, {}
+        current = asyncio.get_running_loop()
+        for name, (loop, session) in sessions.items():
+            # Сессию из чужого (уже закрытого) loop корректно закрыть нельзя
+            if loop is not current or session.closed:
+                continue
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP session {name}: {e}")
+
+
+http_clients = HTTPClientRegistry(
+    limit=settings.HTTP_POOL_LIMIT,
+    limit_per_host=settings.HTTP_LIMIT_PER_HOST,
+    dns_ttl=settings.HTTP_DNS_CACHE_TTL,
+    keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+    timeout=settings.HTTP_TIMEOUT
+)
+
+
+def get_http_session(name: str = "default") -> aiohttp.ClientSession:
+    """Общая HTTP-сессия процесса"""
+    return http_clients.get_session(name)
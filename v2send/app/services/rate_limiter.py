@@ -0,0 +1,127 @@
+"""Распределенный ограничитель темпа отправки (token bucket в Redis)"""
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.database.models import SenderType
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY = "ratelimit:{scope}"
+
+# GCRA (token bucket в форме "теоретического времени прихода") сразу для
+# нескольких ключей. Запрос резервирует ближайший слот, общий для всех
+# ключей, и возвращает, сколько миллисекунд до него ждать. Время берется
+# из Redis, поэтому часы воркеров не важны.
+# KEYS - ключи бакетов; ARGV - пары (интервал_мкс, допуск_мкс) для каждого ключа.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000000 + tonumber(now_parts[2])
+local start = now
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local tolerance = tonumber(ARGV[i * 2])
+    local tat = math.max(tonumber(redis.call('GET', key) or '0'), now)
+    tats[i] = tat
+    start = math.max(start, tat - tolerance)
+end
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2 - 1])
+    local new_tat = math.max(tats[i], start) + interval
+    redis.call('SET', key, string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000) + 1000)
+end
+return math.floor((start - now) / 1000)
+"""
+
+
+def get_rate_limits(sender_type: SenderType) -> Tuple[float, float]:
+    """Лимиты (сообщений в секунду) на отправителя и на учетную запись провайдера"""
+    limits = {
+        SenderType.TELEGRAM: (settings.TELEGRAM_RATE_LIMIT, settings.TELEGRAM_PROVIDER_RATE_LIMIT),
+        SenderType.EMAIL: (settings.EMAIL_RATE_LIMIT, settings.EMAIL_PROVIDER_RATE_LIMIT),
+        SenderType.WHATSAPP: (settings.WHATSAPP_RATE_LIMIT, settings.WHATSAPP_PROVIDER_RATE_LIMIT),
+        SenderType.SMS: (settings.SMS_RATE_LIMIT, settings.SMS_PROVIDER_RATE_LIMIT),
+        SenderType.VIBER: (settings.VIBER_RATE_LIMIT, settings.VIBER_PROVIDER_RATE_LIMIT),
+    }
+    return limits.get(sender_type, (0, 0))
+
+
+def provider_identity(sender_type: SenderType, config: Dict[str, Any]) -> Optional[str]:
+    """Учетная запись провайдера, общая для всех отправителей с теми же реквизитами"""
+    fields = {
+        SenderType.TELEGRAM: ("phone",),
+        SenderType.EMAIL: ("smtp_host", "email"),
+        SenderType.WHATSAPP: ("account_sid",),
+        SenderType.SMS: ("api_key",),
+        SenderType.VIBER: ("api_key",),
+    }.get(sender_type)
+    if not fields or not all(config.get(f) for f in fields):
+        return None
+    raw = ":".join(str(config[f]) for f in fields)
+    # В имени ключа не должно быть секретов
+    return hashlib.sha1(f"{sender_type.value}:{raw}".encode()).hexdigest()[:16]
+
+
+class RateLimiter:
+    """Асинхронный acquire() по нескольким бакетам Redis сразу
+
+    Каждый бакет задается скоростью (в секунду) и размером всплеска. Слот
+    резервируется атомарно в Redis, так что лимит общий для всех воркеров.
+    Внутри одного экземпляра (одной кампании) одновременно ждет не больше
+    одного резерва, поэтому кампании на общем отправителе получают слоты
+    по очереди, а не пропорционально числу своих параллельных отправок.
+    """
+
+    def __init__(self, redis, limits: List[Tuple[str, float, int]], max_wait: float = 3600):
+        self.redis = redis
+        self.max_wait = max_wait
+        self.keys: List[str] = []
+        self.intervals: List[int] = []
+        self.tolerances: List[int] = []
+        for scope, rate, burst in limits:
+            if rate and rate > 0:
+                interval = int(1_000_000 / rate)
+                self.keys.append(RATE_LIMIT_KEY.format(scope=scope))
+                self.intervals.append(interval)
+                self.tolerances.append(interval * (max(1, burst) - 1))
+        self._lock = asyncio.Lock()
+        self._script = None
+
+    async def acquire(self, count: int = 1):
+        """Дождаться слота для отправки count сообщений"""
+        if not self.redis or not self.keys:
+            return
+        args = []
+        for interval, tolerance in zip(self.intervals, self.tolerances):
+            args.extend([interval * max(1, count), tolerance])
+        async with self._lock:
+            try:
+                if self._script is None:
+                    self._script = self.redis.register_script(ACQUIRE_SCRIPT)
+                wait_ms = int(await self._script(keys=self.keys, args=args))
+            except Exception as e:
+                # Redis недоступен - не останавливаем рассылку
+                logger.warning(f"Rate limiter unavailable: {e}")
+                return
+            if wait_ms > 0:
+                await asyncio.sleep(min(wait_ms / 1000, self.max_wait))
+
+
+def build_rate_limiter(redis, sender_type: SenderType, sender_id: Optional[int], config: Dict[str, Any]) -> Optional[RateLimiter]:
+    """Ограничитель для отправителя: бакет отправителя + бакет учетной записи провайдера"""
+    if not settings.RATE_LIMIT_ENABLED or redis is None:
+        return None
+
+    sender_rate, provider_rate = get_rate_limits(sender_type)
+    # Отправитель может задать свой лимит в конфиге
+    sender_rate = config.get("rate_limit", sender_rate)
+    burst = config.get("rate_burst", settings.RATE_LIMIT_BURST)
+
+    limits = []
+    if sender_id is not None:
+        limits.append((f"sender:{sender_id}", sender_rate, burst))
+    identity = provider_identity(sender_type, config)
+    if identity:
+        limits.append((f"provider:{identity}", provider_rate, burst))
+    return RateLimiter(redis, limits) if limits else None
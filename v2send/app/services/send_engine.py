@@ -0,0 +1,284 @@
+"""Движок параллельной отправки сообщений кампании"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from app.config import settings
+from app.database.models import SenderType
+
+logger = logging.getLogger(__name__)
+
+
+def get_send_concurrency(sender_type: SenderType) -> int:
+    """Лимит одновременных отправок для типа отправителя"""
+    limits = {
+        SenderType.TELEGRAM: settings.TELEGRAM_SEND_CONCURRENCY,
+        SenderType.EMAIL: settings.EMAIL_SEND_CONCURRENCY,
+        SenderType.WHATSAPP: settings.WHATSAPP_SEND_CONCURRENCY,
+        SenderType.SMS: settings.SMS_SEND_CONCURRENCY,
+        SenderType.VIBER: settings.VIBER_SEND_CONCURRENCY,
+    }
+    return max(1, limits.get(sender_type, 1))
+
+
+class SendJob:
+    """Одно сообщение для отправки"""
+
+    __slots__ = ("contact_id", "recipient", "message", "subject")
+
+    def __init__(self, contact_id: int, recipient: str, message: str, subject: Optional[str] = None):
+        self.contact_id = contact_id
+        self.recipient = recipient
+        self.message = message
+        self.subject = subject
+
+
+class SendResult:
+    """Результат отправки одного сообщения"""
+
+    __slots__ = ("job", "success", "error", "external_id", "sent_at")
+
+    def __init__(
+        self,
+        job: SendJob,
+        success: bool,
+        error: Optional[str] = None,
+        external_id: Optional[str] = None
+    ):
+        self.job = job
+        self.success = success
+        self.error = error
+        self.external_id = external_id
+        self.sent_at = datetime.utcnow()
+
+
+class DeliveryCursor:
+    """Курсор доставки: последний id контакта, до которого все отправки завершены
+
+    Контакты выдаются по возрастанию id, а результаты при параллельной
+    отправке приходят в произвольном порядке, поэтому позиция сдвигается
+    только по непрерывному префиксу завершенных контактов.
+    """
+
+    def __init__(self, position: int = 0):
+        self.position = position
+        self._pending: deque = deque()
+        self._done = set()
+
+    def track(self, contact_id: int):
+        """Контакт передан на отправку"""
+        self._pending.append(contact_id)
+
+    def done(self, contact_id: int):
+        """Отправка контакту завершена (успешно или с ошибкой)"""
+        self._done.add(contact_id)
+        while self._pending and self._pending[0] in self._done:
+            self.position = self._pending.popleft()
+            self._done.discard(self.position)
+
+
+class PacingPolicy:
+    """Темп отправки по настройкам кампании (batch_size / delay_seconds)
+
+    Как и раньше, delay_seconds - пауза между сообщениями одного отправителя,
+    а после каждых batch_size сообщений - пауза delay_seconds * 2. Теперь это
+    интервал между стартами отправок, поэтому время самой отправки к задержке
+    не добавляется. Параллельные слоты движка только перекрывают сетевые
+    задержки и темп не меняют; ускоряет рассылку лишь число отправителей
+    (senders): каждый из них сохраняет свой темп. При delay_seconds = 0
+    пауз нет, и темп определяют число слотов и ограничитель отправителя.
+    """
+
+    def __init__(self, batch_size: int, delay_seconds: float, senders: int = 1):
+        self.batch_size = max(1, batch_size) * max(1, senders)
+        self.interval = max(0.0, delay_seconds) / max(1, senders)
+        self.batch_pause = max(0.0, delay_seconds) * 2
+        self._next_slot = 0.0
+        self._started = 0
+        self._lock = asyncio.Lock()
+
+    async def wait(self, count: int = 1):
+        """Дождаться своего слота для отправки (count - сообщений в одном запросе)"""
+        if self.interval <= 0:
+            return
+
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = self._next_slot
+
+            # Пакет занимает столько слотов, сколько в нем сообщений
+            gap = 0.0
+            for _ in range(max(1, count)):
+                self._started += 1
+                gap += self.interval
+                if self._started % self.batch_size == 0:
+                    gap += self.batch_pause
+            self._next_slot = now + gap
+
+
+class SendEngine:
+    """Пул асинхронных воркеров с ограничением числа одновременных отправок
+
+    Если сервис умеет deliver_batch() и задает max_batch_size, воркер берет
+    из очереди сразу несколько сообщений и отправляет их одним запросом.
+    """
+
+    def __init__(self, sender_service, concurrency: int, pacing: Optional[PacingPolicy] = None):
+        self.sender_service = sender_service
+        self.concurrency = max(1, concurrency)
+        self.pacing = pacing or PacingPolicy(1, 0)
+        self.batch_size = 1
+        if getattr(sender_service, "deliver_batch", None):
+            self.batch_size = max(1, getattr(sender_service, "max_batch_size", 1))
+        self.completed = 0
+        self.started_at: Optional[float] = None
+        self._stopping = False
+
+    @property
+    def throughput(self) -> float:
+        """Текущая скорость отправки, сообщений в секунду"""
+        if not self.started_at:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def stopped(self) -> bool:
+        """Выдача сообщений была прекращена через stop()"""
+        return self._stopping
+
+    def stop(self):
+        """Прекратить выдачу новых сообщений; начатые отправки будут завершены"""
+        self._stopping = True
+
+    async def run(self, jobs: AsyncIterator[SendJob]) -> AsyncIterator[SendResult]:
+        """Отправка сообщений из jobs, результаты отдаются по мере готовности"""
+        self.started_at = time.monotonic()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * self.batch_size * 2)
+        results: asyncio.Queue = asyncio.Queue()
+
+        # Необязательные хуки сервиса: заранее разрешить получателя (prefetch)
+        # и подготовиться к отправке до ожидания темпа (prepare)
+        prefetch = getattr(self.sender_service, "prefetch", None)
+        prepare = getattr(self.sender_service, "prepare", None)
+
+        async def produce():
+            try:
+                async for job in jobs:
+                    if self._stopping:
+                        break
+                    if prefetch:
+                        prefetch(job.recipient)
+                    await queue.put(job)
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        async def work():
+            finished = False
+            while not finished:
+                job = await queue.get()
+                if job is None:
+                    break
+                # Добираем пакет из того, что уже есть в очереди
+                batch = [job]
+                while len(batch) < self.batch_size and not queue.empty():
+                    job = queue.get_nowait()
+                    if job is None:
+                        finished = True
+                        break
+                    batch.append(job)
+                if self._stopping:
+                    continue
+                if prepare:
+                    for job in batch:
+                        try:
+                            await prepare(job.recipient)
+                        except Exception as e:
+                            logger.debug(f"Prepare failed for {job.recipient}: {e}")
+                await self.pacing.wait(len(batch))
+                if self.batch_size > 1:
+                    for result in await self._send_batch(batch):
+                        results.put_nowait(result)
+                else:
+                    results.put_nowait(await self._send(batch[0]))
+
+        async def finish():
+            try:
+                await asyncio.gather(*workers)
+                await producer
+            finally:
+                results.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        finisher = asyncio.create_task(finish())
+
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            await finisher
+        finally:
+            for t in [producer, finisher, *workers]:
+                if not t.done():
+                    t.cancel()
+
+    async def _send(self, job: SendJob) -> SendResult:
+        """Отправка одного сообщения с перехватом ошибок
+
+        Если сервис умеет deliver() (возвращает dict с success, message_id и
+        error), берем его: так в лог попадают id сообщения у провайдера и
+        текст ошибки.
+        """
+        try:
+            deliver = getattr(self.sender_service, "deliver", None)
+            if deliver:
+                data = await deliver(job.recipient, job.message, job.subject)
+                success = bool(data.get("success"))
+                result = SendResult(
+                    job,
+                    success,
+                    None if success else (data.get("error") or "Failed to send message"),
+                    data.get("message_id")
+                )
+            else:
+                success = await self.sender_service.send_message(job.recipient, job.message, job.subject)
+                result = SendResult(job, success, None if success else "Failed to send message")
+        except Exception as e:
+            logger.error(f"Error sending message to {job.recipient}: {e}")
+            result = SendResult(job, False, str(e))
+
+        self.completed += 1
+        return result
+
+    async def _send_batch(self, jobs: List[SendJob]) -> List[SendResult]:
+        """Отправка пакета одним запросом; результат - на каждое сообщение"""
+        try:
+            data = await self.sender_service.deliver_batch(
+                [(job.recipient, job.message, job.subject) for job in jobs]
+            )
+            results = []
+            for job, item in zip(jobs, data):
+                success = bool(item.get("success"))
+                results.append(SendResult(
+                    job,
+                    success,
+                    None if success else (item.get("error") or "Failed to send message"),
+                    item.get("message_id")
+                ))
+            # Сервис вернул меньше результатов, чем сообщений
+            for job in jobs[len(results):]:
+                results.append(SendResult(job, False, "No result from provider"))
+        except Exception as e:
+            logger.error(f"Error sending batch of {len(jobs)} messages: {e}")
+            results = [SendResult(job, False, str(e)) for job in jobs]
+
+        self.completed += len(results)
+        return results
@@ -0,0 +1,291 @@
+"""Балансировка рассылки между несколькими отправителями одного типа"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMember:
+    """Отправитель в пуле: вес, здоровье и текущая нагрузка"""
+
+    def __init__(self, sender_id: int, service, weight: float = 1.0, concurrency: int = 1):
+        self.sender_id = sender_id
+        self.service = service
+        self.weight = max(0.01, float(weight))
+        self.slots = asyncio.Semaphore(max(1, concurrency))
+
+        self.health = 1.0  # сглаженная доля успешных отправок
+        self.assigned = 0  # назначено, но еще не отправлено
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0  # monotonic
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def throttled(self) -> bool:
+        """Отправитель временно недоступен (серия ошибок или FloodWait)"""
+        if self.cooldown_until > time.monotonic():
+            return True
+        controller = getattr(self.service, "rate_controller", None)
+        return bool(controller and controller.blocked_until > time.time())
+
+    @property
+    def score(self) -> float:
+        """Чем меньше, тем охотнее отправителю дается следующее сообщение"""
+        return (self.assigned + 1) / (self.weight * max(self.health, 0.05))
+
+    def record(self, success: bool, failure_threshold: int, cooldown: float) -> bool:
+        """Учет результата; True - отправитель только что выведен из ротации"""
+        self.health = 0.9 * self.health + (0.1 if success else 0.0)
+        if success:
+            self.sent += 1
+            self.consecutive_failures = 0
+            return False
+
+        self.failed += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= failure_threshold:
+            self.consecutive_failures = 0
+            self.cooldown_until = time.monotonic() + cooldown
+            return True
+        return False
+
+    @property
+    def max_batch_size(self) -> int:
+        """Сколько сообщений отправитель принимает одним запросом"""
+        if not getattr(self.service, "deliver_batch", None):
+            return 1
+        return max(1, getattr(self.service, "max_batch_size", 1))
+
+    def discard(self, recipient: str):
+        """Сообщение уйдет через другого отправителя - подготовка больше не нужна"""
+        discard = getattr(self.service, "discard", None)
+        if discard:
+            discard(recipient)
+
+    async def deliver(self, recipient: str, message: str, subject: Optional[str]) -> Dict[str, Any]:
+        deliver = getattr(self.service, "deliver", None)
+        if deliver:
+            return await deliver(recipient, message, subject)
+        success = await self.service.send_message(recipient, message, subject)
+        return {"success": success, "message_id": None, "error": None if success else "Failed to send message"}
+
+
+class SenderPool:
+    """Несколько отправителей кампании за интерфейсом одного сервиса
+
+    Получатель закрепляется за отправителем при постановке в очередь
+    (prefetch), чтобы подготовка и отправка шли от одного аккаунта.
+    Выбирается наименее загруженный с учетом веса и доли успешных отправок.
+    Отправитель, у которого подряд failure_threshold ошибок или который
+    ждет FloodWait, на время выводится из ротации, и его трафик уходит
+    остальным; сообщение, на котором он "сломался", повторяется через
+    другого отправителя.
+    """
+
+    def __init__(self, members: List[PoolMember], failure_threshold: int = 5, cooldown: float = 60):
+        self.members = members
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._assigned: Dict[str, PoolMember] = {}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    @property
+    def adaptive_rate(self) -> bool:
+        """Темп задают сами отправители (например, Telegram по FloodWait)"""
+        return any(getattr(m.service, "adaptive_rate", False) for m in self.members)
+
+    @property
+    def max_batch_size(self) -> int:
+        """Пакетная отправка (SMS, Viber, email fan-out) остается доступной и в пуле"""
+        return max(m.max_batch_size for m in self.members)
+
+    @property
+    def humanize_mode(self) -> Optional[str]:
+        for member in self.members:
+            if hasattr(member.service, "humanize_mode"):
+                return member.service.humanize_mode
+        return None
+
+    @humanize_mode.setter
+    def humanize_mode(self, value: str):
+        for member in self.members:
+            if hasattr(member.service, "humanize_mode"):
+                member.service.humanize_mode = value
+
+    def _choose(self, exclude: Optional[PoolMember] = None) -> PoolMember:
+        candidates = [m for m in self.members if m is not exclude] or self.members
+        available = [m for m in candidates if not m.throttled]
+        if available:
+            return min(available, key=lambda m: m.score)
+        # Все недоступны - ждем того, кто освободится раньше
+        return min(candidates, key=lambda m: m.cooldown_until)
+
+    def _assign(self, recipient: str) -> PoolMember:
+        member = self._assigned.get(recipient)
+        if member is None:
+            member = self._choose()
+            member.assigned += 1
+            self._assigned[recipient] = member
+        return member
+
+    def _take(self, recipient: str) -> PoolMember:
+        member = self._assigned.pop(recipient, None)
+        if member is None:
+            return self._choose()
+        member.assigned -= 1
+        if member.throttled:
+            # Пока сообщение ждало в очереди, отправитель выбыл из ротации
+            replacement = self._choose(exclude=member)
+            if not replacement.throttled:
+                member.discard(recipient)
+                return replacement
+        return member
+
+    def prefetch(self, recipient: str):
+        """Закрепление получателя за отправителем и его подготовка заранее"""
+        member = self._assign(recipient)
+        prefetch = getattr(member.service, "prefetch", None)
+        if prefetch:
+            prefetch(recipient)
+
+    async def prepare(self, recipient: str):
+        member = self._assigned.get(recipient)
+        prepare = getattr(member.service, "prepare", None) if member else None
+        if prepare:
+            await prepare(recipient)
+
+    async def deliver(self, recipient: str, message: str, subject: Optional[str] = None) -> Dict[str, Any]:
+        """Отправка через закрепленного (или наименее загруженного) отправителя"""
+        member = self._take(recipient)
+        result = await self._deliver_via(member, recipient, message, subject)
+
+        if not result.get("success") and len(self.members) > 1 and member.throttled:
+            # Ошибка похожа на проблему отправителя - пробуем другого
+            fallback = self._choose(exclude=member)
+            if not fallback.throttled:
+                logger.info(f"Retrying {recipient} via sender {fallback.sender_id} instead of {member.sender_id}")
+                result = await self._deliver_via(fallback, recipient, message, subject)
+        return result
+
+    async def deliver_batch(self, messages: List[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Пакет делится по закрепленным отправителям; каждый отправляет свою часть
+
+        Отправитель без пакетной отправки получает сообщения по одному.
+        Ошибки отправителя, выбывшего из ротации, повторяются через другого.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        by_member: Dict[int, Tuple[PoolMember, List[int]]] = {}
+        for index, (recipient, _, _) in enumerate(messages):
+            member = self._take(recipient)
+            by_member.setdefault(id(member), (member, []))[1].append(index)
+
+        async def send_part(member: PoolMember, indexes: List[int]):
+            if member.max_batch_size > 1:
+                for start in range(0, len(indexes), member.max_batch_size):
+                    part = indexes[start:start + member.max_batch_size]
+                    data = await self._deliver_batch_via(member, [messages[i] for i in part])
+                    for index, result in zip(part, data):
+                        results[index] = result
+            else:
+                for index in indexes:
+                    results[index] = await self._deliver_via(member, *messages[index])
+
+        await asyncio.gather(*[send_part(member, indexes) for member, indexes in by_member.values()])
+
+        if len(self.members) > 1:
+            for member, indexes in by_member.values():
+                failed = [i for i in indexes if not results[i].get("success")]
+                if not failed or not member.throttled:
+                    continue
+                fallback = self._choose(exclude=member)
+                if fallback.throttled:
+                    continue
+                logger.info(
+                    f"Retrying {len(failed)} messages via sender {fallback.sender_id} "
+                    f"instead of {member.sender_id}"
+                )
+                await send_part(fallback, failed)
+        return results
+
+    async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
+        result = await self.deliver(recipient, message, subject)
+        return bool(result.get("success"))
+
+    async def _deliver_via(self, member: PoolMember, recipient: str, message: str, subject: Optional[str]) -> Dict[str, Any]:
+        async with member.slots:
+            wait = member.cooldown_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await member.deliver(recipient, message, subject)
+            except Exception as e:
+                logger.error(f"Sender {member.sender_id} failed to send to {recipient}: {e}")
+                result = {"success": False, "message_id": None, "error": str(e)}
+
+        self._record(member, result)
+        return result
+
+    def _record(self, member: PoolMember, result: Dict[str, Any]):
+        if member.record(bool(result.get("success")), self.failure_threshold, self.cooldown):
+            logger.warning(
+                f"Sender {member.sender_id} removed from rotation for {self.cooldown:.0f}s "
+                f"after {self.failure_threshold} consecutive failures"
+            )
+
+    async def _deliver_batch_via(
+        self,
+        member: PoolMember,
+        messages: List[Tuple[str, str, Optional[str]]]
+    ) -> List[Dict[str, Any]]:
+        async with member.slots:
+            wait = member.cooldown_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                results = list(await member.service.deliver_batch(messages))
+            except Exception as e:
+                logger.error(f"Sender {member.sender_id} failed to send a batch of {len(messages)}: {e}")
+                results = []
+            # Сервис вернул меньше результатов, чем сообщений
+            for _ in messages[len(results):]:
+                results.append({"success": False, "message_id": None, "error": "No result from provider"})
+
+        for result in results:
+            self._record(member, result)
+        return results
+
+    async def prejoin_invite_links(self, invite_links: List[str], should_stop: Callable[[], bool] = None):
+        """Предварительное вступление в группы - каждым аккаунтом пула"""
+        await asyncio.gather(*[
+            m.service.prejoin_invite_links(invite_links, should_stop=should_stop)
+            for m in self.members
+            if hasattr(m.service, "prejoin_invite_links")
+        ])
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Распределение отправок по отправителям"""
+        return [
+            {
+                "sender_id": m.sender_id,
+                "sent": m.sent,
+                "failed": m.failed,
+                "health": round(m.health, 3),
+                "throttled": m.throttled
+            }
+            for m in self.members
+        ]
+
+    async def disconnect(self):
+        logger.info(f"Sender pool stats: {self.stats()}")
+        self._assigned.clear()
+        for member in self.members:
+            if hasattr(member.service, "disconnect"):
+                try:
+                    await member.service.disconnect()
+                except Exception as e:
+                    logger.warning(f"Error disconnecting sender {member.sender_id}: {e}")
@@ -1,35 +1,40 @@
-import aiohttp
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from urllib.parse import urlencode
+from app.config import settings
+from app.services.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
 class SMSSenderService:
     """Сервис для отправки SMS сообщений"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], rate_limiter=None):
         self.api_key = config["api_key"]
         self.api_url = config.get("api_url", "https://api.sms.ru/sms/send")
         self.sender_name = config.get("sender_name", "")
+        # Сколько номеров отправлять одним запросом
+        self.max_batch_size = max(1, min(int(config.get("batch_size", settings.SMS_BATCH_SIZE)), 100))
+        # Общий лимит темпа (см. app.services.rate_limiter)
+        self.rate_limiter = rate_limiter
         self.is_connected = False
     
     async def connect(self) -> bool:
         """Тест подключения к SMS API"""
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    "api_id": self.api_key,
-                    "json": 1
-                }
+            session = get_http_session()
+            params = {
+                "api_id": self.api_key,
+                "json": 1
+            }
                 
-                async with session.get(f"{self.api_url.replace('/send', '/my/balance')}", params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == "OK":
-                            self.is_connected = True
-                            logger.info("Successfully connected to SMS API")
-                            return True
+            async with session.get(f"{self.api_url.replace('/send', '/my/balance')}", params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("status") == "OK":
+                        self.is_connected = True
+                        logger.info("Successfully connected to SMS API")
+                        return True
             
             return False
             
@@ -37,57 +42,127 @@ class SMSSenderService:
             logger.error(f"Error connecting to SMS API: {e}")
             return False
     
+    @staticmethod
+    def _normalize_phone(recipient: str) -> str:
+        return recipient.replace("+", "").replace(" ", "").replace("-", "")
+    
     async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
         """Отправка SMS сообщения"""
+        result = await self.deliver(recipient, message, subject)
+        return result["success"]
+    
+    async def deliver(self, recipient: str, message: str, subject: str = None) -> Dict[str, Any]:
+        """Отправка одного SMS: success, message_id (sms_id) и error"""
+        results = await self.deliver_batch([(recipient, message, subject)])
+        return results[0]
+    
+    async def deliver_batch(self, messages: List[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Отправка нескольких SMS минимальным числом запросов к API
+        
+        Результаты возвращаются в порядке messages. Номер может встречаться
+        в запросе только один раз, поэтому повторы уходят следующим запросом.
+        """
         if not self.is_connected:
             if not await self.connect():
-                return False
+                return [
+                    {"success": False, "message_id": None, "error": "SMS API is unavailable"}
+                    for _ in messages
+                ]
         
-        try:
-            # Очищаем номер
-            phone = recipient.replace("+", "").replace(" ", "").replace("-", "")
-            
-            params = {
-                "api_id": self.api_key,
-                "to": phone,
-                "msg": message,
-                "json": 1
-            }
-            
-            if self.sender_name:
-                params["from"] = self.sender_name
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, data=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == "OK":
-                            logger.info(f"SMS sent to {recipient}")
-                            return True
-                        else:
-                            logger.error(f"SMS API error: {data.get('status_text', 'Unknown error')}")
-                            return False
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        pending = list(range(len(messages)))
+        while pending:
+            chunk, rest, phones = [], [], set()
+            for index in pending:
+                phone = self._normalize_phone(messages[index][0])
+                if phone in phones or len(chunk) >= self.max_batch_size:
+                    rest.append(index)
+                else:
+                    phones.add(phone)
+                    chunk.append((index, phone))
             
-            return False
+            chunk_results = await self._send_chunk([(phone, messages[i][1]) for i, phone in chunk])
+            for (index, _), result in zip(chunk, chunk_results):
+                results[index] = result
+            pending = rest
+        
+        return results
+    
+    async def _send_chunk(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Один запрос к SMS.ru: общий текст - через "to", разные - через "multi" """
+        params = {
+            "api_id": self.api_key,
+            "json": 1
+        }
+        texts = {text for _, text in items}
+        if len(texts) == 1:
+            params["to"] = ",".join(phone for phone, _ in items)
+            params["msg"] = texts.pop()
+        else:
+            for phone, text in items:
+                params[f"multi[{phone}]"] = text
+        
+        if self.sender_name:
+            params["from"] = self.sender_name
+        
+        def fail_all(error: str) -> List[Dict[str, Any]]:
+            return [{"success": False, "message_id": None, "error": error} for _ in items]
+        
+        try:
+            # Лимит считается в сообщениях: запрос на N номеров занимает N слотов
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(len(items))
             
+            session = get_http_session()
+            async with session.post(self.api_url, data=params) as response:
+                if response.status != 200:
+                    logger.error(f"SMS API HTTP error {response.status}")
+                    return fail_all(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+        
         except Exception as e:
-            logger.error(f"Error sending SMS to {recipient}: {e}")
-            return False
+            logger.error(f"Error sending SMS batch of {len(items)}: {e}")
+            return fail_all(str(e))
+        
+        if data.get("status") != "OK":
+            error = data.get("status_text", "Unknown error")
+            logger.error(f"SMS API error: {error}")
+            return fail_all(error)
+        
+        # Статус и sms_id по каждому номеру
+        statuses = data.get("sms") or {}
+        results = []
+        for phone, _ in items:
+            status = statuses.get(phone)
+            if status is None:
+                results.append({"success": False, "message_id": None, "error": "No status for number"})
+            elif status.get("status") == "OK":
+                results.append({"success": True, "message_id": status.get("sms_id"), "error": None})
+            else:
+                results.append({
+                    "success": False,
+                    "message_id": None,
+                    "error": status.get("status_text") or f"Status code {status.get('status_code')}"
+                })
+        
+        sent = sum(1 for r in results if r["success"])
+        logger.info(f"SMS batch sent: {sent}/{len(items)}")
+        return results
     
     async def get_balance(self) -> Optional[float]:
         """Получение баланса"""
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    "api_id": self.api_key,
-                    "json": 1
-                }
+            session = get_http_session()
+            params = {
+                "api_id": self.api_key,
+                "json": 1
+            }
                 
-                async with session.get(f"{self.api_url.replace('/send', '/my/balance')}", params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == "OK":
-                            return float(data.get("balance", 0))
+            async with session.get(f"{self.api_url.replace('/send', '/my/balance')}", params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("status") == "OK":
+                        return float(data.get("balance", 0))
             
             return None
             
@@ -0,0 +1,121 @@
+"""Пул подключенных Telethon-клиентов процесса воркера"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from telethon import TelegramClient
+from telethon.tl.functions import PingRequest
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PooledTelegramClient:
+    """Клиент в пуле и его служебное состояние"""
+
+    __slots__ = ("client", "loop", "in_use", "last_used", "checked_at")
+
+    def __init__(self, client: TelegramClient, loop: asyncio.AbstractEventLoop):
+        self.client = client
+        self.loop = loop
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.checked_at = time.monotonic()
+
+
+class TelegramClientPool:
+    """Подключенные и авторизованные клиенты, ключ - id отправителя
+
+    Клиент живет между кампаниями: повторный запуск не платит за connect,
+    авторизацию и get_me. Перед выдачей давно не проверенного клиента
+    делается ping; клиенты, которые не использовались idle_timeout секунд,
+    отключаются при следующем обращении к пулу.
+    """
+
+    def __init__(self, idle_timeout: float = 1800, ping_interval: float = 300):
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self._entries: Dict[str, PooledTelegramClient] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def acquire(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Optional[TelegramClient]]]
+    ) -> Optional[TelegramClient]:
+        """Клиент из пула или новый, созданный factory (None - подключиться не удалось)"""
+        await self.evict_idle()
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry and not await self._is_healthy(entry):
+                await self._drop(key)
+                entry = None
+
+            if entry is None:
+                client = await factory()
+                if client is None:
+                    return None
+                entry = PooledTelegramClient(client, asyncio.get_running_loop())
+                self._entries[key] = entry
+
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+            return entry.client
+
+    async def release(self, key: str):
+        """Клиент больше не нужен вызывающему; соединение остается в пуле"""
+        entry = self._entries.get(key)
+        if entry:
+            entry.in_use = max(0, entry.in_use - 1)
+            entry.last_used = time.monotonic()
+
+    async def discard(self, key: str):
+        """Отключение и удаление клиента (например, сессия отозвана)"""
+        await self._drop(key)
+
+    async def evict_idle(self):
+        """Отключение клиентов, простаивающих дольше idle_timeout"""
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.in_use == 0 and now - entry.last_used > self.idle_timeout:
+                logger.info(f"Evicting idle Telegram client {key}")
+                await self._drop(key)
+
+    async def close(self):
+        """Отключение всех клиентов (остановка воркера)"""
+        for key in list(self._entries):
+            await self._drop(key)
+
+    async def _is_healthy(self, entry: PooledTelegramClient) -> bool:
+        if entry.loop is not asyncio.get_running_loop() or not entry.client.is_connected():
+            return False
+        if time.monotonic() - entry.checked_at < self.ping_interval:
+            return True
+        try:
+            await entry.client(PingRequest(ping_id=random.randint(1, 2 ** 62)))
+            entry.checked_at = time.monotonic()
+            return True
+        except Exception as e:
+            logger.warning(f"Telegram client health check failed: {e}")
+            return False
+
+    async def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        # Клиент из другого (закрытого) event loop отключить корректно нельзя
+        if entry.loop is not asyncio.get_running_loop():
+            return
+        try:
+            await entry.client.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting Telegram client {key}: {e}")
+
+
+telegram_clients = TelegramClientPool(
+    idle_timeout=settings.TELEGRAM_CLIENT_IDLE_TIMEOUT,
+    ping_interval=settings.TELEGRAM_CLIENT_PING_INTERVAL
+)
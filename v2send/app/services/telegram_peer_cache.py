@@ -0,0 +1,136 @@
+"""Кэш разрешенных Telegram-получателей (peer id + access_hash) в Redis"""
+import logging
+from typing import Dict, List, Optional
+from telethon import utils
+from telethon.tl.types import InputPeerUser, InputPeerChat, InputPeerChannel
+
+logger = logging.getLogger(__name__)
+
+PEER_KEY = "tg:peer:{account}:{identifier}"
+# Пометка "получатель не существует" (отрицательное кэширование)
+MISSING = "-"
+
+
+def normalize_identifier(identifier: str) -> str:
+    """Единая форма идентификатора: @User, t.me/User и User - один получатель"""
+    identifier = identifier.strip()
+    for prefix in ("https://t.me/", "http://t.me/", "t.me/", "https://telegram.me/"):
+        if identifier.startswith(prefix):
+            identifier = identifier[len(prefix):]
+            break
+    identifier = identifier.lstrip("@").rstrip("/")
+    # Хеш ссылки-приглашения чувствителен к регистру, username - нет
+    if identifier.lstrip("-").isdigit() or identifier.startswith(("+", "joinchat/")):
+        return identifier
+    return identifier.lower()
+
+
+def serialize_peer(entity) -> Optional[str]:
+    """InputPeer -> строка "тип:id:access_hash" """
+    peer = utils.get_input_peer(entity)
+    if isinstance(peer, InputPeerUser):
+        return f"user:{peer.user_id}:{peer.access_hash}"
+    if isinstance(peer, InputPeerChannel):
+        return f"channel:{peer.channel_id}:{peer.access_hash}"
+    if isinstance(peer, InputPeerChat):
+        return f"chat:{peer.chat_id}:0"
+    return None
+
+
+def deserialize_peer(value: str):
+    """Строка из кэша -> InputPeer, пригодный для отправки без запросов к Telegram"""
+    kind, peer_id, access_hash = value.split(":")
+    if kind == "user":
+        return InputPeerUser(int(peer_id), int(access_hash))
+    if kind == "channel":
+        return InputPeerChannel(int(peer_id), int(access_hash))
+    if kind == "chat":
+        return InputPeerChat(int(peer_id))
+    return None
+
+
+class TelegramPeerCache:
+    """Кэш получателей одного Telegram-аккаунта
+
+    access_hash выдается конкретному аккаунту, поэтому ключи разделены по
+    аккаунтам. Кэш в Redis общий для всех кампаний и воркеров: повторная
+    рассылка по той же базе вообще не делает ResolveUsername. Ненайденные
+    username кэшируются на более короткий срок.
+    """
+
+    def __init__(self, redis, account: str, ttl: int = 30 * 24 * 3600, negative_ttl: int = 24 * 3600):
+        self.redis = redis
+        self.account = account
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    def _key(self, identifier: str) -> str:
+        return PEER_KEY.format(account=self.account, identifier=normalize_identifier(identifier))
+
+    @staticmethod
+    def _decode(value):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode()
+        if value == MISSING:
+            return MISSING
+        try:
+            return deserialize_peer(value)
+        except (ValueError, TypeError):
+            return None
+
+    async def get(self, identifier: str):
+        """InputPeer, MISSING (получателя нет) или None (нет в кэше)"""
+        if not self.redis:
+            return None
+        try:
+            return self._decode(await self.redis.get(self._key(identifier)))
+        except Exception as e:
+            logger.warning(f"Peer cache read failed for {identifier}: {e}")
+            return None
+
+    async def get_many(self, identifiers: List[str]) -> Dict[str, object]:
+        """Пакетное чтение кэша одним MGET (только найденные записи)"""
+        if not self.redis or not identifiers:
+            return {}
+        try:
+            values = await self.redis.mget([self._key(i) for i in identifiers])
+        except Exception as e:
+            logger.warning(f"Peer cache read failed: {e}")
+            return {}
+        result = {}
+        for identifier, value in zip(identifiers, values):
+            decoded = self._decode(value)
+            if decoded is not None:
+                result[identifier] = decoded
+        return result
+
+    async def set(self, identifier: str, entity):
+        """Сохранение разрешенного получателя"""
+        if not self.redis:
+            return
+        try:
+            value = serialize_peer(entity)
+            if value:
+                await self.redis.set(self._key(identifier), value, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Peer cache write failed for {identifier}: {e}")
+
+    async def set_missing(self, identifier: str):
+        """Пометка, что получатель не существует"""
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(self._key(identifier), MISSING, ex=self.negative_ttl)
+        except Exception as e:
+            logger.warning(f"Peer cache write failed for {identifier}: {e}")
+
+    async def invalidate(self, identifier: str):
+        """Удаление записи (peer стал недействительным)"""
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(self._key(identifier))
+        except Exception as e:
+            logger.warning(f"Peer cache delete failed for {identifier}: {e}")
@@ -0,0 +1,176 @@
+"""Адаптивный темп отправки Telegram-аккаунта с учетом FloodWait"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY = "tg:rate:{account}"
+RATE_TTL = 7 * 24 * 60 * 60
+
+
+def rate_key(account: str) -> str:
+    """Ключ Redis-хеша с состоянием темпа аккаунта"""
+    return RATE_KEY.format(account=account)
+
+
+async def get_account_rate(redis, account: str) -> Optional[Dict[str, Any]]:
+    """Текущий безопасный темп аккаунта (сообщений в секунду) и время блокировки"""
+    raw = await redis.hgetall(rate_key(account))
+    if not raw:
+        return None
+    data = {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in raw.items()
+    }
+    blocked_until = float(data.get("blocked_until", 0))
+    return {
+        "rate": float(data.get("rate", 0)),
+        "blocked_until": blocked_until,
+        "blocked_for": max(0, int(blocked_until - time.time())),
+        "flood_waits": int(data.get("flood_waits", 0))
+    }
+
+
+class FloodWaitRateController:
+    """AIMD-регулятор темпа отправки для одного аккаунта
+
+    После серии успешных отправок темп растет на фиксированный шаг
+    (additive increase), а на FloodWait/PeerFlood уменьшается в разы
+    (multiplicative decrease). FloodWait дополнительно блокирует отправку
+    ровно на указанное Telegram число секунд. Состояние хранится в Redis,
+    поэтому найденный безопасный темп переживает кампании и виден всем
+    воркерам, работающим с этим аккаунтом.
+    """
+
+    def __init__(
+        self,
+        redis,
+        account: str,
+        initial_rate: float = 0.5,
+        min_rate: float = 0.02,
+        max_rate: float = 1.0,
+        increase_step: float = 0.05,
+        increase_every: int = 20,
+        decrease_factor: float = 0.5,
+        sync_interval: float = 5.0
+    ):
+        self.redis = redis
+        self.account = account
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.increase_every = max(1, increase_every)
+        self.decrease_factor = decrease_factor
+        self.sync_interval = sync_interval
+
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.blocked_until = 0.0  # unix time
+        self.flood_waits = 0
+        self._successes = 0
+        self._next_slot = 0.0  # monotonic
+        self._synced_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def interval(self) -> float:
+        """Минимальный интервал между отправками при текущем темпе"""
+        return 1.0 / self.rate
+
+    @property
+    def is_blocked(self) -> bool:
+        """Аккаунт сейчас в FloodWait"""
+        return self.blocked_until > time.time()
+
+    async def wait_unblocked(self):
+        """Дождаться конца FloodWait, не занимая слот отправки
+
+        Любой запрос аккаунта (ResolveUsername, SetTyping) во время FloodWait
+        получит его снова, поэтому перед ними тоже нужно дождаться ее окончания.
+        """
+        await self._sync()
+        while True:
+            blocked_for = self.blocked_until - time.time()
+            if blocked_for <= 0:
+                return
+            logger.info(f"Account {self.account} is in FloodWait, sleeping {blocked_for:.0f}s")
+            await asyncio.sleep(blocked_for)
+
+    async def acquire(self):
+        """Дождаться разрешения на отправку следующего сообщения"""
+        async with self._lock:
+            await self.wait_unblocked()
+
+            now = time.monotonic()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = self._next_slot
+            self._next_slot = now + self.interval
+
+    async def on_success(self):
+        """Успешная отправка: понемногу разгоняемся"""
+        self._successes += 1
+        if self._successes % self.increase_every == 0 and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+            await self._save()
+
+    async def on_flood_wait(self, seconds: int):
+        """FloodWait: пауза на указанное время и снижение темпа"""
+        self.flood_waits += 1
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+        self._decrease()
+        logger.warning(
+            f"FloodWait {seconds}s for account {self.account}, rate lowered to {self.rate:.3f} msg/s"
+        )
+        await self._save()
+
+    async def on_peer_flood(self):
+        """PeerFlood (спам-ограничение аккаунта): резкое снижение темпа"""
+        self.flood_waits += 1
+        self._decrease()
+        logger.warning(f"PeerFlood for account {self.account}, rate lowered to {self.rate:.3f} msg/s")
+        await self._save()
+
+    def _decrease(self):
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._successes = 0
+        # Следующая отправка - не раньше нового интервала
+        self._next_slot = max(self._next_slot, time.monotonic() + self.interval)
+
+    async def _sync(self):
+        """Периодическое чтение состояния, записанного другими воркерами"""
+        if not self.redis:
+            return
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        try:
+            state = await get_account_rate(self.redis, self.account)
+        except Exception as e:
+            logger.warning(f"Failed to load rate state for account {self.account}: {e}")
+            return
+        if state:
+            if state["rate"] > 0:
+                self.rate = min(max(state["rate"], self.min_rate), self.max_rate)
+            self.blocked_until = max(self.blocked_until, state["blocked_until"])
+            self.flood_waits = max(self.flood_waits, state["flood_waits"])
+
+    async def _save(self):
+        if not self.redis:
+            return
+        try:
+            key = rate_key(self.account)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={
+                "rate": round(self.rate, 4),
+                "blocked_until": round(self.blocked_until, 1),
+                "flood_waits": self.flood_waits,
+                "updated_at": int(time.time())
+            })
+            pipe.expire(key, RATE_TTL)
+            await pipe.execute()
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Failed to save rate state for account {self.account}: {e}")
@@ -1,129 +1,336 @@
 from telethon import TelegramClient, errors
+from telethon.sessions import StringSession
 from telethon.tl.functions.messages import SetTypingRequest
 from telethon.tl.types import SendMessageTypingAction
 from telethon.tl.functions.channels import JoinChannelRequest
-from telethon.tl.functions.messages import ImportChatInviteRequest
+from telethon.tl.functions.messages import ImportChatInviteRequest, CheckChatInviteRequest
 import asyncio
 import random
 import logging
 import re
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Callable
+from app.config import settings
+from app.database.models import HumanizeMode
+from app.services.telegram_peer_cache import TelegramPeerCache, MISSING
+from app.services.telegram_rate_controller import FloodWaitRateController
+from app.services.telegram_client_pool import telegram_clients
 
 logger = logging.getLogger(__name__)
 
 class TelegramSenderService:
     """Сервис для отправки сообщений через Telegram"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], sender_id: Optional[int] = None, rate_limiter=None):
         self.api_id = config["api_id"]
         self.api_hash = config["api_hash"]
         self.phone = config["phone"]
+        self.username = config.get("username")
+        # Сессия, сохраненная при входе через бота
+        self.session_string = config.get("session")
         self.session_name = f"session_{self.phone}"
+        self.pool_key = str(sender_id) if sender_id is not None else str(self.phone)
         self.client = None
         self.is_connected = False
+        # Общий лимит темпа (см. app.services.rate_limiter)
+        self.rate_limiter = rate_limiter
+        self.peer_cache = TelegramPeerCache(
+            self._get_redis(),
+            account=str(self.phone),
+            ttl=settings.TELEGRAM_PEER_CACHE_TTL,
+            negative_ttl=settings.TELEGRAM_PEER_NEGATIVE_TTL
+        )
+        # Адаптивный темп вместо фиксированной задержки кампании
+        self.adaptive_rate = settings.TELEGRAM_ADAPTIVE_RATE
+        self.rate_controller = FloodWaitRateController(
+            self.peer_cache.redis,
+            account=str(self.phone),
+            initial_rate=settings.TELEGRAM_RATE_INITIAL,
+            min_rate=settings.TELEGRAM_RATE_MIN,
+            max_rate=settings.TELEGRAM_RATE_MAX,
+            increase_step=settings.TELEGRAM_RATE_INCREASE_STEP,
+            increase_every=settings.TELEGRAM_RATE_INCREASE_EVERY,
+            decrease_factor=settings.TELEGRAM_RATE_DECREASE_FACTOR
+        ) if self.adaptive_rate else None
+        # Имитация печатания (задается кампанией, см. HumanizeMode)
+        self.humanize_mode = HumanizeMode.OVERLAPPED.value
+        self._entities: Dict[str, asyncio.Future] = {}
+        self._typing: Dict[str, float] = {}
+    
+    @staticmethod
+    def _get_redis():
+        """Общий Redis-клиент для кэша получателей"""
+        try:
+            from app.database.database import redis_client
+            return redis_client
+        except Exception as e:
+            logger.warning(f"Peer cache disabled: {e}")
+            return None
     
     async def connect(self) -> bool:
-        """Подключение к Telegram"""
+        """Подключение к Telegram (клиент берется из пула процесса)"""
+        if self.client and self.is_connected:
+            return True
+        
         try:
-            self.client = TelegramClient(self.session_name, self.api_id, self.api_hash)
-            await self.client.start(phone=self.phone)
-            
-            if await self.client.is_user_authorized():
-                me = await self.client.get_me()
-                logger.info(f"Connected to Telegram as {me.first_name} (@{me.username})")
-                self.is_connected = True
-                return True
-            else:
-                logger.error("Telegram authorization failed")
-                return False
+            self.client = await telegram_clients.acquire(self.pool_key, self._create_client)
+            self.is_connected = self.client is not None
+            return self.is_connected
                 
         except Exception as e:
             logger.error(f"Error connecting to Telegram: {e}")
             return False
     
+    async def _create_client(self) -> Optional[TelegramClient]:
+        """Новое подключение по сохраненной StringSession (или файловой сессии)"""
+        # При адаптивном темпе telethon не должен сам "проглатывать" короткие FloodWait
+        client = TelegramClient(
+            StringSession(self.session_string) if self.session_string else self.session_name,
+            self.api_id,
+            self.api_hash,
+            flood_sleep_threshold=0 if self.adaptive_rate else 60
+        )
+        
+        if self.session_string:
+            await client.connect()
+            if not await client.is_user_authorized():
+                logger.error(f"Telegram session of sender {self.pool_key} is not authorized")
+                await client.disconnect()
+                return None
+            logger.info(f"Connected to Telegram as {self.username or self.phone}")
+            return client
+        
+        await client.start(phone=self.phone)
+        if await client.is_user_authorized():
+            me = await client.get_me()
+            logger.info(f"Connected to Telegram as {me.first_name} (@{me.username})")
+            return client
+        
+        logger.error("Telegram authorization failed")
+        await client.disconnect()
+        return None
+    
     async def disconnect(self):
-        """Отключение от Telegram"""
+        """Отключение от Telegram (соединение возвращается в пул)"""
+        for task in self._entities.values():
+            task.cancel()
+        self._entities.clear()
+        self._typing.clear()
         if self.client and self.is_connected:
-            await self.client.disconnect()
+            await telegram_clients.release(self.pool_key)
+            self.client = None
             self.is_connected = False
     
     async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
-        """Отправка сообщения в личку или группу"""
+        """Отправка сообщения в личку или группу
+
+        Темп задает FloodWaitRateController: на FloodWait отправка ждет ровно
+        указанное Telegram время и повторяется, а темп аккаунта снижается.
+        Имитация печатания зависит от humanize_mode кампании.
+        """
         if not self.is_connected:
             if not await self.connect():
                 return False
         
         try:
-            # Определяем тип получателя
-            entity = await self.resolve_entity(recipient)
-            if not entity:
-                logger.error(f"Could not resolve entity: {recipient}")
-                return False
-            
-            # Имитируем печатание
-            await self.simulate_typing(entity)
-            
-            # Отправляем сообщение
-            await self.client.send_message(entity, message)
-            
-            logger.info(f"Message sent to {recipient}")
-            return True
+            for attempt in range(settings.TELEGRAM_FLOOD_MAX_RETRIES + 1):
+                try:
+                    # Разрешение получателя и "печатание" - тоже запросы аккаунта:
+                    # во время FloodWait они получат его снова, поэтому сначала ждем
+                    if self.rate_controller:
+                        await self.rate_controller.wait_unblocked()
+                    
+                    # Определяем тип получателя (обычно уже разрешен заранее в prefetch)
+                    entity = await self._take_entity(recipient)
+                    if not entity:
+                        logger.error(f"Could not resolve entity: {recipient}")
+                        return False
+                    
+                    # В режиме overlapped "печатание" идет одновременно с ожиданием темпа
+                    typing_until = None
+                    if self.humanize_mode == HumanizeMode.OVERLAPPED.value:
+                        typing_until = await self._start_typing(recipient, entity)
+                    
+                    if self.rate_controller:
+                        await self.rate_controller.acquire()
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire()
+                    
+                    if self.humanize_mode == HumanizeMode.STRICT.value:
+                        await self.simulate_typing(entity)
+                    elif typing_until:
+                        remaining = typing_until - time.monotonic()
+                        if remaining > 0:
+                            await asyncio.sleep(remaining)
+                    
+                    # Отправляем сообщение
+                    await self.client.send_message(entity, message)
+                    
+                    if self.rate_controller:
+                        await self.rate_controller.on_success()
+                    logger.info(f"Message sent to {recipient}")
+                    return True
+                
+                except errors.FloodWaitError as e:
+                    self._typing.pop(recipient, None)
+                    if self.rate_controller:
+                        await self.rate_controller.on_flood_wait(e.seconds)
+                    if (
+                        not self.rate_controller
+                        or e.seconds > settings.TELEGRAM_FLOOD_MAX_WAIT
+                        or attempt == settings.TELEGRAM_FLOOD_MAX_RETRIES
+                    ):
+                        logger.error(f"FloodWait {e.seconds}s for {recipient}, giving up")
+                        return False
+                    logger.warning(f"FloodWait {e.seconds}s for {recipient}, will retry")
+                except errors.PeerFloodError:
+                    logger.error(f"Flood error for {recipient}")
+                    if self.rate_controller:
+                        await self.rate_controller.on_peer_flood()
+                    return False
+                except errors.UserIsBlockedError:
+                    logger.error(f"User blocked bot: {recipient}")
+                    return False
+                except errors.ChatWriteForbiddenError:
+                    logger.error(f"Write forbidden: {recipient}")
+                    return False
+                except errors.PeerIdInvalidError:
+                    logger.error(f"Invalid peer ID: {recipient}")
+                    await self.peer_cache.invalidate(recipient)
+                    return False
+                except errors.ChannelPrivateError:
+                    logger.error(f"Private channel: {recipient}")
+                    await self.peer_cache.invalidate(recipient)
+                    return False
+                except Exception as e:
+                    logger.error(f"Error sending message to {recipient}: {e}")
+                    return False
             
-        except errors.PeerFloodError:
-            logger.error(f"Flood error for {recipient}")
-            return False
-        except errors.UserIsBlockedError:
-            logger.error(f"User blocked bot: {recipient}")
-            return False
-        except errors.ChatWriteForbiddenError:
-            logger.error(f"Write forbidden: {recipient}")
-            return False
-        except errors.PeerIdInvalidError:
-            logger.error(f"Invalid peer ID: {recipient}")
-            return False
-        except errors.ChannelPrivateError:
-            logger.error(f"Private channel: {recipient}")
-            return False
-        except Exception as e:
-            logger.error(f"Error sending message to {recipient}: {e}")
             return False
+        finally:
+            self._typing.pop(recipient, None)
+    
+    def _is_blocked(self) -> bool:
+        return bool(self.rate_controller and self.rate_controller.is_blocked)
+    
+    def prefetch(self, recipient: str):
+        """Разрешение получателя заранее, пока отправляются предыдущие сообщения"""
+        # Во время FloodWait не делаем запросов - получатель разрешится в send_message
+        if self._is_blocked():
+            return
+        if self.is_connected and recipient not in self._entities:
+            self._entities[recipient] = asyncio.ensure_future(self.resolve_entity(recipient))
+    
+    def discard(self, recipient: str):
+        """Отмена подготовки получателя, которому сообщение уйдет не отсюда"""
+        task = self._entities.pop(recipient, None)
+        if task:
+            task.cancel()
+        self._typing.pop(recipient, None)
+    
+    async def prepare(self, recipient: str):
+        """Начало "печатания" до ожидания очереди на отправку (режим overlapped)"""
+        if self.humanize_mode != HumanizeMode.OVERLAPPED.value or not self.is_connected:
+            return
+        if self._is_blocked():
+            return
+        try:
+            self.prefetch(recipient)
+            entity = await self._entities[recipient]
+            if entity:
+                await self._start_typing(recipient, entity)
+        except Exception:
+            # Ошибку разрешения обработает send_message
+            pass
     
-    async def resolve_entity(self, identifier: str):
-        """Определение типа получателя и получение entity"""
+    async def _take_entity(self, recipient: str):
+        """Получатель из prefetch или разрешенный сейчас"""
+        task = self._entities.pop(recipient, None)
+        if task:
+            return await task
+        return await self.resolve_entity(recipient)
+    
+    async def _start_typing(self, recipient: str, entity) -> float:
+        """Отправка статуса "печатает" (один раз на сообщение); возвращает, до какого момента ждать"""
+        typing_until = self._typing.get(recipient)
+        if typing_until is None:
+            typing_until = time.monotonic() + random.uniform(0.5, 2.0)
+            self._typing[recipient] = typing_until
+            try:
+                if not self._is_blocked():
+                    await self.client(SetTypingRequest(peer=entity, action=SendMessageTypingAction()))
+            except errors.FloodWaitError as e:
+                # Статус не обязателен, но блокировку аккаунта учитываем
+                if self.rate_controller:
+                    await self.rate_controller.on_flood_wait(e.seconds)
+            except Exception:
+                pass
+        return typing_until
+    
+    async def resolve_entity(self, identifier: str, use_cache: bool = True):
+        """Определение типа получателя и получение entity
+
+        Разрешенные получатели берутся из кэша (InputPeer с access_hash),
+        поэтому повторные рассылки не делают запросов ResolveUsername.
+        """
         try:
             # Если это ссылка на группу/канал
             if self.is_invite_link(identifier):
-                return await self.join_by_invite_link(identifier)
-            
-            # Если это обычная ссылка t.me
-            if identifier.startswith('https://t.me/'):
-                username = identifier.replace('https://t.me/', '').replace('@', '')
-                return await self.client.get_entity(username)
-            
-            # Если начинается с @
-            if identifier.startswith('@'):
-                return await self.client.get_entity(identifier)
+                return await self._resolve_invite_link(identifier, use_cache)
             
-            # Если это числовой ID
-            if identifier.isdigit():
-                user_id = int(identifier)
-                # Проверяем, это пользователь или группа
-                if user_id > 0:
-                    return await self.client.get_entity(user_id)
-                else:
-                    # Отрицательный ID - группа
-                    return await self.client.get_entity(user_id)
+            if use_cache:
+                cached = await self.peer_cache.get(identifier)
+                if cached is MISSING:
+                    logger.info(f"Skipping unresolvable recipient (cached): {identifier}")
+                    return None
+                if cached is not None:
+                    return cached
             
-            # Если это username без @
-            if identifier.replace('_', '').replace('.', '').isalnum():
-                return await self.client.get_entity(f"@{identifier}")
+            entity = await self._fetch_entity(identifier)
+            if entity is not None:
+                await self.peer_cache.set(identifier, entity)
+            return entity
             
+        except (errors.UsernameNotOccupiedError, errors.UsernameInvalidError, ValueError) as e:
+            # Числовой ID может быть просто неизвестен этой сессии - его не кэшируем
+            if not identifier.lstrip('-').isdigit():
+                await self.peer_cache.set_missing(identifier)
+            logger.error(f"Error resolving entity {identifier}: {e}")
             return None
-            
+        except errors.FloodWaitError:
+            # Обрабатывается регулятором темпа в send_message
+            raise
         except Exception as e:
             logger.error(f"Error resolving entity {identifier}: {e}")
             return None
     
+    async def _fetch_entity(self, identifier: str):
+        """Запрос entity у Telegram"""
+        # Если это обычная ссылка t.me
+        if identifier.startswith('https://t.me/'):
+            username = identifier.replace('https://t.me/', '').replace('@', '')
+            return await self.client.get_entity(username)
+        
+        # Если начинается с @
+        if identifier.startswith('@'):
+            return await self.client.get_entity(identifier)
+        
+        # Если это числовой ID
+        if identifier.isdigit():
+            user_id = int(identifier)
+            # Проверяем, это пользователь или группа
+            if user_id > 0:
+                return await self.client.get_entity(user_id)
+            else:
+                # Отрицательный ID - группа
+                return await self.client.get_entity(user_id)
+        
+        # Если это username без @
+        if identifier.replace('_', '').replace('.', '').isalnum():
+            return await self.client.get_entity(f"@{identifier}")
+        
+        return None
+    
     def is_invite_link(self, link: str) -> bool:
         """Проверка, является ли ссылка пригласительной"""
         invite_patterns = [
@@ -137,15 +344,95 @@ class TelegramSenderService:
                 return True
         return False
     
+    async def _resolve_invite_link(self, invite_link: str, use_cache: bool = True):
+        """Группа по ссылке-приглашению: из кэша аккаунта или через вступление"""
+        if use_cache:
+            cached = await self.peer_cache.get(invite_link)
+            if cached is MISSING:
+                return None
+            if cached is not None:
+                return cached
+        
+        chat = await self.join_by_invite_link(invite_link)
+        if chat is not None:
+            await self.peer_cache.set(invite_link, chat)
+        return chat
+    
+    async def prejoin_invite_links(self, invite_links: List[str], should_stop: Callable[[], bool] = None) -> Dict[str, int]:
+        """Вступление в группы кампании заранее, до начала отправки
+
+        Уже известные аккаунту группы берутся из кэша, остальные вступления
+        идут не чаще TELEGRAM_JOIN_INTERVAL секунд. Во время рассылки группы
+        берутся из кэша, и отправка не ждет ImportChatInvite.
+        """
+        stats = {"cached": 0, "joined": 0, "failed": 0}
+        if not invite_links:
+            return stats
+        if not self.is_connected:
+            if not await self.connect():
+                stats["failed"] = len(invite_links)
+                return stats
+        
+        cached = await self.peer_cache.get_many(invite_links)
+        pending = []
+        for link in invite_links:
+            if link not in cached:
+                pending.append(link)
+            elif cached[link] is MISSING:
+                stats["failed"] += 1
+            else:
+                stats["cached"] += 1
+        
+        next_join = 0.0
+        for link in pending:
+            if should_stop and should_stop():
+                break
+            
+            chat = None
+            for attempt in range(settings.TELEGRAM_FLOOD_MAX_RETRIES + 1):
+                wait = next_join - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if self.rate_controller:
+                    await self.rate_controller.acquire()
+                next_join = time.monotonic() + settings.TELEGRAM_JOIN_INTERVAL
+                
+                try:
+                    chat = await self._resolve_invite_link(link, use_cache=False)
+                    break
+                except errors.FloodWaitError as e:
+                    if e.seconds > settings.TELEGRAM_FLOOD_MAX_WAIT:
+                        logger.error(f"FloodWait {e.seconds}s while joining {link}, giving up")
+                        break
+                    if self.rate_controller:
+                        await self.rate_controller.on_flood_wait(e.seconds)
+                    else:
+                        next_join = time.monotonic() + e.seconds
+                    logger.warning(f"FloodWait {e.seconds}s while joining {link}, will retry")
+            
+            stats["joined" if chat is not None else "failed"] += 1
+        
+        logger.info(
+            f"Pre-join for {self.pool_key}: {stats['cached']} cached, "
+            f"{stats['joined']} joined, {stats['failed']} failed"
+        )
+        return stats
+    
+    @staticmethod
+    def _invite_hash(invite_link: str) -> Optional[str]:
+        """Хеш из ссылки-приглашения"""
+        if '/+' in invite_link:
+            return invite_link.split('/+')[1].strip('/')
+        if 'joinchat/' in invite_link:
+            return invite_link.split('joinchat/')[1].strip('/')
+        return None
+    
     async def join_by_invite_link(self, invite_link: str):
         """Присоединение к группе по пригласительной ссылке"""
         try:
             # Извлекаем хеш из ссылки
-            if '/+' in invite_link:
-                invite_hash = invite_link.split('/+')[1]
-            elif 'joinchat/' in invite_link:
-                invite_hash = invite_link.split('joinchat/')[1]
-            else:
+            invite_hash = self._invite_hash(invite_link)
+            if not invite_hash:
                 return None
             
             # Присоединяемся к группе
@@ -159,20 +446,22 @@ class TelegramSenderService:
             
             return None
             
-        except errors.InviteHashExpiredError:
-            logger.error(f"Invite link expired: {invite_link}")
-            return None
-        except errors.InviteHashInvalidError:
-            logger.error(f"Invalid invite link: {invite_link}")
+        except (errors.InviteHashExpiredError, errors.InviteHashInvalidError) as e:
+            logger.error(f"Invalid or expired invite link {invite_link}: {e}")
+            await self.peer_cache.set_missing(invite_link)
             return None
         except errors.UserAlreadyParticipantError:
-            # Уже в группе, получаем её
+            # Уже в группе: сама группа есть в ответе CheckChatInvite
             logger.info(f"Already in group: {invite_link}")
             try:
-                # Пробуем получить группу по хешу
-                return await self.client.get_entity(invite_link)
-            except:
+                invite = await self.client(CheckChatInviteRequest(invite_hash))
+                return getattr(invite, 'chat', None)
+            except Exception as e:
+                logger.error(f"Error checking invite link {invite_link}: {e}")
                 return None
+        except errors.FloodWaitError:
+            # Обрабатывается регулятором темпа
+            raise
         except Exception as e:
             logger.error(f"Error joining by invite link {invite_link}: {e}")
             return None
@@ -219,7 +508,7 @@ class TelegramSenderService:
     async def get_chat_info(self, identifier: str) -> Optional[Dict]:
         """Получение информации о чате/группе"""
         try:
-            entity = await self.resolve_entity(identifier)
+            entity = await self.resolve_entity(identifier, use_cache=False)
             if not entity:
                 return None
             
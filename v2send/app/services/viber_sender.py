@@ -1,17 +1,27 @@
 # app/services/viber_sender.py
-import aiohttp
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from app.config import settings
+from app.services.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
 class ViberSenderService:
     """Сервис для отправки сообщений через Viber"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], rate_limiter=None):
         self.api_key = config["api_key"]
         self.api_url = config.get("api_url", "https://chatapi.viber.com/pa/send_message")
         self.sender_name = config.get("sender_name", "Bot")
+        # broadcast_message принимает до 300 получателей
+        self.broadcast_url = config.get("broadcast_url", self.api_url.replace("send_message", "broadcast_message"))
+        self.broadcast_size = max(2, min(int(config.get("broadcast_size", settings.VIBER_BROADCAST_SIZE)), 300))
+        self.max_batch_size = self.broadcast_size
+        # Персональные сообщения из пакета уходят параллельно, но не все сразу
+        self._single_slots = asyncio.Semaphore(max(1, settings.VIBER_SEND_CONCURRENCY))
+        # Общий лимит темпа (см. app.services.rate_limiter)
+        self.rate_limiter = rate_limiter
         self.is_connected = False
     
     async def connect(self) -> bool:
@@ -23,17 +33,17 @@ class ViberSenderService:
             }
             
             # Тестируем получение информации об аккаунте
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://chatapi.viber.com/pa/get_account_info",
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == 0:  # 0 = success в Viber API
-                            self.is_connected = True
-                            logger.info("Successfully connected to Viber API")
-                            return True
+            session = get_http_session()
+            async with session.get(
+                "https://chatapi.viber.com/pa/get_account_info",
+                headers=headers
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("status") == 0:  # 0 = success в Viber API
+                        self.is_connected = True
+                        logger.info("Successfully connected to Viber API")
+                        return True
             
             return False
             
@@ -41,44 +51,154 @@ class ViberSenderService:
             logger.error(f"Error connecting to Viber API: {e}")
             return False
     
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "X-Viber-Auth-Token": self.api_key,
+            "Content-Type": "application/json"
+        }
+    
+    def _text_payload(self, message: str) -> Dict[str, Any]:
+        return {
+            "min_api_version": 1,
+            "sender": {
+                "name": self.sender_name
+            },
+            "type": "text",
+            "text": message
+        }
+    
     async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
         """Отправка Viber сообщения"""
+        result = await self.deliver(recipient, message, subject)
+        return result["success"]
+    
+    async def deliver(self, recipient: str, message: str, subject: str = None) -> Dict[str, Any]:
+        """Отправка одному получателю: success, message_id (message_token) и error"""
         if not self.is_connected:
             if not await self.connect():
-                return False
+                return {"success": False, "message_id": None, "error": "Viber API is unavailable"}
         
         try:
-            headers = {
-                "X-Viber-Auth-Token": self.api_key,
-                "Content-Type": "application/json"
-            }
+            payload = self._text_payload(message)
+            payload["receiver"] = recipient
             
-            payload = {
-                "receiver": recipient,
-                "min_api_version": 1,
-                "sender": {
-                    "name": self.sender_name
-                },
-                "type": "text",
-                "text": message
-            }
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == 0:
-                            logger.info(f"Viber message sent to {recipient}")
-                            return True
-                        else:
-                            logger.error(f"Viber API error: {data.get('status_message', 'Unknown error')}")
-                            return False
+            session = get_http_session()
+            async with session.post(self.api_url, headers=self._headers(), json=payload) as response:
+                if response.status != 200:
+                    return {"success": False, "message_id": None, "error": f"HTTP {response.status}"}
+                data = await response.json(content_type=None)
             
-            return False
+            if data.get("status") == 0:
+                logger.info(f"Viber message sent to {recipient}")
+                return {"success": True, "message_id": data.get("message_token"), "error": None}
+            
+            error = data.get("status_message", "Unknown error")
+            logger.error(f"Viber API error: {error}")
+            return {"success": False, "message_id": None, "error": error}
             
         except Exception as e:
             logger.error(f"Error sending Viber message to {recipient}: {e}")
-            return False
+            return {"success": False, "message_id": None, "error": str(e)}
+    
+    async def deliver_batch(self, messages: List[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Отправка пакета: одинаковый текст - через broadcast_message, остальное - по одному
+        
+        Результаты возвращаются в порядке messages.
+        """
+        if not self.is_connected:
+            if not await self.connect():
+                return [
+                    {"success": False, "message_id": None, "error": "Viber API is unavailable"}
+                    for _ in messages
+                ]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        by_text: Dict[str, List[int]] = {}
+        for index, (_, message, _) in enumerate(messages):
+            by_text.setdefault(message, []).append(index)
+        
+        broadcasts, singles = [], []
+        for message, indexes in by_text.items():
+            if len(indexes) < 2:
+                singles.extend(indexes)
+                continue
+            # Получатель в одной рассылке - один раз; повтор уходит отдельным запросом
+            chunk, seen = [], set()
+            for index in indexes:
+                receiver = messages[index][0]
+                if receiver in seen:
+                    singles.append(index)
+                    continue
+                seen.add(receiver)
+                chunk.append(index)
+                if len(chunk) == self.broadcast_size:
+                    broadcasts.append((message, chunk))
+                    chunk, seen = [], set()
+            if len(chunk) > 1:
+                broadcasts.append((message, chunk))
+            else:
+                singles.extend(chunk)
+        
+        async def broadcast(message: str, indexes: List[int]):
+            receivers = [messages[i][0] for i in indexes]
+            for index, result in zip(indexes, await self._broadcast(receivers, message)):
+                results[index] = result
+        
+        async def single(index: int):
+            async with self._single_slots:
+                recipient, message, subject = messages[index]
+                results[index] = await self.deliver(recipient, message, subject)
+        
+        await asyncio.gather(
+            *[broadcast(message, indexes) for message, indexes in broadcasts],
+            *[single(index) for index in singles]
+        )
+        return results
+    
+    async def _broadcast(self, receivers: List[str], message: str) -> List[Dict[str, Any]]:
+        """Один запрос broadcast_message; failed_list разбирается по получателям"""
+        def fail_all(error: str) -> List[Dict[str, Any]]:
+            return [{"success": False, "message_id": None, "error": error} for _ in receivers]
+        
+        try:
+            payload = self._text_payload(message)
+            payload["broadcast_list"] = receivers
+            
+            # Лимит считается в сообщениях, а не в запросах
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(len(receivers))
+            
+            session = get_http_session()
+            async with session.post(self.broadcast_url, headers=self._headers(), json=payload) as response:
+                if response.status != 200:
+                    logger.error(f"Viber broadcast HTTP error {response.status}")
+                    return fail_all(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+        
+        except Exception as e:
+            logger.error(f"Error sending Viber broadcast to {len(receivers)} receivers: {e}")
+            return fail_all(str(e))
+        
+        if data.get("status") != 0:
+            error = data.get("status_message", "Unknown error")
+            logger.error(f"Viber broadcast error: {error}")
+            return fail_all(error)
+        
+        failed = {
+            item.get("receiver"): item.get("status_message") or f"Status {item.get('status')}"
+            for item in data.get("failed_list") or []
+        }
+        token = data.get("message_token")
+        logger.info(f"Viber broadcast sent: {len(receivers) - len(failed)}/{len(receivers)}")
+        return [
+            {"success": False, "message_id": None, "error": failed[receiver]}
+            if receiver in failed else
+            {"success": True, "message_id": token, "error": None}
+            for receiver in receivers
+        ]
     
     async def send_image_message(self, recipient: str, message: str, image_url: str) -> bool:
         """Отправка Viber сообщения с изображением"""
@@ -103,16 +223,19 @@ class ViberSenderService:
                 "media": image_url
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == 0:
-                            logger.info(f"Viber image message sent to {recipient}")
-                            return True
-                        else:
-                            logger.error(f"Viber API error: {data.get('status_message', 'Unknown error')}")
-                            return False
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            
+            session = get_http_session()
+            async with session.post(self.api_url, headers=headers, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("status") == 0:
+                        logger.info(f"Viber image message sent to {recipient}")
+                        return True
+                    else:
+                        logger.error(f"Viber API error: {data.get('status_message', 'Unknown error')}")
+                        return False
             
             return False
             
@@ -132,15 +255,15 @@ class ViberSenderService:
                 "Content-Type": "application/json"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://chatapi.viber.com/pa/get_account_info",
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == 0:
-                            return data
+            session = get_http_session()
+            async with session.get(
+                "https://chatapi.viber.com/pa/get_account_info",
+                headers=headers
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("status") == 0:
+                        return data
             
             return None
             
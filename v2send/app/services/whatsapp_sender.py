@@ -1,115 +1,128 @@
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioException
+import aiohttp
 import logging
 from typing import Dict, Any, Optional
+from app.services.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
+TWILIO_API_URL = "https://api.twilio.com/2010-04-01"
+
 class WhatsAppSenderService:
-    """Сервис для отправки сообщений через WhatsApp (Twilio)"""
-    
-    def __init__(self, config: Dict[str, Any]):
+    """Сервис для отправки сообщений через WhatsApp (Twilio REST API)"""
+
+    def __init__(self, config: Dict[str, Any], rate_limiter=None):
         self.account_sid = config["account_sid"]
         self.auth_token = config["auth_token"]
         self.from_number = config.get("from_number", "whatsapp:+14155238886")
-        self.client = None
+        self.api_url = config.get("api_url", TWILIO_API_URL)
+        self.auth = aiohttp.BasicAuth(self.account_sid, self.auth_token)
+        # Общий лимит темпа (см. app.services.rate_limiter)
+        self.rate_limiter = rate_limiter
         self.is_connected = False
-    
+
+    def _account_url(self, path: str = "") -> str:
+        return f"{self.api_url}/Accounts/{self.account_sid}{path}.json"
+
+    @staticmethod
+    def _format_recipient(recipient: str) -> str:
+        """Номер получателя в формате whatsapp:+XXXXXXXXXXX"""
+        if not recipient.startswith("whatsapp:"):
+            if not recipient.startswith("+"):
+                recipient = "+" + recipient
+            recipient = f"whatsapp:{recipient}"
+        return recipient
+
+    async def _fetch_account(self) -> Optional[Dict]:
+        session = get_http_session()
+        async with session.get(self._account_url(), auth=self.auth) as response:
+            data = await response.json(content_type=None)
+            if response.status == 200:
+                return data
+            logger.error(f"Twilio API error: {data.get('message', response.status)}")
+            return None
+
     async def connect(self) -> bool:
         """Подключение к Twilio API"""
         try:
-            self.client = Client(self.account_sid, self.auth_token)
-            
-            # Тестируем подключение
-            account = self.client.api.accounts(self.account_sid).fetch()
-            
+            account = await self._fetch_account()
+            if not account:
+                return False
+
             self.is_connected = True
-            logger.info(f"Connected to Twilio WhatsApp, account: {account.friendly_name}")
+            logger.info(f"Connected to Twilio WhatsApp, account: {account.get('friendly_name')}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Error connecting to Twilio: {e}")
             return False
-    
-    async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
-        """Отправка WhatsApp сообщения"""
+
+    async def deliver(
+        self,
+        recipient: str,
+        message: str,
+        subject: str = None,
+        media_url: str = None
+    ) -> Dict[str, Any]:
+        """Отправка WhatsApp сообщения с SID для последующей сверки статусов доставки"""
         if not self.is_connected:
             if not await self.connect():
-                return False
-        
+                return {"success": False, "message_id": None, "error": "Twilio connection failed"}
+
+        recipient = self._format_recipient(recipient)
+        payload = {
+            "Body": message,
+            "From": self.from_number,
+            "To": recipient
+        }
+        if media_url:
+            payload["MediaUrl"] = media_url
+
         try:
-            # Форматируем номер получателя
-            if not recipient.startswith("whatsapp:"):
-                if not recipient.startswith("+"):
-                    recipient = "+" + recipient
-                recipient = f"whatsapp:{recipient}"
-            
-            # Отправляем сообщение
-            message_obj = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=recipient
-            )
-            
-            logger.info(f"WhatsApp message sent to {recipient}, SID: {message_obj.sid}")
-            return True
-            
-        except TwilioException as e:
-            logger.error(f"Twilio error sending to {recipient}: {e}")
-            return False
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+
+            session = get_http_session()
+            async with session.post(self._account_url("/Messages"), data=payload, auth=self.auth) as response:
+                data = await response.json(content_type=None)
+
+                if response.status in (200, 201):
+                    logger.info(f"WhatsApp message sent to {recipient}, SID: {data.get('sid')}")
+                    return {"success": True, "message_id": data.get("sid"), "error": None}
+
+                error = f"Twilio error {data.get('code', response.status)}: {data.get('message', 'Unknown error')}"
+                logger.error(f"Twilio error sending to {recipient}: {error}")
+                return {"success": False, "message_id": None, "error": error}
+
         except Exception as e:
             logger.error(f"Error sending WhatsApp message to {recipient}: {e}")
-            return False
-    
+            return {"success": False, "message_id": None, "error": str(e)}
+
+    async def send_message(self, recipient: str, message: str, subject: str = None) -> bool:
+        """Отправка WhatsApp сообщения"""
+        result = await self.deliver(recipient, message, subject)
+        return result["success"]
+
     async def send_media_message(self, recipient: str, message: str, media_url: str) -> bool:
         """Отправка WhatsApp сообщения с медиа"""
-        if not self.is_connected:
-            if not await self.connect():
-                return False
-        
-        try:
-            # Форматируем номер получателя
-            if not recipient.startswith("whatsapp:"):
-                if not recipient.startswith("+"):
-                    recipient = "+" + recipient
-                recipient = f"whatsapp:{recipient}"
-            
-            # Отправляем сообщение с медиа
-            message_obj = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=recipient,
-                media_url=[media_url]
-            )
-            
-            logger.info(f"WhatsApp media message sent to {recipient}, SID: {message_obj.sid}")
-            return True
-            
-        except TwilioException as e:
-            logger.error(f"Twilio error sending media to {recipient}: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Error sending WhatsApp media message to {recipient}: {e}")
-            return False
-    
+        result = await self.deliver(recipient, message, media_url=media_url)
+        return result["success"]
+
     async def get_account_info(self) -> Optional[Dict]:
         """Получение информации об аккаунте"""
-        if not self.is_connected:
-            if not await self.connect():
-                return None
-        
         try:
-            account = self.client.api.accounts(self.account_sid).fetch()
+            account = await self._fetch_account()
+            if not account:
+                return None
             return {
-                "account_sid": account.sid,
-                "friendly_name": account.friendly_name,
-                "status": account.status,
-                "type": account.type
+                "account_sid": account.get("sid"),
+                "friendly_name": account.get("friendly_name"),
+                "status": account.get("status"),
+                "type": account.get("type")
             }
         except Exception as e:
             logger.error(f"Error getting account info: {e}")
             return None
-    
+
     async def test_connection(self) -> bool:
         """Тест подключения"""
-        return await self.connect()
\ No newline at end of file
+        return await self.connect()
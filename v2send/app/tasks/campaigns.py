@@ -1,9 +1,24 @@
 from celery import Celery
+from celery.signals import worker_process_shutdown
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import select, and_, text, func
+from sqlalchemy import select, and_, or_, text, func
 from app.config import settings
-from app.database.models import Campaign, Contact, Sender, CampaignLog, CampaignStatus, SenderType
+from app.database.models import Campaign, Contact, Sender, CampaignLog, CampaignStatus, SenderType, HumanizeMode
+from app.services.send_engine import SendEngine, SendJob, PacingPolicy, DeliveryCursor, get_send_concurrency
+from app.services.campaign_log_writer import CampaignLogWriter
+from app.services.http_client import http_clients
+from app.services.rate_limiter import build_rate_limiter
+from app.database.database import redis_client
+from app.services.sender_pool import SenderPool, PoolMember
+from app.services.telegram_client_pool import telegram_clients
+from app.services.email_sender import smtp_pools
+from app.services.campaign_progress import ProgressReporter
+from app.services.campaign_control import (
+    CampaignControl, send_campaign_command, COMMAND_PAUSE, COMMAND_RESUME, COMMAND_STOP
+)
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from typing import List, Optional
 import asyncio
 import logging
 import time
@@ -25,6 +40,8 @@ celery.conf.update(
     task_track_started=True,
     worker_prefetch_multiplier=1,
     task_acks_late=True,
+    # Если воркер упал посреди кампании, задача вернется в очередь и продолжит с контрольной точки
+    task_reject_on_worker_lost=True,
     worker_max_tasks_per_child=1000
 )
 
@@ -34,6 +51,34 @@ AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_co
 
 logger = logging.getLogger(__name__)
 
+# Постоянный event loop процесса воркера: пулы соединений (БД, HTTP, SMTP)
+# переживают отдельные задачи, а не создаются заново в каждом asyncio.run
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def run_async(coro):
+    """Выполнение корутины в event loop процесса воркера"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coro)
+
+@worker_process_shutdown.connect
+def close_worker_connections(**kwargs):
+    """Закрытие общих соединений при остановке процесса воркера"""
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        _worker_loop.run_until_complete(http_clients.close())
+        _worker_loop.run_until_complete(telegram_clients.close())
+        _worker_loop.run_until_complete(smtp_pools.close())
+        _worker_loop.run_until_complete(engine.dispose())
+        _worker_loop.run_until_complete(redis_client.close())
+    except Exception as e:
+        logger.warning(f"Error closing worker connections: {e}")
+    finally:
+        _worker_loop.close()
+
 async def get_async_db():
     """Получение асинхронной сессии БД"""
     async with AsyncSessionLocal() as session:
@@ -45,175 +90,267 @@ async def get_async_db():
 @celery.task(bind=True)
 def start_campaign_task(self, campaign_id: int):
     """Запуск кампании рассылки"""
-    return asyncio.run(run_campaign_async(self, campaign_id))
+    return run_async(run_campaign_async(self, campaign_id))
 
 async def run_campaign_async(task, campaign_id: int):
-    """Асинхронное выполнение кампании"""
+    """Асинхронное выполнение кампании (с нуля или с сохраненной контрольной точки)"""
     try:
-        async for db in get_async_db():
-            # Получаем кампанию
-            campaign = await db.get(Campaign, campaign_id)
-            if not campaign:
-                logger.error(f"Campaign {campaign_id} not found")
-                return {"status": "error", "message": "Campaign not found"}
-            
-            # Проверяем статус
-            if campaign.status != CampaignStatus.DRAFT:
-                logger.warning(f"Campaign {campaign_id} is not in draft status")
-                return {"status": "error", "message": "Campaign is not in draft status"}
-            
-            # Обновляем статус
-            campaign.status = CampaignStatus.RUNNING
-            campaign.started_at = datetime.utcnow()
-            await db.commit()
-            
-            logger.info(f"Starting campaign {campaign_id}")
-            
-            # Получаем отправителя
-            sender = await db.get(Sender, campaign.sender_id)
-            if not sender or not sender.is_active:
-                campaign.status = CampaignStatus.FAILED
-                await db.commit()
-                return {"status": "error", "message": "Sender not found or inactive"}
+        async with campaign_run_lock(campaign_id) as acquired:
+            if not acquired:
+                logger.warning(f"Campaign {campaign_id} is already running on another worker")
+                return {"status": "error", "message": "Campaign is already running"}
             
-            # Получаем контакты для рассылки
-            result = await db.execute(
-                select(Contact).where(
-                    and_(
-                        Contact.user_id == campaign.user_id,
-                        Contact.type == campaign.type,
-                        Contact.is_active == True
+            async for db in get_async_db():
+                # Получаем кампанию
+                campaign = await db.get(Campaign, campaign_id)
+                if not campaign:
+                    logger.error(f"Campaign {campaign_id} not found")
+                    return {"status": "error", "message": "Campaign not found"}
+                
+                # Черновик запускаем с нуля, RUNNING - продолжаем с контрольной точки
+                # (возобновление после паузы или повторная доставка задачи после падения воркера)
+                if campaign.status == CampaignStatus.DRAFT:
+                    resuming = False
+                    campaign.status = CampaignStatus.RUNNING
+                    campaign.started_at = datetime.utcnow()
+                    campaign.sent_count = 0
+                    campaign.failed_count = 0
+                    campaign.last_contact_id = 0
+                    await db.commit()
+                    logger.info(f"Starting campaign {campaign_id}")
+                elif campaign.status == CampaignStatus.RUNNING:
+                    resuming = True
+                    logger.info(
+                        f"Resuming campaign {campaign_id} after contact {campaign.last_contact_id or 0}"
+                    )
+                else:
+                    logger.warning(f"Campaign {campaign_id} is not in draft or running status")
+                    return {"status": "error", "message": "Campaign is not in draft or running status"}
+                
+                # Получаем отправителей (один или пул)
+                sender_ids = campaign.sender_ids or ([campaign.sender_id] if campaign.sender_id else [])
+                senders = []
+                if sender_ids:
+                    senders_result = await db.execute(
+                        select(Sender).where(
+                            and_(
+                                Sender.id.in_(sender_ids),
+                                Sender.user_id == campaign.user_id,
+                                Sender.type == campaign.type,
+                                Sender.is_active == True
+                            )
+                        ).order_by(Sender.id)
+                    )
+                    senders = senders_result.scalars().all()
+                if not senders:
+                    campaign.status = CampaignStatus.FAILED
+                    await db.commit()
+                    return {"status": "error", "message": "Sender not found or inactive"}
+                
+                # Считаем контакты для рассылки (сами контакты читаются постранично)
+                total_contacts = await db.scalar(
+                    select(func.count(Contact.id)).where(
+                        and_(
+                            Contact.user_id == campaign.user_id,
+                            Contact.type == campaign.type,
+                            Contact.is_active == True
+                        )
                     )
                 )
-            )
-            contacts = result.scalars().all()
-            
-            if not contacts:
-                campaign.status = CampaignStatus.COMPLETED
-                campaign.completed_at = datetime.utcnow()
-                await db.commit()
-                return {"status": "completed", "message": "No contacts found"}
-            
-            campaign.total_contacts = len(contacts)
-            await db.commit()
-            
-            # Инициализируем сервис отправки
-            sender_service = await get_sender_service(campaign.type, sender.config)
-            if not sender_service:
-                campaign.status = CampaignStatus.FAILED
+                
+                if not total_contacts:
+                    campaign.status = CampaignStatus.COMPLETED
+                    campaign.completed_at = datetime.utcnow()
+                    await db.commit()
+                    return {"status": "completed", "message": "No contacts found"}
+                
+                campaign.total_contacts = total_contacts
                 await db.commit()
-                return {"status": "error", "message": "Invalid sender service"}
-            
-            # Выполняем рассылку
-            sent_count = 0
-            failed_count = 0
-            
-            batch_size = campaign.batch_size or 10
-            delay_seconds = campaign.delay_seconds or 1
-            
-            for i in range(0, len(contacts), batch_size):
-                # Проверяем, не остановлена ли кампания
-                await db.refresh(campaign)
-                if campaign.status == CampaignStatus.PAUSED:
-                    logger.info(f"Campaign {campaign_id} paused")
-                    break
-                elif campaign.status != CampaignStatus.RUNNING:
-                    logger.info(f"Campaign {campaign_id} stopped")
-                    break
                 
-                batch = contacts[i:i + batch_size]
+                # Инициализируем сервисы отправки; несколько отправителей работают как пул
+                concurrency = get_send_concurrency(campaign.type)
+                members = []
+                for sender in senders:
+                    service = await get_sender_service(campaign.type, sender.config, sender.id)
+                    if service:
+                        members.append(PoolMember(
+                            sender.id,
+                            service,
+                            weight=(sender.config or {}).get("weight", 1),
+                            concurrency=concurrency
+                        ))
+                    else:
+                        logger.warning(f"Campaign {campaign_id}: sender {sender.id} is unavailable")
                 
-                for contact in batch:
-                    try:
+                if not members:
+                    campaign.status = CampaignStatus.FAILED
+                    await db.commit()
+                    return {"status": "error", "message": "Invalid sender service"}
+                
+                if len(members) == 1:
+                    sender_service = members[0].service
+                else:
+                    sender_service = SenderPool(
+                        members,
+                        failure_threshold=settings.SENDER_POOL_FAILURE_THRESHOLD,
+                        cooldown=settings.SENDER_POOL_COOLDOWN
+                    )
+                    logger.info(f"Campaign {campaign_id} uses a pool of {len(members)} senders")
+                # Одновременных отправок - по лимиту на каждого отправителя
+                concurrency *= len(members)
+                
+                # Выполняем рассылку
+                sent_count = campaign.sent_count or 0
+                failed_count = campaign.failed_count or 0
+                
+                batch_size = campaign.batch_size or 10
+                # Без задержки темп задают параллельные слоты и общий ограничитель
+                # отправителя/провайдера (RATE_LIMIT_*), а не фиксированная пауза
+                delay_seconds = campaign.delay_seconds if campaign.delay_seconds is not None else 0
+                if hasattr(sender_service, "humanize_mode"):
+                    sender_service.humanize_mode = campaign.humanize_mode or HumanizeMode.OVERLAPPED.value
+                if getattr(sender_service, "adaptive_rate", False):
+                    # Темп подбирает сам сервис по FloodWait, фиксированная задержка не нужна
+                    delay_seconds = 0
+                
+                send_engine = SendEngine(
+                    sender_service,
+                    concurrency,
+                    PacingPolicy(batch_size, delay_seconds, senders=len(members))
+                )
+                cursor = DeliveryCursor(campaign.last_contact_id or 0)
+                progress = ProgressReporter(
+                    redis_client,
+                    campaign_id,
+                    total_contacts,
+                    task=task,
+                    min_interval=settings.CAMPAIGN_PROGRESS_INTERVAL,
+                    every=settings.CAMPAIGN_PROGRESS_EVERY
+                )
+                
+                template = campaign.message
+                subject = campaign.subject
+                # Все контакты выданы на отправку (а не прерваны паузой/остановкой)
+                contacts_exhausted = False
+                
+                async def iter_jobs():
+                    nonlocal contacts_exhausted
+                    contacts = iter_campaign_contacts(
+                        campaign.user_id,
+                        campaign.type,
+                        after_id=cursor.position,
+                        skip_logged_for=campaign_id if resuming else None
+                    )
+                    async for contact in contacts:
+                        cursor.track(contact.id)
                         # Подготавливаем сообщение с переменными
-                        message_text = prepare_message(
-                            campaign.message,
-                            contact.first_name,
-                            contact.last_name
-                        )
-                        
-                        # Отправляем сообщение
-                        success = await sender_service.send_message(
+                        yield SendJob(
+                            contact.id,
                             contact.identifier,
-                            message_text,
-                            campaign.subject
+                            prepare_message(template, contact.first_name, contact.last_name),
+                            subject
                         )
-                        
-                        # Логируем результат
-                        log_entry = CampaignLog(
-                            campaign_id=campaign.id,
-                            contact_identifier=contact.identifier,
-                            status="sent" if success else "failed",
-                            sent_at=datetime.utcnow()
+                    contacts_exhausted = True
+                
+                log_writer = CampaignLogWriter(
+                    AsyncSessionLocal,
+                    campaign_id,
+                    flush_size=settings.CAMPAIGN_LOG_FLUSH_SIZE,
+                    flush_interval=settings.CAMPAIGN_LOG_FLUSH_INTERVAL,
+                    background=settings.CAMPAIGN_LOG_ASYNC_WRITER
+                )
+                await log_writer.start()
+                
+                # Пауза/остановка приходят через Redis и сразу останавливают выдачу сообщений
+                stop_command: Optional[str] = None
+                
+                def on_command(command: str):
+                    nonlocal stop_command
+                    if command in (COMMAND_PAUSE, COMMAND_STOP):
+                        logger.info(f"Campaign {campaign_id} {command} requested")
+                        stop_command = command
+                        send_engine.stop()
+                
+                control = CampaignControl(redis_client, campaign_id, on_command=on_command)
+                try:
+                    if not resuming:
+                        await control.reset()
+                    await control.start()
+                    
+                    # Группы по ссылкам-приглашениям: вступаем заранее, с контролируемым темпом
+                    if campaign.type == SenderType.TELEGRAM and hasattr(sender_service, "prejoin_invite_links"):
+                        invite_links = await load_invite_links(campaign.user_id, cursor.position)
+                        if invite_links:
+                            await sender_service.prejoin_invite_links(
+                                invite_links,
+                                should_stop=lambda: control.should_stop
+                            )
+                    
+                    async for result in send_engine.run(iter_jobs()):
+                        # Логируем результат (пишется пачками вместе с контрольной точкой)
+                        log_writer.add(
+                            result.job.recipient,
+                            "sent" if result.success else "failed",
+                            result.error,
+                            result.sent_at,
+                            result.external_id
                         )
+                        cursor.done(result.job.contact_id)
                         
-                        if success:
+                        if result.success:
                             sent_count += 1
                         else:
                             failed_count += 1
-                            log_entry.error_message = "Failed to send message"
                         
-                        db.add(log_entry)
-                        
-                        # Обновляем прогресс
-                        task.update_state(
-                            state='PROGRESS',
-                            meta={
-                                'current': sent_count + failed_count,
-                                'total': len(contacts),
-                                'sent': sent_count,
-                                'failed': failed_count
-                            }
+                        log_writer.set_checkpoint(
+                            sent_count=sent_count,
+                            failed_count=failed_count,
+                            last_contact_id=cursor.position,
+                            checkpoint_at=datetime.utcnow()
                         )
+                        await log_writer.maybe_flush()
                         
-                        # Задержка между сообщениями
-                        if delay_seconds > 0:
-                            await asyncio.sleep(delay_seconds)
-                    
-                    except Exception as e:
-                        logger.error(f"Error sending message to {contact.identifier}: {e}")
-                        failed_count += 1
-                        
-                        log_entry = CampaignLog(
-                            campaign_id=campaign.id,
-                            contact_identifier=contact.identifier,
-                            status="failed",
-                            error_message=str(e),
-                            sent_at=datetime.utcnow()
-                        )
-                        db.add(log_entry)
+                        # Обновляем прогресс (не чаще CAMPAIGN_PROGRESS_INTERVAL)
+                        await progress.report(sent_count, failed_count)
+                finally:
+                    # Команда могла прийти уже после выдачи последнего контакта
+                    if control.should_stop and stop_command is None:
+                        stop_command = control.command
+                    await control.close()
+                    await log_writer.close()
+                    # Отключаем сервис (пулы соединений остаются в процессе)
+                    if hasattr(sender_service, 'disconnect'):
+                        await sender_service.disconnect()
                 
-                # Сохраняем промежуточные результаты
-                campaign.sent_count = sent_count
-                campaign.failed_count = failed_count
-                await db.commit()
+                # Завершаем кампанию, только если отправлены все контакты. Прерванный
+                # запуск статус не трогает: его выставили pause/stop, а после быстрого
+                # возобновления кампанию продолжит следующий запуск с контрольной точки
+                await db.refresh(campaign)
                 
-                # Задержка между батчами
-                if i + batch_size < len(contacts) and delay_seconds > 0:
-                    await asyncio.sleep(delay_seconds * 2)
-            
-            # Завершаем кампанию
-            campaign.sent_count = sent_count
-            campaign.failed_count = failed_count
-            campaign.completed_at = datetime.utcnow()
-            
-            if campaign.status == CampaignStatus.RUNNING:
-                campaign.status = CampaignStatus.COMPLETED
-            
-            await db.commit()
-            
-            # Отключаем сервис
-            if hasattr(sender_service, 'disconnect'):
-                await sender_service.disconnect()
-            
-            logger.info(f"Campaign {campaign_id} completed: {sent_count} sent, {failed_count} failed")
-            
-            return {
-                "status": "completed",
-                "sent": sent_count,
-                "failed": failed_count,
-                "total": len(contacts)
-            }
+                finished = contacts_exhausted and not send_engine.stopped and stop_command is None
+                if finished and campaign.status == CampaignStatus.RUNNING:
+                    campaign.status = CampaignStatus.COMPLETED
+                    campaign.completed_at = datetime.utcnow()
+                    await db.commit()
+                elif not finished:
+                    logger.info(
+                        f"Campaign {campaign_id} run interrupted ({stop_command or 'stopped'}), "
+                        f"status left as {campaign.status.value}"
+                    )
+                await progress.report(sent_count, failed_count, campaign.status.value, force=True)
+                
+                logger.info(
+                    f"Campaign {campaign_id} finished with status {campaign.status.value}: "
+                    f"{sent_count} sent, {failed_count} failed, {send_engine.throughput:.2f} msg/s"
+                )
+                
+                return {
+                    "status": campaign.status.value,
+                    "sent": sent_count,
+                    "failed": failed_count,
+                    "total": total_contacts,
+                    "throughput": round(send_engine.throughput, 2)
+                }
     
     except Exception as e:
         logger.error(f"Error in campaign {campaign_id}: {e}", exc_info=True)
@@ -230,32 +367,135 @@ async def run_campaign_async(task, campaign_id: int):
         
         return {"status": "error", "message": str(e)}
 
-async def get_sender_service(sender_type: SenderType, config: dict):
+@asynccontextmanager
+async def campaign_run_lock(campaign_id: int, timeout: float = 30):
+    """Advisory-блокировка Postgres, чтобы кампанию выполнял только один воркер
+    
+    Ждем до timeout секунд: после паузы и быстрого возобновления предыдущий
+    запуск может еще дописывать начатые отправки.
+    """
+    async with engine.connect() as conn:
+        deadline = time.monotonic() + timeout
+        while True:
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": campaign_id}
+            )
+            await conn.commit()
+            if acquired or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(1)
+        
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": campaign_id})
+                await conn.commit()
+
+async def load_invite_links(user_id: int, after_id: int = 0) -> List[str]:
+    """Ссылки-приглашения среди Telegram-контактов кампании"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Contact.identifier).where(
+                and_(
+                    Contact.user_id == user_id,
+                    Contact.type == SenderType.TELEGRAM,
+                    Contact.is_active == True,
+                    Contact.id > after_id,
+                    or_(
+                        Contact.identifier.like("https://t.me/+%"),
+                        Contact.identifier.like("%/joinchat/%")
+                    )
+                )
+            ).distinct()
+        )
+        return list(result.scalars().all())
+
+async def iter_campaign_contacts(
+    user_id: int,
+    contact_type: SenderType,
+    after_id: int = 0,
+    skip_logged_for: Optional[int] = None
+):
+    """Постраничная выборка контактов кампании по ключу (Contact.id > last_id)
+    
+    Читаются только колонки, нужные для подготовки сообщения, поэтому память
+    воркера не зависит от размера аудитории. Используется отдельная сессия,
+    чтобы чтение шло параллельно с записью логов в основной сессии.
+    Если указан skip_logged_for, пропускаются контакты, для которых в этой
+    кампании уже есть запись CampaignLog (одна проверка на страницу).
+    """
+    page_size = settings.CAMPAIGN_CONTACTS_PAGE_SIZE
+    last_id = after_id
+    
+    async with AsyncSessionLocal() as db:
+        while True:
+            result = await db.execute(
+                select(Contact.id, Contact.identifier, Contact.first_name, Contact.last_name)
+                .where(
+                    and_(
+                        Contact.user_id == user_id,
+                        Contact.type == contact_type,
+                        Contact.is_active == True,
+                        Contact.id > last_id
+                    )
+                )
+                .order_by(Contact.id)
+                .limit(page_size)
+            )
+            rows = result.all()
+            
+            logged = set()
+            if skip_logged_for and rows:
+                logged_result = await db.execute(
+                    select(CampaignLog.contact_identifier).where(
+                        and_(
+                            CampaignLog.campaign_id == skip_logged_for,
+                            CampaignLog.contact_identifier.in_([row.identifier for row in rows])
+                        )
+                    )
+                )
+                logged = set(logged_result.scalars().all())
+            
+            # Не держим транзакцию открытой, пока страница рассылается
+            await db.rollback()
+            
+            for row in rows:
+                if row.identifier not in logged:
+                    yield row
+            
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1].id
+
+async def get_sender_service(sender_type: SenderType, config: dict, sender_id: Optional[int] = None):
     """Получение сервиса отправки по типу"""
     try:
+        # Лимит темпа общий для всех воркеров и кампаний этого отправителя
+        rate_limiter = build_rate_limiter(redis_client, sender_type, sender_id, config)
         if sender_type == SenderType.TELEGRAM:
             from app.services.telegram_sender import TelegramSenderService
-            service = TelegramSenderService(config)
+            service = TelegramSenderService(config, sender_id, rate_limiter=rate_limiter)
             await service.connect()
             return service
         elif sender_type == SenderType.EMAIL:
             from app.services.email_sender import EmailSenderService
-            service = EmailSenderService(config)
+            service = EmailSenderService(config, rate_limiter=rate_limiter)
             await service.connect()
             return service
         elif sender_type == SenderType.WHATSAPP:
             from app.services.whatsapp_sender import WhatsAppSenderService
-            service = WhatsAppSenderService(config)
+            service = WhatsAppSenderService(config, rate_limiter=rate_limiter)
             await service.connect()
             return service
         elif sender_type == SenderType.SMS:
             from app.services.sms_sender import SMSSenderService
-            service = SMSSenderService(config)
+            service = SMSSenderService(config, rate_limiter=rate_limiter)
             await service.connect()
             return service
         elif sender_type == SenderType.VIBER:
             from app.services.viber_sender import ViberSenderService
-            service = ViberSenderService(config)
+            service = ViberSenderService(config, rate_limiter=rate_limiter)
             await service.connect()
             return service
         else:
@@ -289,28 +529,48 @@ def prepare_message(template: str, first_name: str = None, last_name: str = None
 @celery.task
 def pause_campaign_task(campaign_id: int):
     """Приостановка кампании"""
-    return asyncio.run(update_campaign_status(campaign_id, CampaignStatus.PAUSED))
+    return run_async(update_campaign_status(campaign_id, CampaignStatus.PAUSED))
 
 @celery.task
 def resume_campaign_task(campaign_id: int):
-    """Возобновление кампании"""
-    return asyncio.run(update_campaign_status(campaign_id, CampaignStatus.RUNNING))
+    """Возобновление кампании с сохраненной контрольной точки"""
+    result = run_async(
+        update_campaign_status(campaign_id, CampaignStatus.RUNNING, only_from=CampaignStatus.PAUSED)
+    )
+    if result.get("status") == "success":
+        start_campaign_task.delay(campaign_id)
+    return result
 
 @celery.task
 def stop_campaign_task(campaign_id: int):
     """Остановка кампании"""
-    return asyncio.run(update_campaign_status(campaign_id, CampaignStatus.COMPLETED))
+    return run_async(update_campaign_status(campaign_id, CampaignStatus.COMPLETED))
 
-async def update_campaign_status(campaign_id: int, status: CampaignStatus):
-    """Обновление статуса кампании"""
+async def update_campaign_status(
+    campaign_id: int,
+    status: CampaignStatus,
+    only_from: Optional[CampaignStatus] = None
+):
+    """Обновление статуса кампании и уведомление запущенной рассылки"""
+    commands = {
+        CampaignStatus.PAUSED: COMMAND_PAUSE,
+        CampaignStatus.RUNNING: COMMAND_RESUME,
+        CampaignStatus.COMPLETED: COMMAND_STOP,
+    }
     try:
         async for db in get_async_db():
             campaign = await db.get(Campaign, campaign_id)
             if campaign:
+                if only_from and campaign.status != only_from:
+                    return {"status": "error", "message": f"Campaign is not {only_from.value}"}
                 campaign.status = status
                 if status == CampaignStatus.COMPLETED:
                     campaign.completed_at = datetime.utcnow()
                 await db.commit()
+                
+                if status in commands:
+                    await send_campaign_command(redis_client, campaign_id, commands[status])
+                
                 logger.info(f"Campaign {campaign_id} status updated to {status.value}")
                 return {"status": "success"}
             else:
@@ -322,7 +582,7 @@ async def update_campaign_status(campaign_id: int, status: CampaignStatus):
 @celery.task
 def cleanup_old_logs():
     """Очистка старых логов (запускается по расписанию)"""
-    return asyncio.run(cleanup_old_logs_async())
+    return run_async(cleanup_old_logs_async())
 
 async def cleanup_old_logs_async():
     """Асинхронная очистка старых логов"""
@@ -0,0 +1,294 @@
+"""Фоновый импорт контактов из загруженного файла"""
+from aiogram import Bot, types
+from sqlalchemy import select, func
+from app.config import settings, SUBSCRIPTION_PLANS
+from app.database.models import User, Contact, FileUpload, SenderType
+from app.services.contact_importer import bulk_import_contacts
+from app.tasks.campaigns import celery, run_async, AsyncSessionLocal
+from app.services.email_verifier import get_mx_verifier
+from app.services.file_parser import FileParser
+from app.utils.batch_validators import validate_contacts
+from itertools import islice
+from typing import Iterator, List, Tuple
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+CONTACT_SEPARATORS_RE = re.compile(r'[,;\t]')
+
+
+class ImportProgress:
+    """Редактирование сообщения с прогрессом не чаще раза в min_interval секунд"""
+
+    def __init__(self, bot: Bot, chat_id: int, message_id: int, min_interval: float = 3.0):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.min_interval = min_interval
+        self._last_edit = 0.0
+
+    async def update(self, text: str, force: bool = False, reply_markup=None):
+        now = time.monotonic()
+        if not force and now - self._last_edit < self.min_interval:
+            return
+        self._last_edit = now
+        try:
+            await self.bot.edit_message_text(
+                text,
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                parse_mode="HTML",
+                reply_markup=reply_markup
+            )
+        except Exception as e:
+            # "message is not modified", сообщение удалено и т.п. - импорт продолжается
+            logger.debug(f"Failed to update import progress: {e}")
+
+
+def iter_text_contacts(file_path: str, file_type: str, block_size: int) -> Iterator[Tuple[int, list, List[str]]]:
+    """Текстовый файл блоками по block_size строк; контакты блока проверяются вместе (validate_contacts)"""
+    line_num = 0
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            lines = list(islice(f, block_size))
+            if not lines:
+                return
+
+            cells = []
+            cell_lines = []
+            for offset, line in enumerate(lines, line_num + 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                # Разделяем по запятой, табу или точке с запятой
+                for contact in CONTACT_SEPARATORS_RE.split(line):
+                    contact = contact.strip()
+                    if contact:
+                        cells.append(contact)
+                        cell_lines.append(offset)
+            line_num += len(lines)
+
+            valid = []
+            invalid = []
+            for contact, offset, (is_valid, result) in zip(cells, cell_lines, validate_contacts(cells, file_type)):
+                if is_valid:
+                    valid.append(result)
+                else:
+                    invalid.append(f"Строка {offset}: {contact} - {result}")
+            yield line_num, valid, invalid
+
+
+def iter_file_contacts(file_path: str, file_type: str) -> Iterator[Tuple[int, list, List[str]]]:
+    """Контакты файла по частям: (строк прочитано, валидные контакты, ошибки)"""
+    if file_path.lower().endswith(".xlsx"):
+        for rows_read, contact_data, error in FileParser.iter_excel_file(
+            file_path, file_type, settings.IMPORT_CHUNK_SIZE
+        ):
+            yield rows_read, [contact_data] if contact_data else [], [error] if error else []
+        return
+
+    yield from iter_text_contacts(file_path, file_type, settings.IMPORT_CHUNK_SIZE)
+
+
+@celery.task(bind=True)
+def import_contacts_task(
+    self,
+    telegram_id: int,
+    file_path: str,
+    file_type: str,
+    contact_type: str,
+    original_filename: str,
+    file_size: int,
+    chat_id: int,
+    message_id: int
+):
+    """Импорт контактов из файла (разбор и запись в БД - в воркере, а не в боте)"""
+    return run_async(import_contacts_async(
+        telegram_id,
+        file_path,
+        file_type,
+        SenderType(contact_type),
+        original_filename,
+        file_size,
+        chat_id,
+        message_id
+    ))
+
+
+async def import_contacts_async(
+    telegram_id: int,
+    file_path: str,
+    file_type: str,
+    contact_type: SenderType,
+    original_filename: str,
+    file_size: int,
+    chat_id: int,
+    message_id: int
+):
+    """Потоковый разбор файла, проверка и запись контактов пачками"""
+    bot = Bot(token=settings.BOT_TOKEN)
+    progress = ImportProgress(bot, chat_id, message_id, settings.IMPORT_PROGRESS_INTERVAL)
+    keyboard = types.InlineKeyboardMarkup(
+        inline_keyboard=[
+            [types.InlineKeyboardButton(text="📋 Посмотреть списки", callback_data="contacts_lists")],
+            [types.InlineKeyboardButton(text="◀️ К контактам", callback_data="contacts_menu")]
+        ]
+    )
+
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await db.scalar(select(User).where(User.telegram_id == telegram_id))
+            if not user:
+                logger.error(f"Import: user {telegram_id} not found")
+                return {"status": "error", "message": "User not found"}
+
+            current_contacts = await db.scalar(
+                select(func.count(Contact.id)).where(
+                    Contact.user_id == user.id,
+                    Contact.is_active == True
+                )
+            )
+            plan = SUBSCRIPTION_PLANS.get(user.subscription_plan, SUBSCRIPTION_PLANS["basic"])
+            available_slots = max(0, plan["contacts_limit"] - (current_contacts or 0))
+
+            lines = 0
+            valid_total = 0
+            new_contacts = 0
+            duplicate_contacts = 0
+            invalid_total = 0
+            invalid_examples: List[str] = []
+            limit_reached = False
+            chunk: list = []
+            # Второй уровень проверки email - MX доменов, пачкой на каждый chunk
+            mx_verifier = get_mx_verifier() \
+                if contact_type == SenderType.EMAIL and settings.EMAIL_MX_CHECK_ENABLED else None
+
+            async def verify_domains():
+                nonlocal valid_total, invalid_total
+                identifiers = [c["identifier"] if isinstance(c, dict) else c for c in chunk]
+                checks = await mx_verifier.verify_many(identifiers)
+                deliverable = []
+                for contact, identifier in zip(chunk, identifiers):
+                    ok, error = checks[identifier]
+                    if ok:
+                        deliverable.append(contact)
+                        continue
+                    valid_total -= 1
+                    invalid_total += 1
+                    if len(invalid_examples) < 5:
+                        invalid_examples.append(f"{identifier} - {error}")
+                chunk[:] = deliverable
+
+            async def flush():
+                nonlocal new_contacts, duplicate_contacts, limit_reached
+                if mx_verifier and chunk:
+                    await verify_domains()
+                if not chunk:
+                    return
+                # Дубликаты места не занимают: вставляем частями не больше
+                # оставшегося лимита, пока RETURNING не покажет, что он исчерпан
+                position = 0
+                while position < len(chunk):
+                    remaining = available_slots - new_contacts
+                    if remaining <= 0:
+                        limit_reached = True
+                        break
+                    part = chunk[position:position + remaining]
+                    position += len(part)
+                    imported = await bulk_import_contacts(db, user.id, contact_type, part)
+                    new_contacts += imported["new"]
+                    duplicate_contacts += imported["duplicates"]
+                await db.commit()
+                chunk.clear()
+
+            # Файл читается частями, в памяти только текущая пачка и уже
+            # встреченные контакты: повторы внутри файла отсекаются до записи в БД
+            seen = set()
+            for line_num, valid, invalid in iter_file_contacts(file_path, file_type):
+                lines = line_num
+                valid_total += len(valid)
+                invalid_total += len(invalid)
+                if len(invalid_examples) < 5:
+                    invalid_examples.extend(invalid[:5 - len(invalid_examples)])
+                for contact in valid:
+                    identifier = contact["identifier"] if isinstance(contact, dict) else contact
+                    if identifier in seen:
+                        duplicate_contacts += 1
+                        continue
+                    seen.add(identifier)
+                    chunk.append(contact)
+
+                if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                    await flush()
+                    await progress.update(
+                        f"💾 <b>Сохраняем контакты...</b>\n\n"
+                        f"• Обработано строк: {lines:,}\n"
+                        f"• Новых контактов: {new_contacts:,}\n"
+                        f"• Дубликатов: {duplicate_contacts:,}"
+                    )
+                    if limit_reached:
+                        break
+            await flush()
+
+            db.add(FileUpload(
+                user_id=user.id,
+                filename=os.path.basename(file_path),
+                original_filename=original_filename,
+                file_size=file_size,
+                file_type=file_type,
+                # Файл удаляется сразу после импорта, ссылку на него не храним
+                upload_path=None,
+                processed=True,
+                contacts_count=valid_total
+            ))
+            await db.commit()
+
+        if not valid_total:
+            await progress.update("❌ В файле не найдено валидных контактов", force=True)
+            return {"status": "empty", "lines": lines}
+
+        result_text = (
+            f"✅ <b>Файл успешно обработан!</b>\n\n"
+            f"📊 <b>Результаты:</b>\n"
+            f"• Новых контактов: {new_contacts:,}\n"
+            f"• Дубликатов пропущено: {duplicate_contacts:,}\n"
+            f"• Тип: {contact_type.value.capitalize()}\n"
+        )
+        if limit_reached:
+            result_text += f"⚠️ Достигнут лимит плана {user.subscription_plan.capitalize()}\n"
+        if invalid_total:
+            result_text += f"• Некорректных записей: {invalid_total:,}\n"
+            if invalid_total <= 5:
+                result_text += f"\n❌ <b>Некорректные записи:</b>\n"
+                for invalid in invalid_examples:
+                    result_text += f"• {invalid}\n"
+
+        await progress.update(result_text, force=True, reply_markup=keyboard)
+        logger.info(f"Contacts imported: {new_contacts} new contacts for user {telegram_id}")
+
+        return {
+            "status": "completed",
+            "lines": lines,
+            "new": new_contacts,
+            "duplicates": duplicate_contacts,
+            "invalid": invalid_total,
+            "limit_reached": limit_reached
+        }
+
+    except Exception as e:
+        logger.error(f"Error importing contacts from {file_path}: {e}", exc_info=True)
+        await progress.update(
+            "❌ Ошибка обработки файла. Проверьте формат и попробуйте снова.",
+            force=True
+        )
+        return {"status": "error", "message": str(e)}
+
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        await bot.session.close()
@@ -0,0 +1,134 @@
+"""Пакетная нормализация и проверка контактов на pandas"""
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.validators import validate_email_address, validate_phone_number, validate_telegram_contact
+
+PHONE_CLEAN_RE = re.compile(r'[^\d+]')
+PHONE_RE = re.compile(r'\+?[1-9]\d{6,14}')
+
+# Быстрый путь для типичных адресов; все остальное (Unicode, кавычки,
+# ошибки) проверяет email_validator, чтобы результат и текст ошибки
+# совпадали с validate_email_address
+EMAIL_FAST_RE = re.compile(
+    r"([A-Za-z0-9!#$%&'*+/=?^_`{|}~-]{1,64}(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*)"
+    r"@((?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+([A-Za-z]{2,63}))"
+)
+# Домены специального назначения email_validator отклоняет
+EMAIL_SPECIAL_TLDS = {"arpa", "invalid", "local", "localhost", "onion", "test"}
+
+TELEGRAM_FAST_RE = re.compile(
+    r'@[a-zA-Z][a-zA-Z0-9_]{4,31}'  # @username
+    r'|-?[1-9][0-9]*'  # числовой ID
+    r'|https://t\.me/[a-zA-Z0-9_]{5,32}'
+    r'|https://t\.me/\+[a-zA-Z0-9_-]+'
+    r'|https://t\.me/joinchat/[a-zA-Z0-9_-]+'
+    r'|https://telegram\.me/joinchat/[a-zA-Z0-9_-]+'
+)
+TELEGRAM_BARE_USERNAME_RE = re.compile(r'[a-zA-Z][a-zA-Z0-9_]{4,31}')
+
+EMPTY_ERROR = "Пустое значение"
+
+Check = Tuple[bool, Optional[str]]
+
+
+def _check_phone(raw: str) -> Check:
+    clean = PHONE_CLEAN_RE.sub("", raw)
+    if PHONE_RE.fullmatch(clean):
+        return True, clean if clean.startswith("+") else "+" + clean
+    return False, "Неверный формат номера телефона"
+
+
+def _check_email(raw: str) -> Check:
+    match = EMAIL_FAST_RE.fullmatch(raw)
+    if match and len(raw) <= 254 and len(match.group(1)) <= 64:
+        local, domain, tld = match.groups()
+        domain = domain.lower()
+        # IDN-домены email_validator переводит в Unicode
+        if tld.lower() not in EMAIL_SPECIAL_TLDS and "xn--" not in domain:
+            # email_validator приводит к нижнему регистру только домен
+            return True, f"{local}@{domain}"
+    return validate_email_address(raw)
+
+
+def _check_telegram(raw: str) -> Check:
+    if TELEGRAM_FAST_RE.fullmatch(raw):
+        return True, raw
+    if TELEGRAM_BARE_USERNAME_RE.fullmatch(raw):
+        return True, f"@{raw}"
+    return validate_telegram_contact(raw)
+
+
+BATCH_CHECKS: Dict[str, Callable[[str], Check]] = {
+    "phone": _check_phone,
+    "email": _check_email,
+    "telegram": _check_telegram,
+}
+
+SCALAR_VALIDATORS: Dict[str, Callable[[str], Check]] = {
+    "phone": validate_phone_number,
+    "email": validate_email_address,
+    "telegram": validate_telegram_contact,
+}
+
+# Типы, для которых пачка быстрее построчной проверки. Без pyarrow строковые
+# операции pandas - те же вызовы Python на каждую строку, поэтому выигрыш дают
+# только свертка повторов и быстрый путь вместо email_validator. Телефон и
+# Telegram и построчно проверяются одним регулярным выражением, и накладные
+# расходы DataFrame не окупаются (scripts/benchmark_validators.py на 1 млн
+# строк: email 15.5x, телефоны 1.0x, Telegram 0.9x)
+BATCH_TYPES = {"email"}
+
+
+def validate_contacts_batch(values: Iterable[str], contact_type: str) -> pd.DataFrame:
+    """Проверка колонки контактов целиком
+
+    Возвращает DataFrame с индексом входа и колонками raw (без пробелов по
+    краям), value (нормализованный контакт или None), error (причина или
+    None) и duplicate (валидный контакт уже встречался выше). Результат
+    совпадает с построчными validate_* из app.utils.validators.
+
+    Колонка сначала сворачивается в уникальные значения (pd.factorize),
+    каждое проверяется один раз и результат разворачивается обратно по
+    кодам - повторы в файле не проверяются заново.
+    """
+    raw = pd.Series(values, dtype="object").fillna("").astype(str).str.strip()
+    codes, uniques = pd.factorize(raw)
+    check = BATCH_CHECKS.get(contact_type, lambda value: (True, value))
+
+    unique_values = []
+    unique_errors = []
+    for value in uniques:
+        ok, result = check(value) if value else (False, EMPTY_ERROR)
+        unique_values.append(result if ok else None)
+        unique_errors.append(None if ok else result)
+
+    # Пропуски - None, как у построчных валидаторов
+    value = pd.Series(np.array(unique_values, dtype=object).take(codes), index=raw.index)
+    error = pd.Series(np.array(unique_errors, dtype=object).take(codes), index=raw.index)
+    valid = error.isna()
+    return pd.DataFrame({
+        "raw": raw,
+        "value": value,
+        "error": error,
+        "duplicate": valid & value.where(valid).duplicated(),
+    })
+
+
+def validate_contacts(values: List[str], contact_type: str) -> List[Check]:
+    """Проверка списка контактов: (валиден, нормализованное значение или ошибка)
+
+    Результат как у построчных validate_*; пачкой через
+    validate_contacts_batch проверяются только BATCH_TYPES.
+    """
+    if contact_type in BATCH_TYPES:
+        checked = validate_contacts_batch(values, contact_type)
+        return [
+            (True, value) if error is None else (False, error)
+            for value, error in zip(checked["value"], checked["error"])
+        ]
+    validator = SCALAR_VALIDATORS.get(contact_type)
+    if validator is None:
+        return [(True, value) for value in values]
+    return [validator(value) for value in values]
@@ -55,7 +55,13 @@ def campaign_type_keyboard() -> InlineKeyboardMarkup:
         ]
     )
 
-def campaign_actions_keyboard(campaign_id: int, status: str) -> InlineKeyboardMarkup:
+HUMANIZE_LABELS = {
+    "off": "выкл",
+    "overlapped": "совмещенная",
+    "strict": "строгая"
+}
+
+def campaign_actions_keyboard(campaign_id: int, status: str, humanize_mode: str = None) -> InlineKeyboardMarkup:
     """Клавиатура управления кампанией"""
     builder = InlineKeyboardBuilder()
     
@@ -69,11 +75,22 @@ def campaign_actions_keyboard(campaign_id: int, status: str) -> InlineKeyboardMa
         builder.add(InlineKeyboardButton(text="▶️ Продолжить", callback_data=f"campaign_resume_{campaign_id}"))
         builder.add(InlineKeyboardButton(text="⏹ Остановить", callback_data=f"campaign_stop_{campaign_id}"))
     
+    # Имитация печатания (только Telegram, меняется до запуска или на паузе)
+    show_humanize = humanize_mode is not None and status in ("draft", "paused")
+    if show_humanize:
+        builder.add(InlineKeyboardButton(
+            text=f"⌨️ Имитация печатания: {HUMANIZE_LABELS.get(humanize_mode, humanize_mode)}",
+            callback_data=f"campaign_humanize_{campaign_id}"
+        ))
+    
     builder.add(InlineKeyboardButton(text="📊 Статистика", callback_data=f"campaign_stats_{campaign_id}"))
     builder.add(InlineKeyboardButton(text="🗑 Удалить", callback_data=f"campaign_delete_{campaign_id}"))
     builder.add(InlineKeyboardButton(text="◀️ Назад", callback_data="campaigns_menu"))
     
-    builder.adjust(2, 1, 1, 1)
+    if show_humanize:
+        builder.adjust(2, 1, 1, 1, 1)
+    else:
+        builder.adjust(2, 1, 1, 1)
     return builder.as_markup()
 
 def contacts_keyboard() -> InlineKeyboardMarkup:
@@ -7,12 +7,16 @@ try:
 except ImportError:
     EMAIL_VALIDATOR_AVAILABLE = False
 
-def validate_email_address(email: str) -> Tuple[bool, Optional[str]]:
-    """Валидация email адреса"""
+def validate_email_address(email: str, check_deliverability: bool = False) -> Tuple[bool, Optional[str]]:
+    """Валидация email адреса
+    
+    По умолчанию - только синтаксис и нормализация, без сети. Домены
+    проверяются отдельно и пачкой (app.services.email_verifier.MXVerifier).
+    """
     if EMAIL_VALIDATOR_AVAILABLE:
         try:
-            validated_email = validate_email(email)
-            return True, validated_email.email
+            validated_email = validate_email(email, check_deliverability=check_deliverability)
+            return True, validated_email.normalized
         except EmailNotValidError as e:
             return False, str(e)
     else:
@@ -142,8 +146,9 @@ def validate_delay_settings(min_delay: str, max_delay: str) -> Tuple[bool, Optio
         min_val = int(min_delay)
         max_val = int(max_delay)
         
-        if min_val < 1:
-            return False, "Минимальная задержка должна быть больше 0"
+        # 0 - без фиксированной паузы, темп задает ограничитель отправителя
+        if min_val < 0:
+            return False, "Минимальная задержка не может быть отрицательной"
         
         if max_val < min_val:
             return False, "Максимальная задержка должна быть больше минимальной"
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк проверки контактов: построчные validate_* против validate_contacts_batch
+
+Запуск из корня проекта:
+    python scripts/benchmark_validators.py --rows 1000000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.validators import (  # noqa: E402
+    validate_email_address, validate_phone_number, validate_telegram_contact
+)
+from app.utils.batch_validators import validate_contacts_batch  # noqa: E402
+
+SCALAR_VALIDATORS = {
+    "phone": validate_phone_number,
+    "email": validate_email_address,
+    "telegram": validate_telegram_contact,
+}
+
+
+def generate(contact_type: str, rows: int, seed: int = 42) -> list:
+    """Типичный файл: ~3% ошибок и ~5% повторов"""
+    rnd = random.Random(seed)
+    values = []
+    for i in range(rows):
+        roll = rnd.random()
+        if roll < 0.03:
+            values.append(rnd.choice(["abc", "123", "@@", "user@", "--5", ""]))
+            continue
+        if roll < 0.08 and values:
+            values.append(values[rnd.randrange(len(values))])
+            continue
+        if contact_type == "phone":
+            values.append(f"+7 9{rnd.randrange(10 ** 9):09d}")
+        elif contact_type == "email":
+            values.append(f"User{i}@Domain{rnd.randrange(500)}.com")
+        else:
+            values.append(rnd.choice([f"@user_{i:07d}", f"user_{i:07d}", str(rnd.randrange(10 ** 6, 10 ** 10))]))
+    return values
+
+
+def bench_scalar(values: list, contact_type: str) -> float:
+    validator = SCALAR_VALIDATORS[contact_type]
+    started = time.perf_counter()
+    seen = set()
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        ok, result = validator(value)
+        if ok:
+            seen.add(result)
+    return time.perf_counter() - started
+
+
+def bench_batch(values: list, contact_type: str) -> float:
+    started = time.perf_counter()
+    result = validate_contacts_batch(values, contact_type)
+    result.loc[~result["duplicate"] & result["error"].isna(), "value"].tolist()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contact validation benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--types", default="phone,email,telegram")
+    parser.add_argument("--skip-scalar", action="store_true", help="Не измерять построчную проверку")
+    args = parser.parse_args()
+
+    print(f"Rows: {args.rows:,}")
+    print(f"{'type':<10} {'scalar s/1M':>12} {'batch s/1M':>12} {'batch rows/s':>14} {'speedup':>8}")
+    for contact_type in args.types.split(","):
+        values = generate(contact_type, args.rows)
+        per_million = 1_000_000 / args.rows
+
+        batch = bench_batch(values, contact_type)
+        scalar = None if args.skip_scalar else bench_scalar(values, contact_type)
+
+        scalar_text = f"{scalar * per_million:12.2f}" if scalar is not None else f"{'-':>12}"
+        speedup = f"{scalar / batch:7.1f}x" if scalar is not None else f"{'-':>8}"
+        print(
+            f"{contact_type:<10} {scalar_text} {batch * per_million:12.2f} "
+            f"{args.rows / batch:14,.0f} {speedup}"
+        )
+
+
+if __name__ == "__main__":
+    main()
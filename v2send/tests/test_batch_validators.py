@@ -0,0 +1,81 @@
+"""Пакетная проверка контактов совпадает с построчной FileParser._validate_contact"""
+import random
+import string
+
+import pytest
+
+from app.services.file_parser import FileParser
+from app.utils.batch_validators import EMPTY_ERROR, validate_contacts, validate_contacts_batch
+
+EDGE_VALUES = {
+    "phone": [
+        "+79991234567", "8 (999) 123-45-67", "79991234567", "+1 202 555 0147", "12345",
+        "+0123456789", "++79991234567", "abc", "+7999123456789012", "  +79991234567  ",
+    ],
+    "email": [
+        "user@example.com", "User.Name+tag@Example.COM", "a@b.co", "bad@", "@example.com",
+        "user@localhost", "user@example.test", "üser@example.com", "user@xn--80ak6aa92e.com",
+        "\"quoted\"@example.com", "user..dots@example.com", "user@exa_mple.com", "x" * 65 + "@example.com",
+        "user@" + "a" * 250 + ".com", "  user@example.com  ",
+    ],
+    "telegram": [
+        "@durov", "durov", "@abc", "123456789", "-1001234567890", "0123",
+        "https://t.me/durov", "https://t.me/+AbC-123", "https://t.me/joinchat/AbC_1",
+        "https://telegram.me/joinchat/AbC", "t.me/durov", "@1durov", "durov!", "@" + "a" * 40,
+    ],
+}
+
+
+def _generated(contact_type: str, count: int = 500):
+    rnd = random.Random(contact_type)
+    alphabet = string.ascii_letters + string.digits + "._-+@ "
+    values = []
+    for i in range(count):
+        if contact_type == "phone":
+            values.append(rnd.choice(["+7", "8", "", "+1 "]) + "".join(rnd.choices(string.digits + " -()", k=rnd.randint(3, 16))))
+        elif contact_type == "email":
+            local = "".join(rnd.choices(string.ascii_letters + string.digits + "._+", k=rnd.randint(1, 12)))
+            domain = rnd.choice(["example.com", "Mail.RU", "test", "ex-ample.org", "a.b.c.io", ""])
+            values.append(f"{local}@{domain}" if i % 7 else "".join(rnd.choices(alphabet, k=10)))
+        else:
+            name = "".join(rnd.choices(string.ascii_letters + string.digits + "_", k=rnd.randint(2, 35)))
+            values.append(rnd.choice(["@", "", "https://t.me/", "https://t.me/+"]) + name)
+    return values
+
+
+@pytest.mark.parametrize("contact_type", ["phone", "email", "telegram"])
+def test_batch_matches_scalar(contact_type):
+    # Пустые значения парсеры отбрасывают до проверки
+    values = [v for v in EDGE_VALUES[contact_type] + _generated(contact_type) if v.strip()]
+    checked = validate_contacts_batch(values, contact_type)
+
+    for value, (_, row) in zip(values, checked.iterrows()):
+        ok, result = FileParser._validate_contact(value.strip(), contact_type)
+        if ok:
+            assert row["value"] == result, value
+            assert row["error"] is None, value
+        else:
+            assert row["value"] is None, value
+            assert row["error"] == result, value
+
+
+@pytest.mark.parametrize("contact_type", ["phone", "email", "telegram", "unknown"])
+def test_validate_contacts_matches_scalar(contact_type):
+    values = [v.strip() for v in EDGE_VALUES.get(contact_type, ["anything", "else"]) + _generated("email", 100) if v.strip()]
+    expected = [FileParser._validate_contact(value, contact_type) for value in values]
+    assert validate_contacts(values, contact_type) == expected
+
+
+def test_duplicates_marked_after_normalization():
+    checked = validate_contacts_batch(
+        ["+79991234567", "abc", "+7 999 123-45-67", "79991234567", "abc"],
+        "phone"
+    )
+    assert list(checked["duplicate"]) == [False, False, True, True, False]
+
+
+def test_empty_values_are_errors():
+    checked = validate_contacts_batch(["", None, "  ", "user@example.com"], "email")
+    assert list(checked["error"][:3]) == [EMPTY_ERROR] * 3
+    assert checked["value"][3] == "user@example.com"
+    assert not checked["duplicate"].any()
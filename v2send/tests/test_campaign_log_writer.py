@@ -0,0 +1,90 @@
+"""Запись логов кампании переживает временные ошибки БД"""
+import asyncio
+
+import pytest
+
+from app.services import campaign_log_writer
+from app.services.campaign_log_writer import CampaignLogWriter
+
+
+class FlakySession:
+    """Сессия, у которой первые failures коммитов падают"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.statements = 0
+        self.commits = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.statements += 1
+
+    async def commit(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        self.commits += 1
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(campaign_log_writer, "RETRY_DELAY", 0.01)
+
+
+def _fill(writer: CampaignLogWriter, count: int):
+    for i in range(count):
+        writer.add(f"user{i}", "sent")
+    writer.set_checkpoint(sent_count=count, last_contact_id=count)
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_transient_error_does_not_lose_rows(background):
+    session = FlakySession(failures=2)
+
+    async def run():
+        writer = CampaignLogWriter(session, 1, flush_size=10, flush_interval=0.01, background=background)
+        await writer.start()
+        _fill(writer, 25)
+        await writer.maybe_flush()
+        await asyncio.sleep(0.1)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert session.commits >= 1
+    assert writer._rows == [] and writer._checkpoint is None
+
+
+def test_close_flushes_after_writer_failures():
+    session = FlakySession(failures=3)
+
+    async def run():
+        writer = CampaignLogWriter(session, 1, flush_size=1000, flush_interval=0.01, background=True)
+        await writer.start()
+        _fill(writer, 5)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert session.commits == 1
+    assert writer._rows == []
+
+
+def test_persistent_error_is_raised():
+    session = FlakySession(failures=100)
+
+    async def run():
+        writer = CampaignLogWriter(session, 1, flush_size=10)
+        _fill(writer, 5)
+        await writer.flush()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
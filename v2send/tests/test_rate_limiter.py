@@ -0,0 +1,60 @@
+"""GCRA-ограничитель на Redis (fakeredis с Lua)"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.rate_limiter import RateLimiter
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+def _redis():
+    # Свой сервер на тест: экземпляры FakeRedis() по умолчанию делят один
+    return fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+async def _elapsed(limiter: RateLimiter, counts):
+    started = time.monotonic()
+    for count in counts:
+        await limiter.acquire(count)
+    return time.monotonic() - started
+
+
+def test_burst_then_rate():
+    redis = _redis()
+    limiter = RateLimiter(redis, [("sender:1", 20, 3)])
+    # Первые три - всплеском, еще три - по 50 мс
+    assert asyncio.run(_elapsed(limiter, [1] * 6)) == pytest.approx(0.15, abs=0.05)
+
+
+def test_count_reserves_several_slots():
+    redis = _redis()
+    limiter = RateLimiter(redis, [("sender:1", 20, 1)])
+    assert asyncio.run(_elapsed(limiter, [4, 1])) == pytest.approx(0.2, abs=0.05)
+
+
+def test_shared_bucket_limits_all_instances():
+    redis = _redis()
+    first = RateLimiter(redis, [("sender:1", 10, 1), ("provider:x", 20, 1)])
+    second = RateLimiter(redis, [("sender:2", 10, 1), ("provider:x", 20, 1)])
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for limiter in [first, second] * 3))
+        return time.monotonic() - started
+
+    # Шесть сообщений через общий бакет провайдера (20/с), каждый отправитель - 10/с
+    assert asyncio.run(run()) == pytest.approx(0.25, abs=0.06)
+
+
+def test_unavailable_redis_does_not_block():
+    class BrokenRedis:
+        def register_script(self, script):
+            async def call(keys, args):
+                raise ConnectionError("down")
+            return call
+
+    limiter = RateLimiter(BrokenRedis(), [("sender:1", 1, 1)])
+    assert asyncio.run(_elapsed(limiter, [1, 1, 1])) < 0.05
@@ -0,0 +1,206 @@
+"""Темп, порядок результатов и курсор движка отправки"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.send_engine import DeliveryCursor, PacingPolicy, SendEngine, SendJob
+
+
+async def _jobs(count: int):
+    for i in range(1, count + 1):
+        yield SendJob(i, f"user{i}", f"message {i}")
+
+
+async def _collect(engine: SendEngine, count: int):
+    return [result async for result in engine.run(_jobs(count))]
+
+
+class RecordingService:
+    """Сервис с deliver(): запоминает моменты стартов отправок"""
+
+    def __init__(self, fail=(), latency: float = 0.0):
+        self.fail = set(fail)
+        self.latency = latency
+        self.starts = []
+        self.recipients = []
+
+    async def deliver(self, recipient, message, subject=None):
+        self.starts.append(time.monotonic())
+        self.recipients.append(recipient)
+        await asyncio.sleep(self.latency)
+        if recipient in self.fail:
+            raise RuntimeError("boom")
+        return {"success": True, "message_id": f"id-{recipient}"}
+
+
+class BatchService:
+    """Сервис с deliver_batch(): запоминает размеры пакетов"""
+
+    max_batch_size = 4
+
+    def __init__(self, short: bool = False):
+        self.short = short
+        self.batches = []
+
+    async def deliver_batch(self, items):
+        self.batches.append([recipient for recipient, _, _ in items])
+        data = [{"success": True, "message_id": recipient} for recipient, _, _ in items]
+        return data[:-1] if self.short else data
+
+
+def test_pacing_spacing_and_batch_pause():
+    async def run():
+        pacing = PacingPolicy(batch_size=2, delay_seconds=0.05)
+        starts = []
+        for _ in range(5):
+            await pacing.wait()
+            starts.append(time.monotonic())
+        return [b - a for a, b in zip(starts, starts[1:])]
+
+    gaps = asyncio.run(run())
+    # Интервал 0.05, после каждых двух сообщений еще пауза 0.1
+    assert gaps[0] == pytest.approx(0.05, abs=0.03)
+    assert gaps[1] == pytest.approx(0.15, abs=0.03)
+    assert gaps[2] == pytest.approx(0.05, abs=0.03)
+    assert gaps[3] == pytest.approx(0.15, abs=0.03)
+
+
+def test_pacing_counts_every_message_of_a_request():
+    async def run():
+        pacing = PacingPolicy(batch_size=10, delay_seconds=0.05)
+        await pacing.wait(3)
+        started = time.monotonic()
+        await pacing.wait()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) == pytest.approx(0.15, abs=0.03)
+
+
+def test_pacing_scales_with_senders_not_concurrency():
+    def elapsed(senders: int, concurrency: int) -> float:
+        service = RecordingService(latency=0.01)
+        engine = SendEngine(service, concurrency, PacingPolicy(3, 0.05, senders=senders))
+        started = time.monotonic()
+        asyncio.run(_collect(engine, 9))
+        return time.monotonic() - started
+
+    one_sender = elapsed(1, 1)
+    # Параллельные слоты темп не меняют
+    assert elapsed(1, 8) >= one_sender * 0.85
+    # Два отправителя - вдвое быстрее
+    assert elapsed(2, 8) < one_sender * 0.7
+
+
+def test_concurrency_sets_pace_without_delay():
+    service = RecordingService(latency=0.05)
+    engine = SendEngine(service, 10, PacingPolicy(10, 0))
+    started = time.monotonic()
+    asyncio.run(_collect(engine, 20))
+    # 20 отправок по 50 мс в 10 слотов - два "раунда"
+    assert time.monotonic() - started < 0.3
+
+
+def test_pacing_disabled_without_delay():
+    async def run():
+        pacing = PacingPolicy(batch_size=1, delay_seconds=0)
+        started = time.monotonic()
+        for _ in range(100):
+            await pacing.wait()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.05
+
+
+def test_engine_reports_every_job():
+    service = RecordingService(fail={"user3"}, latency=0.005)
+    engine = SendEngine(service, concurrency=4)
+    results = asyncio.run(_collect(engine, 20))
+
+    assert sorted(r.job.contact_id for r in results) == list(range(1, 21))
+    assert not engine.stopped
+    failed = [r for r in results if not r.success]
+    assert [r.job.recipient for r in failed] == ["user3"]
+    assert failed[0].error == "boom"
+    assert all(r.external_id == f"id-{r.job.recipient}" for r in results if r.success)
+    assert engine.completed == 20
+
+
+def test_engine_single_slot_keeps_order():
+    service = RecordingService()
+    engine = SendEngine(service, concurrency=1)
+    results = asyncio.run(_collect(engine, 10))
+
+    assert service.recipients == [f"user{i}" for i in range(1, 11)]
+    assert [r.job.contact_id for r in results] == list(range(1, 11))
+
+
+def test_engine_uses_deliver_batch():
+    service = BatchService()
+    engine = SendEngine(service, concurrency=1)
+    results = asyncio.run(_collect(engine, 10))
+
+    assert all(len(batch) <= service.max_batch_size for batch in service.batches)
+    assert [r for batch in service.batches for r in batch] == [f"user{i}" for i in range(1, 11)]
+    assert all(r.success for r in results)
+    assert engine.completed == 10
+
+
+def test_engine_fails_jobs_missing_from_batch_result():
+    service = BatchService(short=True)
+    engine = SendEngine(service, concurrency=1)
+    results = asyncio.run(_collect(engine, 4))
+
+    assert len(results) == 4
+    missing = [r for r in results if not r.success]
+    assert len(missing) == len(service.batches)
+    assert all(r.error == "No result from provider" for r in missing)
+
+
+def test_engine_stop_skips_queued_jobs():
+    async def run():
+        service = RecordingService(latency=0.01)
+        engine = SendEngine(service, concurrency=1)
+        results = []
+        async for result in engine.run(_jobs(50)):
+            results.append(result)
+            if len(results) == 3:
+                engine.stop()
+        return engine, results
+
+    engine, results = asyncio.run(run())
+    assert engine.stopped
+    assert 3 <= len(results) < 50
+
+
+def test_cursor_advances_over_contiguous_prefix():
+    cursor = DeliveryCursor(position=10)
+    for contact_id in (11, 12, 15, 20):
+        cursor.track(contact_id)
+
+    cursor.done(12)
+    assert cursor.position == 10
+    cursor.done(11)
+    assert cursor.position == 12
+    cursor.done(20)
+    assert cursor.position == 12
+    cursor.done(15)
+    assert cursor.position == 20
+
+
+def test_cursor_follows_engine_results():
+    async def run():
+        service = RecordingService(latency=0.001)
+        engine = SendEngine(service, concurrency=5)
+        cursor = DeliveryCursor()
+
+        async def tracked():
+            async for job in _jobs(30):
+                cursor.track(job.contact_id)
+                yield job
+
+        async for result in engine.run(tracked()):
+            cursor.done(result.job.contact_id)
+        return cursor.position
+
+    assert asyncio.run(run()) == 30